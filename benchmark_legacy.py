@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+変更前の番組表の解析（benchmark_parsers.py の比較用）
+
+1パス化（race_parser.parse_program_lines）より前の convert_program.py の解析処理を、
+ファイルを読んでレースのリストを返すところまでそのまま残したもの。
+変換には使わず、benchmark_parsers.py で現在の解析と処理時間を比較するためだけに使う
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+class LegacyProgramParser:
+    """変更前の番組表の解析（行のリストを読み、レースごとに区間を読み直す）"""
+
+    def __init__(self):
+        # レース場番号のマッピング
+        self.track_mapping = {
+            "桐生": "01",
+            "戸田": "02",
+            "江戸川": "03",
+            "平和島": "04",
+            "多摩川": "05",
+            "浜名湖": "06",
+            "蒲郡": "07",
+            "常滑": "08",
+            "津": "09",
+            "三国": "10",
+            "びわこ": "11",
+            "住之江": "12",
+            "尼崎": "13",
+            "鳴門": "14",
+            "丸亀": "15",
+            "児島": "16",
+            "宮島": "17",
+            "徳山": "18",
+            "下関": "19",
+            "若松": "20",
+            "芦屋": "21",
+            "福岡": "22",
+            "唐津": "23",
+            "大村": "24",
+        }
+
+    def extract_track_number(self, text: str) -> Optional[str]:
+        """レース場名からレース場番号を抽出"""
+        for track_name, track_num in self.track_mapping.items():
+            if track_name in text:
+                return track_num
+        return None
+
+    def parse_time(self, time_str: str) -> str:
+        """投票締切時間を解析してHH:MM形式に変換"""
+        # 全角数字を半角に変換
+        time_str = time_str.translate(
+            str.maketrans("０１２３４５６７８９：", "0123456789:")
+        )
+
+        # 時間パターンをマッチ
+        pattern = r"(\d{1,2})[：:](\d{2})"
+        match = re.search(pattern, time_str)
+        if match:
+            hour = match.group(1).zfill(2)
+            minute = match.group(2)
+            return f"{hour}:{minute}"
+        return ""
+
+    def parse_boat_data(self, line: str) -> Optional[Dict]:
+        """艇の情報を固定位置で直接抽出"""
+        # 行の長さをチェック（最低限ボート2連率まで取得できる長さ）
+        if len(line) < 58:
+            return None
+
+        # 区切り線やヘッダー行を除外
+        line_stripped = line.strip()
+        if (
+            line_stripped.startswith("-")
+            or "選手" in line_stripped
+            or "登番" in line_stripped
+            or "番号" in line_stripped
+        ):
+            return None
+
+        try:
+            # 艇番（最初の1文字）
+            boat_number = line[0:1].strip()
+
+            # 艇番が数字でない場合は無効
+            if not boat_number.isdigit():
+                return None
+
+            # 選手情報を固定位置で直接抽出
+            player_id = line[2:6].strip()  # 選手登番
+            player_name = line[6:10].strip()  # 選手名
+            age = line[10:12].strip()  # 年齢
+            branch = line[12:14].strip()  # 支部
+            weight = line[14:16].strip()  # 体重
+            player_class = line[16:18].strip()  # 級別
+
+            # 選手登番が4桁の数字でない場合は無効
+            if not (player_id.isdigit() and len(player_id) == 4):
+                return None
+
+            # 固定位置での数値抽出
+            national_win_rate = line[19:23].strip()
+            national_2nd_rate = line[24:29].strip()
+            local_win_rate = line[30:34].strip()
+            local_2nd_rate = line[35:40].strip()
+            motor_number = line[41:43].strip()
+            motor_2nd_rate = line[44:49].strip()
+            boat_number_actual = line[50:52].strip()
+            boat_2nd_rate = line[53:58].strip() if len(line) >= 58 else ""
+
+            return {
+                "boat_number": boat_number,
+                "player_id": player_id,
+                "player_name": player_name,
+                "age": age,
+                "branch": branch,
+                "weight": weight,
+                "class": player_class,
+                "national_win_rate": national_win_rate,
+                "national_2nd_rate": national_2nd_rate,
+                "local_win_rate": local_win_rate,
+                "local_2nd_rate": local_2nd_rate,
+                "motor_number": motor_number,
+                "motor_2nd_rate": motor_2nd_rate,
+                "boat_number_actual": boat_number_actual,
+                "boat_2nd_rate": boat_2nd_rate,
+            }
+
+        except (IndexError, ValueError):
+            return None
+
+    def parse_race_header(self, line: str) -> Optional[Tuple[str, str, str, str]]:
+        """レースヘッダー情報を解析"""
+        # 全角数字を半角に変換
+        converted_line = line.translate(
+            str.maketrans("０１２３４５６７８９Ｒ", "0123456789R")
+        )
+
+        # レース番号を抽出（全角・半角両対応）
+        race_match = re.search(r"(\d{1,2})R", converted_line)
+        if not race_match:
+            # 全角数字のRパターンも試す
+            race_match = re.search(r"[　\s]*([０１２３４５６７８９]+)[Ｒ]", line)
+            if race_match:
+                # 全角数字を半角に変換
+                race_number = race_match.group(1).translate(
+                    str.maketrans("０１２３４５６７８９", "0123456789")
+                )
+            else:
+                return None
+        else:
+            race_number = race_match.group(1)
+
+        # 距離を抽出（H1800m形式）
+        distance_match = re.search(r"[HＨ](\d+)[mｍ]", converted_line)
+        distance = distance_match.group(1) if distance_match else ""
+
+        # 投票締切時間を抽出
+        time = self.parse_time(line)
+
+        # レース名はデフォルト値
+        race_name = "予選"
+
+        return race_number, race_name, distance, time
+
+    def process_race_section(self, lines: List[str], start_idx: int) -> Optional[Dict]:
+        """レース区間を処理"""
+        race_data = None
+        boats = {}
+
+        i = start_idx
+        while i < len(lines):
+            line = lines[i].strip()
+
+            # 次のレースの開始または区間終了
+            if re.match(r".*\d+Ｒ.*", line) and i > start_idx:
+                break
+            if line.startswith("BEND") or line.startswith("FINALB"):
+                break
+
+            # レースヘッダーの解析
+            if ("Ｒ" in line or "R" in line) and "電話投票締切予定" in line:
+                race_info = self.parse_race_header(line)
+                if race_info:
+                    race_number, race_name, distance, time = race_info
+                    race_data = {
+                        "race_number": race_number,
+                        "race_name": race_name,
+                        "distance": distance,
+                        "time": time,
+                    }
+
+            # 艇データの解析
+            boat_data = self.parse_boat_data(line)
+            if boat_data:
+                boats[boat_data["boat_number"]] = boat_data
+
+            i += 1
+
+        if race_data and len(boats) >= 6:  # 6艇すべてのデータがある場合
+            race_data["boats"] = boats
+            return race_data
+
+        return None
+
+    def parse_file(
+        self, input_file: str, year: int, month: int, day: int
+    ) -> List[Dict]:
+        """番組表ファイルを解析してレースデータ（辞書）のリストを返す"""
+        with open(input_file, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+
+        races = []
+        current_track_number = None
+
+        i = 0
+        while i < len(lines):
+            line = lines[i].strip()
+
+            # トラック開始マーカー
+            if re.match(r"\d{2}BBGN", line):
+                track_num = line[:2]
+                current_track_number = track_num
+                i += 1
+                continue
+
+            # レース場名からトラック番号を抽出（BBGNの次の行で）
+            if current_track_number is None and "ボートレース" in line:
+                extracted_track = self.extract_track_number(line)
+                if extracted_track:
+                    current_track_number = extracted_track
+
+            # トラック終了マーカー
+            if re.match(r"\d{2}BEND", line):
+                current_track_number = None
+                i += 1
+                continue
+
+            # レースヘッダーの検出
+            if (
+                ("Ｒ" in line or "R" in line)
+                and "電話投票締切予定" in line
+                and current_track_number
+            ):
+                race_data = self.process_race_section(lines, i)
+                if race_data:
+                    race_data["track_number"] = current_track_number
+                    race_data["year"] = year
+                    race_data["month"] = month
+                    race_data["day"] = day
+                    races.append(race_data)
+
+            i += 1
+
+        return races
@@ -0,0 +1,727 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+パーサーのベンチマークプログラム
+
+同梱の生データ（data/raw/）を使って、各パーサーの処理時間とスループット
+（MB/秒・レース/秒）を計測する。
+
+- 固定の日（SAMPLE_DAYS）の番組表・競走成績ファイルで、変換・解析の各関数を計測する
+  （競走成績の艇の行は、固定位置の切り出しと正規表現だけの解析の両方を計測し、
+  正規表現で解析した行の数も表示する）
+- 番組表の解析は、変更前の解析（benchmark_legacy.py）も同じファイルで計測して
+  何倍速くなったかを表示する
+- 生データの索引（race_index）の作成と、索引を使って1ファイルから1レースだけを
+  解析する処理も計測する（1日分を全部解析する parse_program・parse_race_data と比べる）
+- --full を指定すると、2024年の1年分のファイルでも計測する
+- --save-baseline で計測結果を基準（ベースライン）として保存し、
+  --compare で基準と比較して、しきい値を超えて遅くなった項目を回帰として報告する
+  （回帰がある場合は終了コード1）。計測のばらつき（各回の中央値と最短の差）の分だけ
+  しきい値を広げ、1回しか計測しない1年分の項目は表示だけで回帰の判定には使わない
+- --memory を指定すると、1年分の解析結果をメモリに持った場合のメモリ使用量
+  （tracemalloc の確保サイズ・ブロック数、RSS の増加量）を、変更前の形
+  （番組表はレース・艇ごとの辞書、競走成績は行ごとのリスト）と比較する
+
+例:
+    python benchmark_parsers.py --save-baseline
+    python benchmark_parsers.py --compare --threshold 0.1
+    python benchmark_parsers.py --memory
+"""
+
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import multiprocessing
+import re
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import race_patterns
+from benchmark_legacy import LegacyProgramParser
+from check_race_count import check_race_count
+from convert_program import ProgramConverter
+from convert_race_result import get_input_path, parse_boat_result, parse_race_data
+from extract_race_info import extract_race_info
+from race_io import open_raw
+from race_index import RaceIndex, read_program_race, read_result_race
+from race_parser import (
+    BOAT_RESULT_FALLBACKS,
+    ProgramRace,
+    match_boat_result,
+    parse_program_race_header,
+)
+
+# 番組表・競走成績の元ファイルのディレクトリ
+PROGRAMS_DIR = "data/raw/programs"
+RESULTS_DIR = "data/raw/results"
+
+# 固定の計測対象の日（年始・開催の多い日・年末）
+SAMPLE_DAYS = ((2024, 1, 1), (2024, 6, 15), (2024, 12, 31))
+
+# 1年分の計測の対象期間（--full）
+FULL_YEAR = (date(2024, 1, 1), date(2024, 12, 31))
+
+# 基準（ベースライン）の計測結果のファイル
+BASELINE_FILE = "data/benchmark_baseline.json"
+
+# 基準より何割遅くなったら回帰とするか
+DEFAULT_THRESHOLD = 0.1
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = ("--number", "--repeat", "--baseline", "--threshold")
+
+# 値を取らないコマンドラインオプション
+FLAG_OPTIONS = ("--full", "--save-baseline", "--compare", "--patterns", "--memory")
+
+# メモリ使用量を比較する解析結果の形（--memory）
+MEMORY_KINDS = {
+    "programs": ("番組表", "レース"),
+    "results": ("競走成績", "行"),
+}
+MEMORY_FORMATS = {
+    "before": {"programs": "変更前（辞書）", "results": "変更前（リスト）"},
+    "after": {"programs": "NamedTuple", "results": "タプル"},
+}
+
+# 1行あたりのコストを計測するサンプル行
+PROGRAM_HEADER_SAMPLE_LINE = (
+    "　１Ｒ  予選　　　　          Ｈ１８００ｍ  電話投票締切予定１７：４１"
+)
+RESULT_SAMPLE_LINE = (
+    "  01  1 3501 川　上　　昇　平 50   12  6.89   1    0.08     1.49.7"
+)
+
+
+class BenchmarkCase(NamedTuple):
+    """計測する項目（func を1回実行したときの処理量）"""
+
+    name: str
+    func: Callable[[], Any]
+    bytes: int
+    count: int
+    unit: str
+
+
+def measure(func, number: int, repeat: int) -> float:
+    """funcをnumber回実行する計測をrepeat回行い、1回あたりの最短時間（秒）を返す"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def measure_noise(func, number: int, repeat: int) -> Tuple[float, float]:
+    """measure と同じ計測で、(1回あたりの最短時間（秒）, ばらつき) を返す
+
+    ばらつきは各回の中央値が最短の時間より遅い割合（1回だけの計測は 0）
+    """
+    times = sorted(timeit.repeat(func, number=number, repeat=repeat))
+    fastest = times[0]
+    median = times[len(times) // 2]
+    return fastest / number, median / fastest - 1 if fastest > 0 else 0.0
+
+
+def quiet(func: Callable[[], Any]) -> Callable[[], Any]:
+    """標準出力への表示を捨てて func を実行する関数"""
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+
+    return run
+
+
+def file_size(paths: List[str]) -> int:
+    """ファイルの合計サイズ（バイト）"""
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def sample_lines(paths: List[str], parse: Callable[[str], Any]) -> List[str]:
+    """ファイルの行のうち、parse が解析できる行（艇のデータの行、改行は除く）"""
+    lines = []
+    for path in paths:
+        with open_raw(path) as f:
+            lines.extend(
+                line.rstrip("\n") for line in f if line.strip()[:1].isdigit()
+            )
+    return [line for line in lines if parse(line)]
+
+
+def count_races(rows: List[List]) -> int:
+    """レース結果の行データのレース数（年・月・日・競艇場番号・レース番号の組み合わせの数）"""
+    return len({tuple(row[:5]) for row in rows})
+
+
+def last_race(path: str) -> Tuple[str, int]:
+    """索引の最後のレース（レース場番号の最も大きいトラックの最終レース）"""
+    with RaceIndex(path) as index:
+        track_number = max(index.tracks)
+        return track_number, max(index.track_races(track_number))
+
+
+def day_range(start: date, end: date) -> List[Tuple[int, int, int]]:
+    """開始日〜終了日の (年, 月, 日)"""
+    days = []
+    current = start
+    while current <= end:
+        days.append((current.year, current.month, current.day))
+        current += timedelta(days=1)
+    return days
+
+
+def build_cases(
+    label: str, days: List[Tuple[int, int, int]], work_dir: str
+) -> List[BenchmarkCase]:
+    """指定した日の番組表・競走成績ファイルで計測する項目を作成
+
+    番組表の変換の出力（CSV・マニフェスト）は work_dir に書き込む
+    """
+    converter = ProgramConverter(input_dir=PROGRAMS_DIR)
+    legacy = LegacyProgramParser()
+    program_files = [converter.get_input_file(*day) for day in days]
+    result_files = [get_input_path(*day, input_dir=RESULTS_DIR) for day in days]
+    program_bytes = file_size(program_files)
+    result_bytes = file_size(result_files)
+
+    program_races = sum(
+        len(converter.parse_file(path, *day))
+        for path, day in zip(program_files, days)
+    )
+    result_rows = [
+        row
+        for path, day in zip(result_files, days)
+        for row in parse_race_data(path, *day)
+    ]
+    result_races = count_races(result_rows)
+
+    # 番組表の変換（出力CSV・マニフェストは毎回作り直す）
+    output_file = os.path.join(work_dir, f"{label}_programs.csv")
+    manifest_file = os.path.splitext(output_file)[0] + ".manifest.json"
+    writer = ProgramConverter(input_dir=PROGRAMS_DIR, output_file=output_file)
+
+    def convert_programs():
+        for path in (output_file, manifest_file):
+            if os.path.exists(path):
+                os.remove(path)
+        for day in days:
+            writer.convert_file(*day)
+
+    def check_programs():
+        check_race_count(output_file)
+
+    def parse_programs():
+        for path, day in zip(program_files, days):
+            converter.parse_file(path, *day)
+
+    def legacy_parse_programs():
+        for path, day in zip(program_files, days):
+            legacy.parse_file(path, *day)
+
+    def parse_results():
+        for path, day in zip(result_files, days):
+            parse_race_data(path, *day)
+
+    def parse_boat_lines():
+        parse = converter.parse_boat_data
+        for line in boat_lines:
+            parse(line)
+
+    def parse_result_lines():
+        for line in result_lines:
+            parse_boat_result(line)
+
+    def match_result_lines():
+        for line in result_lines:
+            match_boat_result(line)
+
+    def index_files():
+        for path in program_files + result_files:
+            with RaceIndex(path) as index:
+                for track_number in index.tracks:
+                    index.track_races(track_number)
+
+    def read_program_races():
+        for path, day, target in zip(program_files, days, program_targets):
+            with RaceIndex(path) as index:
+                read_program_race(index, *day, *target)
+
+    def read_result_races():
+        for path, day, target in zip(result_files, days, result_targets):
+            with RaceIndex(path) as index:
+                read_result_race(index, *day, *target)
+
+    def extract_results():
+        for path in result_files:
+            extract_race_info(path)
+
+    # 計測前に1度変換して、レース数のチェックの入力にする
+    quiet(convert_programs)()
+    boat_lines = sample_lines(program_files, converter.parse_boat_data)
+    result_lines = sample_lines(result_files, parse_boat_result)
+    boat_bytes = sum(len(line.encode("utf-8")) for line in boat_lines)
+    result_line_bytes = sum(len(line.encode("utf-8")) for line in result_lines)
+    csv_bytes = os.path.getsize(output_file)
+    program_targets = [last_race(path) for path in program_files]
+    result_targets = [last_race(path) for path in result_files]
+
+    return [
+        BenchmarkCase(
+            f"{label}.convert_file",
+            quiet(convert_programs),
+            program_bytes,
+            program_races,
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.parse_program",
+            parse_programs,
+            program_bytes,
+            program_races,
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.legacy_parse_program",
+            legacy_parse_programs,
+            program_bytes,
+            program_races,
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.parse_boat_data",
+            parse_boat_lines,
+            boat_bytes,
+            len(boat_lines),
+            "行",
+        ),
+        BenchmarkCase(
+            f"{label}.parse_race_data",
+            parse_results,
+            result_bytes,
+            result_races,
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.parse_boat_result",
+            parse_result_lines,
+            result_line_bytes,
+            len(result_lines),
+            "行",
+        ),
+        BenchmarkCase(
+            f"{label}.match_boat_result",
+            match_result_lines,
+            result_line_bytes,
+            len(result_lines),
+            "行",
+        ),
+        BenchmarkCase(
+            f"{label}.race_index",
+            index_files,
+            program_bytes + result_bytes,
+            program_races + result_races,
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.read_program_race",
+            read_program_races,
+            program_bytes,
+            len(days),
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.read_result_race",
+            read_result_races,
+            result_bytes,
+            len(days),
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.extract_race_info",
+            extract_results,
+            result_bytes,
+            result_races,
+            "レース",
+        ),
+        BenchmarkCase(
+            f"{label}.check_race_count",
+            quiet(check_programs),
+            csv_bytes,
+            program_races,
+            "レース",
+        ),
+    ]
+
+
+def print_fallbacks(days: List[Tuple[int, int, int]]) -> None:
+    """競走成績の艇の行のうち、固定位置で切り出せず正規表現で解析した行の数を表示"""
+    before = BOAT_RESULT_FALLBACKS.copy()
+    rows = 0
+    for day in days:
+        rows += len(parse_race_data(get_input_path(*day, input_dir=RESULTS_DIR), *day))
+    matched = BOAT_RESULT_FALLBACKS["matched"] - before["matched"]
+    unmatched = BOAT_RESULT_FALLBACKS["unmatched"] - before["unmatched"]
+    lines = rows + unmatched
+    print(
+        f"  正規表現で解析した艇の行: {matched + unmatched:,}行 / {lines:,}行"
+        f"（{(matched + unmatched) / lines:.2%}、うち艇の結果でない行 {unmatched:,}行）"
+    )
+
+
+def print_speedup(results: Dict[str, Dict[str, Any]], label: str) -> None:
+    """番組表の解析が変更前の解析の何倍速いかを表示"""
+    before = results[f"{label}.legacy_parse_program"]["seconds"]
+    after = results[f"{label}.parse_program"]["seconds"]
+    print(f"  番組表の解析: 変更前の {before / after:.2f} 倍の速さ")
+
+
+def run_cases(
+    cases: List[BenchmarkCase], number: int, repeat: int, gate: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """各項目を計測して表示し、項目名 → 計測結果を返す
+
+    gate が False の項目は、基準との比較で表示だけ行い回帰の判定には使わない
+    """
+    results = {}
+    for case in cases:
+        seconds, noise = measure_noise(case.func, number, repeat)
+        results[case.name] = {
+            "seconds": seconds,
+            "noise": noise,
+            "mb_per_sec": case.bytes / seconds / 1e6,
+            "units_per_sec": case.count / seconds,
+            "unit": case.unit,
+            "gate": gate,
+        }
+        print(
+            f"  {case.name:<32} {seconds * 1000:10.2f} ms"
+            f" {case.bytes / seconds / 1e6:8.2f} MB/秒"
+            f" {case.count / seconds:12,.0f} {case.unit}/秒"
+            f" (±{noise:.0%})"
+        )
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """計測した環境（基準と比較する際の確認用）"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_baseline(results: Dict[str, Dict[str, Any]], baseline_file: str) -> None:
+    """計測結果を基準として保存"""
+    directory = os.path.dirname(baseline_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(baseline_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "environment": environment(),
+                "results": results,
+            },
+            f,
+            ensure_ascii=False,
+            indent=1,
+        )
+
+
+def compare_baseline(
+    results: Dict[str, Dict[str, Any]], baseline_file: str, threshold: float
+) -> List[str]:
+    """基準と比較して表示し、しきい値を超えて遅くなった項目名のリストを返す
+
+    しきい値は、基準と今回の計測のばらつきの分だけ広げる
+    （ばらつきのない古い基準は 0 とみなす）。gate が False の項目は回帰としない
+    """
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    if baseline.get("environment") != environment():
+        print(f"警告: 基準と計測した環境が異なります: {baseline.get('environment')}")
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:<32} 基準なし")
+            continue
+        change = result["seconds"] / base["seconds"] - 1
+        limit = threshold + base.get("noise", 0.0) + result["noise"]
+        regressed = result["gate"] and change > limit
+        if regressed:
+            regressions.append(name)
+        if not result["gate"]:
+            note = " 参考"
+        elif regressed:
+            note = " 回帰"
+        else:
+            note = ""
+        print(
+            f"  {name:<32} {base['seconds'] * 1000:10.2f} ms →"
+            f" {result['seconds'] * 1000:10.2f} ms ({change:+.1%}、"
+            f"しきい値 {limit:+.0%}){note}"
+        )
+    return regressions
+
+
+def bench_line_patterns(number: int, repeat: int) -> None:
+    """1行あたりの正規表現・変換テーブルのコストを、毎回生成する場合と比較"""
+    header = PROGRAM_HEADER_SAMPLE_LINE
+    result = RESULT_SAMPLE_LINE
+
+    def header_per_call():
+        # 変更前: 呼び出しごとに変換テーブルを生成し、文字列パターンで検索
+        converted = header.translate(
+            str.maketrans("０１２３４５６７８９Ｒ", "0123456789R")
+        )
+        re.search(r"(\d{1,2})R", converted)
+        re.search(r"[HＨ](\d+)[mｍ]", converted)
+        time_str = header.translate(str.maketrans("０１２３４５６７８９：", "0123456789:"))
+        re.search(r"(\d{1,2})[：:](\d{2})", time_str)
+
+    def header_precompiled():
+        # 変更後: 事前コンパイルしたパターンで検索し、一致した部分だけを半角にする
+        parse_program_race_header(header)
+
+    result_pattern = race_patterns.BOAT_RESULT_PATTERN.pattern
+
+    def result_per_call():
+        re.match(result_pattern, result)
+
+    def result_precompiled():
+        race_patterns.BOAT_RESULT_PATTERN.match(result)
+
+    print("1行あたりのコスト（変更前: 毎回生成 / 変更後: 事前コンパイル）")
+    for label, before, after in [
+        ("番組表レースヘッダー", header_per_call, header_precompiled),
+        ("競走成績の艇結果行", result_per_call, result_precompiled),
+    ]:
+        before_time = measure(before, number * 100, repeat)
+        after_time = measure(after, number * 100, repeat)
+        print(
+            f"  {label}: {before_time * 1e6:.2f} µs → {after_time * 1e6:.2f} µs"
+            f" ({before_time / after_time:.1f}倍)"
+        )
+
+
+def current_rss_kb() -> Optional[int]:
+    """現在のメモリ使用量（RSS、KB）。/proc のない環境では None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def program_race_dict(race: ProgramRace) -> Dict[str, Any]:
+    """番組表のレースを変更前の形（レースごと・艇ごとの辞書）に変換"""
+    data = race._asdict()
+    data["boats"] = {
+        boat.boat_number: boat._asdict() for boat in race.boats if boat is not None
+    }
+    return data
+
+
+def load_year(kind: str, form: str, days: List[Tuple[int, int, int]]) -> List:
+    """1年分の番組表（programs）・競走成績（results）を解析し、form の形で返す"""
+    data = []
+    if kind == "programs":
+        converter = ProgramConverter(input_dir=PROGRAMS_DIR)
+        for day in days:
+            races = converter.parse_file(converter.get_input_file(*day), *day)
+            if form == "before":
+                races = [program_race_dict(race) for race in races]
+            data.extend(races)
+    else:
+        for day in days:
+            rows = parse_race_data(get_input_path(*day, input_dir=RESULTS_DIR), *day)
+            if form == "before":
+                rows = [list(row) for row in rows]
+            data.extend(rows)
+    return data
+
+
+def measure_memory(
+    kind: str, form: str, days: List[Tuple[int, int, int]]
+) -> Dict[str, Any]:
+    """1年分の解析結果をメモリに持った場合のメモリ使用量を計測
+
+    RSS の増加量は tracemalloc を使わずに1度解析して計測し、
+    確保サイズ・ブロック数は tracemalloc を有効にしてもう1度解析して計測する
+    （他の計測の影響を受けないように、別のプロセスで実行する）
+    """
+    gc.collect()
+    rss_before = current_rss_kb()
+    data = load_year(kind, form, days)
+    gc.collect()
+    rss_after = current_rss_kb()
+    count = len(data)
+    del data
+    gc.collect()
+
+    tracemalloc.start()
+    data = load_year(kind, form, days)
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+
+    return {
+        "count": count,
+        "bytes": current,
+        "peak_bytes": peak,
+        "blocks": blocks,
+        "rss_kb": (
+            rss_after - rss_before
+            if rss_before is not None and rss_after is not None
+            else None
+        ),
+    }
+
+
+def bench_memory(days: List[Tuple[int, int, int]]) -> None:
+    """1年分の解析結果をメモリに持った場合のメモリ使用量を、変更前の形と比較"""
+    context = multiprocessing.get_context("spawn")
+    for kind, (kind_label, unit) in MEMORY_KINDS.items():
+        measured = {}
+        for form, labels in MEMORY_FORMATS.items():
+            # 計測ごとに新しいプロセスで実行する（解放したメモリの再利用の影響を除く）
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                measured[form] = executor.submit(
+                    measure_memory, kind, form, days
+                ).result()
+            result = measured[form]
+            rss = (
+                f"{result['rss_kb'] / 1024:8.1f} MB"
+                if result["rss_kb"] is not None
+                else "不明"
+            )
+            print(
+                f"  {kind_label} {labels[kind]:<16} {result['count']:>9,} {unit}"
+                f" {result['bytes'] / 1e6:8.1f} MB"
+                f"（ブロック {result['blocks']:>10,}、ピーク"
+                f" {result['peak_bytes'] / 1e6:.1f} MB） RSS {rss}"
+            )
+        before, after = measured["before"], measured["after"]
+        print(
+            f"  {kind_label} 削減: {1 - after['bytes'] / before['bytes']:.1%}"
+            f"（ブロック {1 - after['blocks'] / before['blocks']:.1%}）"
+        )
+
+
+def print_usage():
+    """使用方法を表示"""
+    print("使用方法: python benchmark_parsers.py [オプション]")
+    print("  --number: 1回の計測で繰り返す回数（デフォルト: 5、1年分は1回）")
+    print("  --repeat: 計測の回数（最短の時間を使う、デフォルト: 5、1年分は1回）")
+    print(f"  --full: {FULL_YEAR[0].year}年の1年分のファイルでも計測")
+    print(f"  --save-baseline: 計測結果を基準として保存（{BASELINE_FILE}）")
+    print("  --compare: 基準と比較し、しきい値を超えて遅くなった項目があれば終了コード1")
+    print("             （しきい値は計測のばらつきの分だけ広げる。1年分の項目は参考）")
+    print(f"  --baseline: 基準のファイル（デフォルト: {BASELINE_FILE}）")
+    print(f"  --threshold: 回帰とする遅くなった割合（デフォルト: {DEFAULT_THRESHOLD}）")
+    print("  --patterns: 1行あたりの正規表現のコストも計測（事前コンパイルとの比較）")
+    print("  --memory: 1年分の解析結果をメモリに持った場合のメモリ使用量を計測")
+    print("            （変更前の形の辞書・リストとの比較）")
+
+
+def parse_args(args: List[str]) -> Dict[str, str]:
+    """コマンドライン引数を解析"""
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS:
+            if i + 1 >= len(args):
+                raise ValueError(f"{arg} の値を指定してください")
+            options[arg] = args[i + 1]
+            i += 2
+        elif arg in FLAG_OPTIONS:
+            options[arg] = ""
+            i += 1
+        else:
+            raise ValueError(f"不明な引数です: {arg}")
+    return options
+
+
+def main():
+    """メイン関数"""
+    if "--help" in sys.argv or "-h" in sys.argv:
+        print_usage()
+        return 0
+
+    try:
+        options = parse_args(sys.argv[1:])
+        number = int(options.get("--number", 5))
+        repeat = int(options.get("--repeat", 5))
+        threshold = float(options.get("--threshold", DEFAULT_THRESHOLD))
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        return 1
+
+    baseline_file = options.get("--baseline", BASELINE_FILE)
+    if "--compare" in options and not os.path.exists(baseline_file):
+        print(f"エラー: 基準のファイルが見つかりません: {baseline_file}")
+        return 1
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            sample_cases = build_cases("sample", list(SAMPLE_DAYS), work_dir)
+            full_cases: Optional[List[BenchmarkCase]] = None
+            if "--full" in options:
+                full_cases = build_cases("full", day_range(*FULL_YEAR), work_dir)
+        except FileNotFoundError as e:
+            print(f"エラー: 入力ファイルが見つかりません: {e.filename}")
+            return 1
+
+        days = ", ".join(f"{y}-{m:02d}-{d:02d}" for y, m, d in SAMPLE_DAYS)
+        print(f"固定の日（{days}）")
+        results = run_cases(sample_cases, number, repeat)
+        print_speedup(results, "sample")
+        print_fallbacks(list(SAMPLE_DAYS))
+        if full_cases is not None:
+            print(f"1年分（{FULL_YEAR[0]} 〜 {FULL_YEAR[1]}）")
+            # 1回だけの計測はばらつきがわからないため、回帰の判定には使わない
+            results.update(run_cases(full_cases, 1, 1, gate=False))
+            print_speedup(results, "full")
+            print_fallbacks(day_range(*FULL_YEAR))
+
+    if "--patterns" in options:
+        print()
+        bench_line_patterns(number, repeat)
+
+    if "--memory" in options:
+        print(f"\n1年分の解析結果のメモリ使用量（{FULL_YEAR[0]} 〜 {FULL_YEAR[1]}）")
+        try:
+            bench_memory(day_range(*FULL_YEAR))
+        except FileNotFoundError as e:
+            print(f"エラー: 入力ファイルが見つかりません: {e.filename}")
+            return 1
+
+    if "--save-baseline" in options:
+        save_baseline(results, baseline_file)
+        print(f"\n基準を保存しました: {baseline_file}")
+
+    if "--compare" in options:
+        print(f"\n基準との比較（しきい値: {threshold:+.0%}）")
+        regressions = compare_baseline(results, baseline_file, threshold)
+        if regressions:
+            print(f"回帰: {len(regressions)}項目が基準より遅くなっています")
+            return 1
+        print("回帰はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学習データセット作成プログラム
+
+出走表テーブル（data/race_entries.csv）・レース結果データ（race_results.csv）から、
+レース単位に揃えた配列を作成し、月ごとのディレクトリに .npy で保存する。
+学習時は CSV を読み直して結合し直さずに、np.load のメモリマップで読み込める。
+
+出力（data/dataset/YYYY-MM/）:
+- X.npy: 特徴量 float32 [レース数, 6艇, 特徴量数]（艇は1号艇〜6号艇の順）
+- positions.npy: 着順 int8 [レース数, 6艇]（失格・フライングなどは0）
+- trifecta.npy: 3連単の1着・2着・3着の艇番 int8 [レース数, 3]（該当なしは0）
+- races.npy: レースの索引（日付 YYYYMMDD, レース場番号, レース番号）[レース数]
+特徴量名などは data/dataset/meta.json に保存する。
+
+特徴量は出走表の数値項目（年齢・級別・勝率など）と、race_features.py の
+選手・モーター・ボートごとの直近の成績（対象レースの前日までの結果で集計）。
+レース結果のないレース（中止など）は含めない。
+
+例:
+    python build_dataset.py
+    arrays = load_dataset(date(2024, 1, 1), date(2024, 3, 31))
+"""
+
+import json
+import os
+import sys
+from datetime import date
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from race_features import (
+    ENTRIES_FILE,
+    RACE_KEYS,
+    RESULT_RENAMES,
+    RESULTS_FILE,
+    build_features,
+    read_entries,
+    read_results,
+)
+
+# 出力先
+DATASET_DIR = "data/dataset"
+
+# データセットの形式のバージョン
+DATASET_VERSION = 1
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = ("--entries", "--results", "--output")
+
+# 1レースの艇数
+BOATS = 6
+
+# 特徴量にする出走表の列（支部などの文字列の列は除く）
+ENTRY_FEATURES = [
+    "年齢",
+    "体重",
+    "級別",
+    "全国勝率",
+    "全国2連率",
+    "当地勝率",
+    "当地2連率",
+    "モーター2連率",
+    "ボート2連率",
+]
+
+# 月ごとのディレクトリに保存する配列
+ARRAY_NAMES = ("X", "positions", "trifecta", "races")
+
+# レースの索引の型
+RACE_DTYPE = np.dtype([("date", "i4"), ("track", "i1"), ("race", "i1")])
+
+
+def read_positions(path: str = RESULTS_FILE) -> pd.DataFrame:
+    """レース結果データから各艇の着順を読み込む（失格・フライングなどは0）"""
+    results = pd.read_csv(
+        path,
+        usecols=["年", "月", "日", "競艇場番号", "レース番号", "艇", "着"],
+        dtype={"着": str},
+    ).rename(columns=RESULT_RENAMES)
+    position = pd.to_numeric(results.pop("着"), errors="coerce")
+    results["着順"] = position.where(position.between(1, BOATS), 0).astype(np.int8)
+    return results
+
+
+def build_arrays(
+    entries_file: str = ENTRIES_FILE, results_file: str = RESULTS_FILE
+) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """出走表・レース結果から、レース単位に揃えた配列と特徴量名を作成"""
+    entries = read_entries(entries_file)
+    features = build_features(entries, read_results(results_file))
+    feature_names = ENTRY_FEATURES + [
+        column for column in features.columns if column not in RACE_KEYS
+    ]
+
+    table = (
+        pd.read_csv(entries_file, usecols=RACE_KEYS + ENTRY_FEATURES)
+        .merge(features, on=RACE_KEYS, how="left")
+        .merge(read_positions(results_file), on=RACE_KEYS, how="left")
+        .sort_values(RACE_KEYS, kind="stable")
+        .reset_index(drop=True)
+    )
+
+    # 6艇そろっていて、レース結果のあるレースだけを残す
+    race_keys = RACE_KEYS[:5]
+    boats = table.groupby(race_keys, sort=False)["艇"].transform("size")
+    finished = table["着順"].notna().groupby(
+        [table[key] for key in race_keys], sort=False
+    ).transform("any")
+    keep = (boats == BOATS) & finished
+    table = table[keep.to_numpy()]
+    race_count = len(table) // BOATS
+
+    X = (
+        table[feature_names]
+        .to_numpy(dtype=np.float32, na_value=np.nan)
+        .reshape(race_count, BOATS, len(feature_names))
+    )
+    positions = (
+        table["着順"].fillna(0).to_numpy(dtype=np.int8).reshape(race_count, BOATS)
+    )
+
+    # 3連単: 1〜3着の艇番（同着の場合は艇番の小さい艇、該当なしは0）
+    trifecta = np.zeros((race_count, 3), dtype=np.int8)
+    for rank in range(1, 4):
+        mask = positions == rank
+        trifecta[:, rank - 1] = np.where(mask.any(axis=1), mask.argmax(axis=1) + 1, 0)
+
+    first = table.iloc[::BOATS]
+    race_index = np.zeros(race_count, dtype=RACE_DTYPE)
+    race_index["date"] = (
+        first["年"] * 10000 + first["月"] * 100 + first["日"]
+    ).to_numpy()
+    race_index["track"] = first["レース場番号"].to_numpy()
+    race_index["race"] = first["レース番号"].to_numpy()
+
+    arrays = {
+        "X": np.ascontiguousarray(X),
+        "positions": positions,
+        "trifecta": trifecta,
+        "races": race_index,
+    }
+    return arrays, feature_names
+
+
+def month_slices(race_index: np.ndarray) -> Iterator[Tuple[str, slice]]:
+    """日付順のレースの索引を月ごとの範囲（"YYYY-MM", slice）に分ける"""
+    months = race_index["date"] // 100
+    boundaries = np.flatnonzero(np.diff(months)) + 1
+    starts = np.r_[0, boundaries]
+    ends = np.r_[boundaries, len(months)]
+    for start, end in zip(starts, ends):
+        month = int(months[start])
+        yield f"{month // 100:04d}-{month % 100:02d}", slice(int(start), int(end))
+
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """配列を .npy で保存（一時ファイルに書いてから置き換える）"""
+    temp_file = path + ".tmp"
+    with open(temp_file, "wb") as f:
+        np.save(f, array)
+    os.replace(temp_file, path)
+
+
+def save_dataset(
+    arrays: Dict[str, np.ndarray], feature_names: List[str], output_dir: str
+) -> Dict[str, int]:
+    """配列を月ごとのディレクトリに保存し、月 → レース数を返す"""
+    months = {}
+    for month, rows in month_slices(arrays["races"]):
+        month_dir = os.path.join(output_dir, month)
+        os.makedirs(month_dir, exist_ok=True)
+        for name in ARRAY_NAMES:
+            save_array(os.path.join(month_dir, f"{name}.npy"), arrays[name][rows])
+        months[month] = rows.stop - rows.start
+
+    meta_file = os.path.join(output_dir, "meta.json")
+    with open(meta_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": DATASET_VERSION,
+                "features": feature_names,
+                "boats": BOATS,
+                "months": months,
+            },
+            f,
+            ensure_ascii=False,
+            indent=1,
+        )
+    os.replace(meta_file + ".tmp", meta_file)
+    return months
+
+
+def load_dataset(
+    start: date, end: date, directory: str = DATASET_DIR
+) -> Dict[str, np.ndarray]:
+    """期間内のレースの配列を読み込む
+
+    各月のファイルはメモリマップで開き、期間はレースの索引の二分探索で切り出す。
+    期間が1か月に収まる場合はコピーせずにメモリマップのまま返す
+    """
+    with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+        months = json.load(f)["months"]
+
+    first = start.year * 10000 + start.month * 100 + start.day
+    last = end.year * 10000 + end.month * 100 + end.day
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in ARRAY_NAMES}
+    for month in sorted(months):
+        month_key = int(month.replace("-", ""))
+        if month_key < first // 100 or month_key > last // 100:
+            continue
+        month_dir = os.path.join(directory, month)
+        races = np.load(os.path.join(month_dir, "races.npy"), mmap_mode="r")
+        rows = slice(
+            int(np.searchsorted(races["date"], first, side="left")),
+            int(np.searchsorted(races["date"], last, side="right")),
+        )
+        for name in ARRAY_NAMES:
+            array = np.load(os.path.join(month_dir, f"{name}.npy"), mmap_mode="r")
+            parts[name].append(array[rows])
+
+    arrays = {}
+    for name, shards in parts.items():
+        if len(shards) == 1:
+            arrays[name] = shards[0]
+        elif shards:
+            arrays[name] = np.concatenate(shards)
+        else:
+            arrays[name] = None
+    return arrays
+
+
+def print_usage():
+    """使用方法を表示"""
+    print("使用方法: python build_dataset.py [オプション]")
+    print(f"  --entries: 出走表テーブル（デフォルト: {ENTRIES_FILE}）")
+    print(f"  --results: レース結果データ（デフォルト: {RESULTS_FILE}）")
+    print(f"  --output: 出力ディレクトリ（デフォルト: {DATASET_DIR}）")
+
+
+def parse_args(args: List[str]) -> Dict[str, str]:
+    """コマンドライン引数を解析"""
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg not in VALUE_OPTIONS:
+            raise ValueError(f"不明な引数です: {arg}")
+        if i + 1 >= len(args):
+            raise ValueError(f"{arg} の値を指定してください")
+        options[arg] = args[i + 1]
+        i += 2
+    return options
+
+
+def main():
+    """メイン関数"""
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        sys.exit(1)
+
+    output_dir = options.get("--output", DATASET_DIR)
+    try:
+        arrays, feature_names = build_arrays(
+            options.get("--entries", ENTRIES_FILE),
+            options.get("--results", RESULTS_FILE),
+        )
+    except FileNotFoundError as e:
+        print(f"エラー: ファイルが見つかりません: {e.filename}")
+        sys.exit(1)
+
+    months = save_dataset(arrays, feature_names, output_dir)
+    print(
+        f"作成完了: {len(arrays['races'])}レース・特徴量{len(feature_names)}列を "
+        f"{output_dir} に{len(months)}か月分出力しました"
+    )
+
+
+if __name__ == "__main__":
+    main()
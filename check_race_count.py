@@ -7,29 +7,133 @@
 """
 
 import csv
+import os
+import sqlite3
 import sys
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
+
+from race_parser import TRACKS
+
+# 1日に開催されるレース番号（1-12レース）
+EXPECTED_RACES = list(range(1, 13))
+
+# 1-12レースがすべてそろっている場合のビットマスク（ビット1〜12）
+FULL_MASK = sum(1 << race for race in EXPECTED_RACES)
+
+# チェックに使う列
+KEY_COLUMNS = ["年", "月", "日", "レース場番号", "レース番号"]
+
+
+def mask_to_races(mask: int) -> List[int]:
+    """ビットマスクを昇順のレース番号のリストに変換"""
+    return [race for race in EXPECTED_RACES if mask >> race & 1]
+
+
+class RaceBitmap:
+    """(年, 月, 日, レース場番号) ごとのレース番号を、12ビットのビットマスクで保持
+
+    同じレース番号の重複や1-12以外のレース番号が出てきた組み合わせだけ、
+    レース番号のリストに切り替えて保持する（レポートの内容を変えないため）
+    """
+
+    def __init__(self):
+        self.masks: Dict[Tuple, int] = {}
+        self.lists: Dict[Tuple, List[int]] = {}
+
+    def add(self, key: Tuple, race: int) -> None:
+        """レースを1件追加"""
+        races = self.lists.get(key)
+        if races is not None:
+            races.append(race)
+            return
+
+        mask = self.masks.get(key, 0)
+        bit = 1 << race if 1 <= race <= 12 else 0
+        if bit and not mask & bit:
+            self.masks[key] = mask | bit
+            return
+
+        # 重複または範囲外: ここまでのレースは1-12で重複がないため、順序は問わない
+        self.masks[key] = mask
+        self.lists[key] = mask_to_races(mask) + [race]
+
+    def summaries(self) -> List[Tuple[Tuple, int, List[int], List[int], List[int]]]:
+        """キー順に (キー, レース数, 昇順のレース番号, 欠けているレース, 余分なレース)"""
+        result = []
+        for key in sorted(self.masks):
+            races = self.lists.get(key)
+            if races is None:
+                mask = self.masks[key]
+                if mask == FULL_MASK:
+                    result.append((key, 12, EXPECTED_RACES, [], []))
+                    continue
+                races_sorted = mask_to_races(mask)
+                missing = mask_to_races(FULL_MASK & ~mask)
+                result.append((key, len(races_sorted), races_sorted, missing, []))
+            else:
+                mask = self.masks[key]
+                for race in races:
+                    if 1 <= race <= 12:
+                        mask |= 1 << race
+                missing = mask_to_races(FULL_MASK & ~mask)
+                extra = [race for race in races if not 1 <= race <= 12]
+                result.append((key, len(races), sorted(races), missing, extra))
+        return result
+
+
+def iter_races_csv(csv_file: str) -> Iterable[Tuple[Tuple, int]]:
+    """CSVファイルから ((年, 月, 日, レース場番号), レース番号) を1行ずつ生成"""
+    with open(csv_file, "r", encoding="utf-8") as f:
+        header = next(csv.reader([f.readline()]))
+        indexes = [header.index(column) for column in KEY_COLUMNS]
+        year_i, month_i, day_i, track_i, race_i = indexes
+
+        # 必要な列は先頭付近の数値の列なので、行全体をCSVとして解析せずに分割する
+        split_count = max(indexes) + 1
+        for line in f:
+            # 空行は読み飛ばす（csv.DictReader と同じ）
+            if line == "\n":
+                continue
+            row = line.split(",", split_count)
+            yield (
+                (int(row[year_i]), int(row[month_i]), int(row[day_i]), row[track_i]),
+                int(row[race_i]),
+            )
 
 
-def check_race_count(csv_file: str, show_all: bool = False) -> None:
-    """CSVファイル内のレース数をチェック"""
-    # データ構造: {(年, 月, 日, レース場番号): [レース番号のリスト]}
-    race_data = defaultdict(list)
+def iter_races_sqlite(db_file: str) -> Iterable[Tuple[Tuple, int]]:
+    """SQLiteデータベース（convert_program.py --format sqlite）の programs テーブルから
+    ((年, 月, 日, レース場番号), レース番号) を生成"""
+    if not os.path.exists(db_file):
+        raise FileNotFoundError(db_file)
 
+    connection = sqlite3.connect(db_file)
     try:
-        with open(csv_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
+        for race_date, track, race in connection.execute(
+            "SELECT race_date, track, race FROM programs"
+        ):
+            year, month, day = (int(value) for value in race_date.split("-"))
+            yield (year, month, day, f"{track:02d}"), race
+    finally:
+        connection.close()
+
 
-            for row in reader:
-                year = int(row["年"])
-                month = int(row["月"])
-                day = int(row["日"])
-                track_num = row["レース場番号"]
-                race_num = int(row["レース番号"])
+def check_race_count(csv_file: str, show_all: bool = False) -> None:
+    """CSVファイル（またはSQLiteデータベース）内のレース数をチェック"""
+    # データ構造: (年, 月, 日, レース場番号) ごとのレース番号のビットマスク
+    bitmap = RaceBitmap()
+
+    try:
+        if csv_file.endswith(".db"):
+            races = iter_races_sqlite(csv_file)
+        else:
+            races = iter_races_csv(csv_file)
 
-                key = (year, month, day, track_num)
-                race_data[key].append(race_num)
+        # 1回の走査でビットマスクを作成
+        add = bitmap.add
+        for key, race in races:
+            add(key, race)
 
     except FileNotFoundError:
         print(f"エラー: ファイルが見つかりません: {csv_file}")
@@ -38,171 +142,83 @@ def check_race_count(csv_file: str, show_all: bool = False) -> None:
         print(f"エラー: ファイル読み込み中にエラーが発生しました: {e}")
         return
 
-    # レース場番号の名前マッピング
-    track_names = {
-        "01": "桐生",
-        "02": "戸田",
-        "03": "江戸川",
-        "04": "平和島",
-        "05": "多摩川",
-        "06": "浜名湖",
-        "07": "蒲郡",
-        "08": "常滑",
-        "09": "津",
-        "10": "三国",
-        "11": "びわこ",
-        "12": "住之江",
-        "13": "尼崎",
-        "14": "鳴門",
-        "15": "丸亀",
-        "16": "児島",
-        "17": "宮島",
-        "18": "徳山",
-        "19": "下関",
-        "20": "若松",
-        "21": "芦屋",
-        "22": "福岡",
-        "23": "唐津",
-        "24": "大村",
-    }
+    # 各トラック・日付の組み合わせを1度だけ集計し、以降の表示で使い回す
+    summaries = bitmap.summaries()
 
     # 分析結果
-    total_entries = len(race_data)
-    incomplete_tracks = []
-    complete_tracks = []
-    missing_races = []
+    total_entries = len(summaries)
+    incomplete = [s for s in summaries if s[3] or s[4] or s[1] != 12]
+    complete_count = total_entries - len(incomplete)
 
     print("=== レース数チェック結果 ===\n")
 
-    # 各トラック・日付の組み合わせをチェック
-    for key, races in sorted(race_data.items()):
-        year, month, day, track_num = key
-        track_name = track_names.get(track_num, f"不明({track_num})")
-
-        race_count = len(races)
-        races_sorted = sorted(races)
-        expected_races = list(range(1, 13))  # 1-12レース
-
-        date_str = f"{year}年{month:02d}月{day:02d}日"
-        track_info = f"{track_name}({track_num})"
-
-        if race_count == 12 and races_sorted == expected_races:
-            complete_tracks.append((date_str, track_info))
-        else:
-            incomplete_tracks.append((date_str, track_info, race_count, races_sorted))
-
-            # 欠けているレースを特定
-            missing = [r for r in expected_races if r not in races]
-            extra = [r for r in races if r not in expected_races]
-
-            missing_races.append(
-                {
-                    "date": date_str,
-                    "track": track_info,
-                    "count": race_count,
-                    "races": races_sorted,
-                    "missing": missing,
-                    "extra": extra,
-                }
-            )
-
     # 結果表示
     print(f"総チェック対象: {total_entries} トラック・日付")
-    print(f"完全なデータ: {len(complete_tracks)} トラック・日付")
-    print(f"不完全なデータ: {len(incomplete_tracks)} トラック・日付")
+    print(f"完全なデータ: {complete_count} トラック・日付")
+    print(f"不完全なデータ: {len(incomplete)} トラック・日付")
     print()
 
-    # 全てのデータを日付・レース場ごとに表示
+    # 全てのデータ（または不完全なデータのみ）を日付・レース場ごとに表示
     if show_all:
         print("=== 日付・レース場別レース数一覧（全て） ===")
-        current_date = ""
-        for key, races in sorted(race_data.items()):
-            year, month, day, track_num = key
-            track_name = track_names.get(track_num, f"不明({track_num})")
-
-            race_count = len(races)
-            races_sorted = sorted(races)
-            expected_races = list(range(1, 13))  # 1-12レース
-
-            date_str = f"{year}年{month:02d}月{day:02d}日"
-
-            # 日付が変わったら改行
-            if current_date != date_str:
-                if current_date != "":
-                    print()
-                print(f"【{date_str}】")
-                current_date = date_str
-
-            # レース数の状態表示
-            status = "✓" if race_count == 12 and races_sorted == expected_races else "✗"
-            print(f"  {track_name}({track_num}): {race_count}レース {status}")
-
-            # 不完全なデータの場合は詳細表示
-            if race_count != 12 or races_sorted != expected_races:
-                print(f"    実際のレース: {races_sorted}")
-                missing = [r for r in expected_races if r not in races]
-                extra = [r for r in races if r not in expected_races]
-
-                if missing:
-                    print(f"    欠けているレース: {missing}")
-                if extra:
-                    print(f"    余分なレース: {extra}")
+        shown = summaries
     else:
         print("=== 不完全なデータのみ（日付・レース場別） ===")
-        current_date = ""
-        for key, races in sorted(race_data.items()):
-            year, month, day, track_num = key
-            track_name = track_names.get(track_num, f"不明({track_num})")
-
-            race_count = len(races)
-            races_sorted = sorted(races)
-            expected_races = list(range(1, 13))  # 1-12レース
+        shown = incomplete
 
-            # 不完全なデータのみ表示
-            if race_count != 12 or races_sorted != expected_races:
-                date_str = f"{year}年{month:02d}月{day:02d}日"
-
-                # 日付が変わったら改行（不完全データがある場合のみ）
-                if current_date != date_str:
-                    if current_date != "":
-                        print()
-                    print(f"【{date_str}】")
-                    current_date = date_str
-
-                print(f"  {track_name}({track_num}): {race_count}レース ✗")
-                print(f"    実際のレース: {races_sorted}")
+    current_date = ""
+    for key, race_count, races_sorted, missing, extra in shown:
+        year, month, day, track_num = key
+        track_name = TRACKS.get(track_num, f"不明({track_num})")
+        is_complete = race_count == 12 and not missing and not extra
 
-                missing = [r for r in expected_races if r not in races]
-                extra = [r for r in races if r not in expected_races]
+        date_str = f"{year}年{month:02d}月{day:02d}日"
 
-                if missing:
-                    print(f"    欠けているレース: {missing}")
-                if extra:
-                    print(f"    余分なレース: {extra}")
+        # 日付が変わったら改行
+        if current_date != date_str:
+            if current_date != "":
+                print()
+            print(f"【{date_str}】")
+            current_date = date_str
+
+        # レース数の状態表示
+        status = "✓" if is_complete else "✗"
+        print(f"  {track_name}({track_num}): {race_count}レース {status}")
+
+        # 不完全なデータの場合は詳細表示
+        if not is_complete:
+            print(f"    実際のレース: {races_sorted}")
+            if missing:
+                print(f"    欠けているレース: {missing}")
+            if extra:
+                print(f"    余分なレース: {extra}")
 
     print()
 
-    if incomplete_tracks:
+    if incomplete:
         print("=== 不完全なデータのサマリー ===")
-        for entry in missing_races:
+        for key, race_count, races_sorted, missing, extra in incomplete:
+            year, month, day, track_num = key
+            track_name = TRACKS.get(track_num, f"不明({track_num})")
             print(
-                f"{entry['date']} {entry['track']}: {entry['count']}レース (欠け: {entry['missing']}, 余分: {entry['extra']})"
+                f"{year}年{month:02d}月{day:02d}日 {track_name}({track_num}): "
+                f"{race_count}レース (欠け: {missing}, 余分: {extra})"
             )
         print()
 
     # 統計情報
     print("=== 統計情報 ===")
 
-    # 日付別の集計
+    # 日付別・トラック別の集計
     date_stats = defaultdict(lambda: {"total": 0, "complete": 0})
     track_stats = defaultdict(lambda: {"total": 0, "complete": 0})
 
-    for key, races in race_data.items():
+    for key, race_count, races_sorted, missing, extra in summaries:
         year, month, day, track_num = key
         date_key = f"{year}-{month:02d}-{day:02d}"
-        track_name = track_names.get(track_num, f"不明({track_num})")
+        track_name = TRACKS.get(track_num, f"不明({track_num})")
 
-        is_complete = len(races) == 12 and sorted(races) == list(range(1, 13))
+        is_complete = race_count == 12 and not missing and not extra
 
         date_stats[date_key]["total"] += 1
         track_stats[track_name]["total"] += 1
@@ -224,10 +240,8 @@ def check_race_count(csv_file: str, show_all: bool = False) -> None:
         print(f"  {track}: {stats['complete']}/{stats['total']} 日 ({rate:.1f}%)")
 
     # 全体の完了率
-    overall_rate = (
-        (len(complete_tracks) / total_entries) * 100 if total_entries > 0 else 0
-    )
-    print(f"\n全体完了率: {len(complete_tracks)}/{total_entries} ({overall_rate:.1f}%)")
+    overall_rate = (complete_count / total_entries) * 100 if total_entries > 0 else 0
+    print(f"\n全体完了率: {complete_count}/{total_entries} ({overall_rate:.1f}%)")
 
 
 def main():
@@ -248,6 +262,7 @@ def main():
         print(
             "  ファイル名: チェックするCSVファイル（デフォルト: data/race_programs.csv）"
         )
+        print("              .db を指定するとSQLiteデータベースの programs テーブルをチェック")
         print("  --all: 全てのデータを表示（デフォルト: 不完全なデータのみ表示）")
         return
 
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+変換済みファイルのマニフェスト
+
+変換した入力ファイルごとに、パス・サイズ・更新日時・内容のハッシュ（SHA-256）と
+出力した行数を JSON で記録する。
+再実行時は新しいファイル・内容が変わったファイルだけを変換し、
+変換し直す日の行は出力CSVから削除してから追記する（行が重複しない）。
+"""
+
+import csv
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Set, Tuple
+
+# ハッシュ計算時の読み込みサイズ（バイト）
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# マニフェストの形式のバージョン
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output: str, output_format: str = "csv", table: str = "") -> str:
+    """出力先に対応するマニフェストのパスを生成
+
+    CSV出力: data/race_programs.csv → data/race_programs.manifest.json
+    Parquet出力: data/parquet/race_programs → data/parquet/race_programs/_manifest.json
+    SQLite出力: data/boatrace.db → data/boatrace.{table}.manifest.json
+    （番組表・競走成績で同じデータベースを使うため、テーブルごとに分ける）
+    """
+    if output_format == "parquet":
+        # "_" で始まるファイルは pyarrow がデータとして読み込まない
+        return os.path.join(output, "_manifest.json")
+    if output_format == "sqlite":
+        return os.path.splitext(output)[0] + f".{table}.manifest.json"
+    return os.path.splitext(output)[0] + ".manifest.json"
+
+
+def file_hash(path: str) -> str:
+    """ファイル内容のSHA-256を計算"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def day_key(year: int, month: int, day: int) -> str:
+    """マニフェストのキー（YYYY-MM-DD）"""
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+class ConversionManifest:
+    """変換済みファイルのマニフェスト（1日1エントリ）"""
+
+    def __init__(self, path: str, output: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+
+        # 出力先が削除されている場合は、記録を引き継がずに最初から変換する
+        self.exists = os.path.exists(path) and os.path.exists(output)
+
+        if self.exists:
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def is_current(self, input_path: str, year: int, month: int, day: int) -> bool:
+        """入力ファイルが前回の変換から変わっていないかチェック
+
+        サイズ・更新日時が一致すれば変わっていないとみなす。
+        更新日時だけが変わった場合は内容のハッシュで比較する。
+        """
+        entry = self.files.get(day_key(year, month, day))
+        if entry is None:
+            return False
+
+        stat = os.stat(input_path)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime == entry["mtime"]:
+            return True
+
+        # touch されただけ（内容は同じ）の場合は更新日時だけ記録し直す
+        if file_hash(input_path) != entry["sha256"]:
+            return False
+        entry["mtime"] = stat.st_mtime
+        return True
+
+    def has_day(self, year: int, month: int, day: int) -> bool:
+        """その日の行を出力済みかチェック"""
+        return day_key(year, month, day) in self.files
+
+    def days_to_replace(
+        self, days: Iterable[Tuple[int, int, int]]
+    ) -> Set[Tuple[int, int, int]]:
+        """変換する日のうち、出力から行を削除してから書き込むべき日
+
+        マニフェストがまだない場合（導入前に出力したCSVがある場合）は、
+        出力済みかどうか分からないため、変換するすべての日を対象にする
+        """
+        if not self.exists:
+            return set(days)
+        return {(y, m, d) for y, m, d in days if self.has_day(y, m, d)}
+
+    def forget(self, days: Iterable[Tuple[int, int, int]]) -> None:
+        """出力から行を削除した日の記録を消す"""
+        for year, month, day in days:
+            self.files.pop(day_key(year, month, day), None)
+
+    def record(
+        self, input_path: str, year: int, month: int, day: int, rows: int
+    ) -> None:
+        """変換したファイルを記録"""
+        stat = os.stat(input_path)
+        self.files[day_key(year, month, day)] = {
+            "path": input_path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_hash(input_path),
+            "rows": rows,
+        }
+
+    def save(self) -> None:
+        """マニフェストを保存（一時ファイルに書いてから置き換える）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "files": dict(sorted(self.files.items())),
+                },
+                f,
+                ensure_ascii=False,
+                indent=1,
+            )
+        os.replace(temp_file, self.path)
+        self.exists = True
+
+
+def remove_days_from_csv(output_file: str, days: Set[Tuple[int, int, int]]) -> int:
+    """出力CSVから指定した日（先頭3列の年・月・日）の行を削除し、削除した行数を返す
+
+    削除する行がなければファイルは書き換えない
+    """
+    if not days or not os.path.exists(output_file):
+        return 0
+
+    keys = {(str(y), str(m), str(d)) for y, m, d in days}
+
+    with open(output_file, "r", newline="", encoding="utf-8") as f:
+        if not any(tuple(row[:3]) in keys for row in csv.reader(f)):
+            return 0
+
+    # 一時ファイルに残す行だけを書き、元のファイルと置き換える
+    removed = 0
+    temp_file = output_file + ".tmp"
+    with open(output_file, "r", newline="", encoding="utf-8") as src, open(
+        temp_file, "w", newline="", encoding="utf-8"
+    ) as dst:
+        writer = csv.writer(dst)
+        for row in csv.reader(src):
+            if tuple(row[:3]) in keys:
+                removed += 1
+                continue
+            writer.writerow(row)
+    os.replace(temp_file, output_file)
+    return removed
+
+
+def split_targets(
+    manifest: ConversionManifest, targets: List[Tuple[int, int, int, str]]
+) -> Tuple[List[Tuple[int, int, int, str]], int]:
+    """変換対象を、変換が必要なものだけに絞り込む
+
+    戻り値は (変換が必要な対象, 変更がないためスキップする数)
+    入力ファイルが見つからない対象は、呼び出し元で警告できるよう残す
+    """
+    pending = []
+    for target in targets:
+        year, month, day, input_path = target
+        if os.path.exists(input_path) and manifest.is_current(
+            input_path, year, month, day
+        ):
+            continue
+        pending.append(target)
+    return pending, len(targets) - len(pending)
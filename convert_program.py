@@ -7,42 +7,111 @@
 CSV形式の番組表データに変換する
 """
 
+import contextlib
 import csv
 import os
-import re
 import sys
-from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from conversion_manifest import (
+    ConversionManifest,
+    manifest_path,
+    remove_days_from_csv,
+    split_targets,
+)
+from parquet_output import (
+    ENTRIES_PARQUET_DIR,
+    PROGRAMS_PARQUET_DIR,
+    require_pyarrow,
+    write_entries_parquet,
+    write_programs_parquet,
+)
+from pipeline_profile import (
+    PROFILE_ENV,
+    FileProfile,
+    PipelineProfiler,
+    create_profiler,
+)
+from race_io import ENCODINGS, directory_raw_files, open_raw, raw_file_path
+from race_parser import (
+    TRACK_NUMBERS,
+    ProgramBoat,
+    ProgramRace,
+    ProgramRaceHeader,
+    find_track_number,
+    parse_deadline,
+    parse_program_boat,
+    parse_program_lines,
+    parse_program_race_header,
+)
+from race_patterns import PROGRAM_FILE_PATTERN
+from sqlite_store import SQLITE_PATH, SqliteStore
+
+# 一括変換時の出力バッファサイズ（バイト）
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = ("--from", "--to", "--dir", "--format", "--encoding")
+
+# 値を取らないコマンドラインオプション
+FLAG_OPTIONS = ("--entries", "--incremental", "--profile", "--cprofile")
+
+# 出力形式
+OUTPUT_FORMATS = ("csv", "parquet", "sqlite")
+
+# 1艇あたりの列数（選手登番〜ボート2連率）
+BOAT_COLUMN_COUNT = 13
+
+# 級別の整数コード（出走表テーブル用）
+CLASS_CODES = {"A1": 1, "A2": 2, "B1": 3, "B2": 4}
+
+
+def to_number(value: str, number_type: type) -> Any:
+    """数値に変換（空文字・数値でない値は空文字のまま）"""
+    try:
+        return number_type(value)
+    except ValueError:
+        return ""
 
 
 class ProgramConverter:
-    def __init__(self):
-        # レース場番号のマッピング
-        self.track_mapping = {
-            "桐生": "01",
-            "戸田": "02",
-            "江戸川": "03",
-            "平和島": "04",
-            "多摩川": "05",
-            "浜名湖": "06",
-            "蒲郡": "07",
-            "常滑": "08",
-            "津": "09",
-            "三国": "10",
-            "びわこ": "11",
-            "住之江": "12",
-            "尼崎": "13",
-            "鳴門": "14",
-            "丸亀": "15",
-            "児島": "16",
-            "宮島": "17",
-            "徳山": "18",
-            "下関": "19",
-            "若松": "20",
-            "芦屋": "21",
-            "福岡": "22",
-            "唐津": "23",
-            "大村": "24",
-        }
+    def __init__(
+        self,
+        input_dir: str = "data/raw/programs",
+        output_file: str = "data/race_programs.csv",
+        output_format: str = "csv",
+        parquet_dir: str = PROGRAMS_PARQUET_DIR,
+        entries: bool = False,
+        entries_file: str = "data/race_entries.csv",
+        entries_parquet_dir: str = ENTRIES_PARQUET_DIR,
+        incremental: bool = False,
+        sqlite_path: str = SQLITE_PATH,
+        encoding: str = "auto",
+        profiler: Optional[PipelineProfiler] = None,
+    ):
+        self.input_dir = input_dir
+        self.output_file = output_file
+        self.output_format = output_format
+        self.parquet_dir = parquet_dir
+        self.sqlite_path = sqlite_path
+
+        # 1艇1行の出走表テーブルも出力するか
+        self.entries = entries
+        self.entries_file = entries_file
+        self.entries_parquet_dir = entries_parquet_dir
+
+        # マニフェストに記録済みで変更のない入力ファイルをスキップするか
+        self.incremental = incremental
+
+        # 入力ファイルの文字コード（auto: ファイルの先頭から判定）
+        self.encoding = encoding
+
+        # 段階別の処理時間の計測（--profile、計測しない場合は None）
+        self.profiler = profiler
+
+        # レース場名 → レース場番号（race_parser の表を共有する）
+        self.track_mapping = TRACK_NUMBERS
 
         # 出力CSVのヘッダー
         self.csv_headers = [
@@ -76,301 +145,547 @@ class ProgramConverter:
                 ]
             )
 
+        # 出走表テーブル（1艇1行）のヘッダー
+        self.entries_headers = [
+            "年",
+            "月",
+            "日",
+            "レース場番号",
+            "レース番号",
+            "艇",
+            "選手登番",
+            "年齢",
+            "支部",
+            "体重",
+            "級別",
+            "全国勝率",
+            "全国2連率",
+            "当地勝率",
+            "当地2連率",
+            "モーター番号",
+            "モーター2連率",
+            "ボート番号",
+            "ボート2連率",
+        ]
+
+    def get_input_file(self, year: int, month: int, day: int) -> str:
+        """年月日から番組表ファイルのパスを生成（Shift_JIS のファイルを優先）"""
+        return raw_file_path(self.input_dir, "b", year, month, day)
+
     def extract_track_number(self, text: str) -> Optional[str]:
         """レース場名からレース場番号を抽出"""
-        for track_name, track_num in self.track_mapping.items():
-            if track_name in text:
-                return track_num
-        return None
+        return find_track_number(text)
 
     def parse_time(self, time_str: str) -> str:
         """投票締切時間を解析してHH:MM形式に変換"""
-        # 全角数字を半角に変換
-        time_str = time_str.translate(
-            str.maketrans("０１２３４５６７８９：", "0123456789:")
-        )
-
-        # 時間パターンをマッチ
-        pattern = r"(\d{1,2})[：:](\d{2})"
-        match = re.search(pattern, time_str)
-        if match:
-            hour = match.group(1).zfill(2)
-            minute = match.group(2)
-            return f"{hour}:{minute}"
-        return ""
+        return parse_deadline(time_str)
 
-    def parse_boat_data(self, line: str) -> Optional[Dict]:
+    def parse_boat_data(self, line: str) -> Optional[ProgramBoat]:
         """艇の情報を固定位置で直接抽出"""
-        # 行の長さをチェック（最低限ボート2連率まで取得できる長さ）
-        if len(line) < 58:
-            return None
-
-        # 区切り線やヘッダー行を除外
-        line_stripped = line.strip()
-        if (
-            line_stripped.startswith("-")
-            or "選手" in line_stripped
-            or "登番" in line_stripped
-            or "番号" in line_stripped
-        ):
-            return None
+        return parse_program_boat(line)
 
-        try:
-            # 艇番（最初の1文字）
-            boat_number = line[0:1].strip()
-
-            # 艇番が数字でない場合は無効
-            if not boat_number.isdigit():
-                return None
-
-            # 選手情報を固定位置で直接抽出
-            player_id = line[2:6].strip()  # 選手登番
-            player_name = line[6:10].strip()  # 選手名
-            age = line[10:12].strip()  # 年齢
-            branch = line[12:14].strip()  # 支部
-            weight = line[14:16].strip()  # 体重
-            player_class = line[16:18].strip()  # 級別
-
-            # 選手登番が4桁の数字でない場合は無効
-            if not (player_id.isdigit() and len(player_id) == 4):
-                return None
-
-            # 固定位置での数値抽出
-            national_win_rate = line[19:23].strip()
-            national_2nd_rate = line[24:29].strip()
-            local_win_rate = line[30:34].strip()
-            local_2nd_rate = line[35:40].strip()
-            motor_number = line[41:43].strip()
-            motor_2nd_rate = line[44:49].strip()
-            boat_number_actual = line[50:52].strip()
-            boat_2nd_rate = line[53:58].strip() if len(line) >= 58 else ""
-
-            return {
-                "boat_number": boat_number,
-                "player_id": player_id,
-                "player_name": player_name,
-                "age": age,
-                "branch": branch,
-                "weight": weight,
-                "class": player_class,
-                "national_win_rate": national_win_rate,
-                "national_2nd_rate": national_2nd_rate,
-                "local_win_rate": local_win_rate,
-                "local_2nd_rate": local_2nd_rate,
-                "motor_number": motor_number,
-                "motor_2nd_rate": motor_2nd_rate,
-                "boat_number_actual": boat_number_actual,
-                "boat_2nd_rate": boat_2nd_rate,
-            }
-
-        except (IndexError, ValueError):
-            return None
-
-    def parse_race_header(self, line: str) -> Optional[Tuple[str, str, str, str]]:
+    def parse_race_header(self, line: str) -> Optional[ProgramRaceHeader]:
         """レースヘッダー情報を解析"""
-        # 全角数字を半角に変換
-        converted_line = line.translate(
-            str.maketrans("０１２３４５６７８９Ｒ", "0123456789R")
-        )
+        return parse_program_race_header(line)
+
+    def parse_file(
+        self, input_file: str, year: int, month: int, day: int
+    ) -> List[ProgramRace]:
+        """番組表ファイルを解析してレースデータのリストを返す"""
+        with open_raw(input_file, self.encoding) as f:
+            return self.parse_lines(f, year, month, day)
+
+    def parse_target(
+        self, input_file: str, year: int, month: int, day: int
+    ) -> Tuple[List[ProgramRace], Optional[FileProfile]]:
+        """番組表ファイルを解析し、(レースデータのリスト, 計測結果) を返す
+
+        計測する場合はファイルを1度に読み込んで段階ごとに解析する（計測しない場合は None）
+        """
+        if self.profiler is None:
+            return self.parse_file(input_file, year, month, day), None
+
+        profile = self.profiler.file(input_file)
+        lines = profile.read_lines(self.encoding)
+        with profile.stage("parse"):
+            races = self.parse_lines(lines, year, month, day)
+        profile.rows = len(races)
+        return races, profile
+
+    def parse_lines(
+        self, lines: Iterable[str], year: int, month: int, day: int
+    ) -> List[ProgramRace]:
+        """番組表の各行を1パスで解析してレースデータのリストを返す"""
+        return parse_program_lines(lines, year, month, day)
+
+    def build_row(self, race: ProgramRace) -> List:
+        """レースデータをCSVの1行に変換"""
+        row = [
+            race.year,
+            race.month,
+            race.day,
+            race.track_number,
+            race.race_number,
+            race.distance,
+            race.time,
+        ]
 
-        # レース番号を抽出（全角・半角両対応）
-        race_match = re.search(r"(\d{1,2})R", converted_line)
-        if not race_match:
-            # 全角数字のRパターンも試す
-            race_match = re.search(r"[　\s]*([０１２３４５６７８９]+)[Ｒ]", line)
-            if race_match:
-                # 全角数字を半角に変換
-                race_number = race_match.group(1).translate(
-                    str.maketrans("０１２３４５６７８９", "0123456789")
+        # 6艇分のデータを追加
+        for boat in race.boats:
+            if boat is not None:
+                # 選手登番〜ボート2連率（艇番・選手名以外の項目）
+                row.extend(
+                    [
+                        boat.player_id,
+                        boat.age,
+                        boat.branch,
+                        boat.weight,
+                        boat.player_class,
+                        boat.national_win_rate,
+                        boat.national_2nd_rate,
+                        boat.local_win_rate,
+                        boat.local_2nd_rate,
+                        boat.motor_number,
+                        boat.motor_2nd_rate,
+                        boat.boat_number_actual,
+                        boat.boat_2nd_rate,
+                    ]
                 )
             else:
-                return None
+                # データがない場合は1艇分の列数だけ空文字で埋める
+                row.extend([""] * BOAT_COLUMN_COUNT)
+
+        return row
+
+    def build_entry_rows(self, race: ProgramRace) -> List[List]:
+        """レースデータを出走表テーブルの行（1艇1行）に変換
+
+        数値項目は数値に変換し、レース場番号・級別は整数コードにする
+        （例: レース場番号 "01" → 1、級別 "B1" → 3）
+        (年, 月, 日, レース場番号, レース番号, 艇) で race_results と結合できる
+        """
+        race_key = [
+            race.year,
+            race.month,
+            race.day,
+            int(race.track_number),
+            int(race.race_number),
+        ]
+
+        rows = []
+        for boat_num, boat in enumerate(race.boats, 1):
+            if boat is None:
+                continue
+            rows.append(
+                race_key
+                + [
+                    boat_num,
+                    int(boat.player_id),
+                    to_number(boat.age, int),
+                    boat.branch,
+                    to_number(boat.weight, int),
+                    CLASS_CODES.get(boat.player_class, ""),
+                    to_number(boat.national_win_rate, float),
+                    to_number(boat.national_2nd_rate, float),
+                    to_number(boat.local_win_rate, float),
+                    to_number(boat.local_2nd_rate, float),
+                    to_number(boat.motor_number, int),
+                    to_number(boat.motor_2nd_rate, float),
+                    to_number(boat.boat_number_actual, int),
+                    to_number(boat.boat_2nd_rate, float),
+                ]
+            )
+        return rows
+
+    def open_csv(self, output_file: str, headers: List[str]) -> Tuple[Any, Any]:
+        """CSVファイルを追記モードで開く（新規作成時はヘッダーを書き込む）"""
+        file_exists = os.path.exists(output_file)
+
+        csvfile = open(
+            output_file,
+            "a",
+            newline="",
+            encoding="utf-8",
+            buffering=WRITE_BUFFER_SIZE,
+        )
+        writer = csv.writer(csvfile)
+
+        # ヘッダーを書き込み（ファイルが新規作成の場合）
+        if not file_exists:
+            writer.writerow(headers)
+
+        return csvfile, writer
+
+    def open_output(self) -> Tuple[ContextManager, Any]:
+        """出力CSVファイルを追記モードで開く（新規作成時はヘッダーを書き込む）
+
+        Parquet出力の場合はファイルを開かず、(何もしないコンテキスト, None) を返す
+        SQLite出力の場合は (データベース, データベース) を返す
+        """
+        if self.output_format == "parquet":
+            require_pyarrow()
+            return contextlib.nullcontext(), None
+        if self.output_format == "sqlite":
+            store = SqliteStore(self.sqlite_path)
+            return store, store
+        return self.open_csv(self.output_file, self.csv_headers)
+
+    def open_entries_output(self) -> Tuple[ContextManager, Any]:
+        """出走表テーブルのCSVファイルを追記モードで開く
+
+        出走表テーブルを出力しない場合、またはCSV出力でない場合は
+        (何もしないコンテキスト, None) を返す
+        """
+        if not self.entries or self.output_format != "csv":
+            return contextlib.nullcontext(), None
+        return self.open_csv(self.entries_file, self.entries_headers)
+
+    def write_races(
+        self,
+        writer: Any,
+        entries_writer: Any,
+        races: List[ProgramRace],
+        year: int,
+        month: int,
+        day: int,
+    ) -> None:
+        """1日分のレースデータを出力（CSVは追記、Parquetは日単位のファイル）
+
+        SQLiteの場合は、出走表テーブルも常に格納する
+        """
+        rows = [self.build_row(race) for race in races]
+        if self.output_format == "sqlite":
+            entry_rows = [row for race in races for row in self.build_entry_rows(race)]
+            writer.replace_programs(year, month, day, rows, entry_rows)
+            return
+
+        if self.output_format == "parquet":
+            write_programs_parquet(rows, year, month, day, self.parquet_dir)
         else:
-            race_number = race_match.group(1)
-
-        # 距離を抽出（H1800m形式）
-        distance_match = re.search(r"[HＨ](\d+)[mｍ]", converted_line)
-        distance = distance_match.group(1) if distance_match else ""
-
-        # 投票締切時間を抽出
-        time = self.parse_time(line)
-
-        # レース名はデフォルト値
-        race_name = "予選"
-
-        return race_number, race_name, distance, time
-
-    def process_race_section(self, lines: List[str], start_idx: int) -> Optional[Dict]:
-        """レース区間を処理"""
-        race_data = None
-        boats = {}
-
-        i = start_idx
-        while i < len(lines):
-            line = lines[i].strip()
-
-            # 次のレースの開始または区間終了
-            if re.match(r".*\d+Ｒ.*", line) and i > start_idx:
-                break
-            if line.startswith("BEND") or line.startswith("FINALB"):
-                break
-
-            # レースヘッダーの解析
-            if ("Ｒ" in line or "R" in line) and "電話投票締切予定" in line:
-                race_info = self.parse_race_header(line)
-                if race_info:
-                    race_number, race_name, distance, time = race_info
-                    race_data = {
-                        "race_number": race_number,
-                        "race_name": race_name,
-                        "distance": distance,
-                        "time": time,
-                    }
-
-            # 艇データの解析
-            boat_data = self.parse_boat_data(line)
-            if boat_data:
-                boats[boat_data["boat_number"]] = boat_data
+            writer.writerows(rows)
 
-            i += 1
+        if not self.entries:
+            return
+
+        entry_rows = [row for race in races for row in self.build_entry_rows(race)]
+        if self.output_format == "parquet":
+            write_entries_parquet(
+                entry_rows, year, month, day, self.entries_parquet_dir
+            )
+        else:
+            entries_writer.writerows(entry_rows)
+
+    def write_target(
+        self,
+        profile: Optional[FileProfile],
+        writer: Any,
+        entries_writer: Any,
+        races: List[ProgramRace],
+        year: int,
+        month: int,
+        day: int,
+    ) -> None:
+        """1日分のレースデータを出力（計測する場合は書き込みの時間も記録）"""
+        if profile is None:
+            self.write_races(writer, entries_writer, races, year, month, day)
+            return
+        with profile.stage("write"):
+            self.write_races(writer, entries_writer, races, year, month, day)
+        profile.finish()
+
+    def write_profile_report(self) -> None:
+        """計測する場合はレポートを出力"""
+        if self.profiler is not None:
+            print(f"計測結果: {self.profiler.write_report()}")
+
+    @property
+    def output_name(self) -> str:
+        """出力先（CSVファイルまたはParquetディレクトリ）"""
+        if self.output_format == "parquet":
+            return self.parquet_dir
+        if self.output_format == "sqlite":
+            return self.sqlite_path
+        return self.output_file
+
+    def open_manifest(self) -> ConversionManifest:
+        """出力先に対応するマニフェストを読み込む"""
+        return ConversionManifest(
+            manifest_path(self.output_name, self.output_format, "programs"),
+            self.output_name,
+        )
+
+    def remove_replaced_days(
+        self, manifest: ConversionManifest, targets: List[Tuple[int, int, int, str]]
+    ) -> None:
+        """変換し直す日の行を出力CSVから削除
 
-        if race_data and len(boats) >= 6:  # 6艇すべてのデータがある場合
-            race_data["boats"] = boats
-            return race_data
+        Parquet・SQLiteは書き込み時に日単位で置き換わる
+        """
+        if self.output_format != "csv":
+            return
 
-        return None
+        days = manifest.days_to_replace((y, m, d) for y, m, d, _ in targets)
+        remove_days_from_csv(self.output_file, days)
+        if self.entries:
+            remove_days_from_csv(self.entries_file, days)
+        manifest.forget(days)
 
     def convert_file(self, year: int, month: int, day: int) -> int:
         """番組表ファイルを変換"""
-        # ファイル名生成
-        year_short = year % 100
-        input_file = f"data/raw/programs/b{year_short:02d}{month:02d}{day:02d}_u8.txt"
-        output_file = "data/race_programs.csv"
+        input_file = self.get_input_file(year, month, day)
 
         if not os.path.exists(input_file):
             print(f"エラー: 入力ファイルが見つかりません: {input_file}")
             return 1
 
         try:
-            # 入力ファイルを読み込み
-            with open(input_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            # データを解析
-            races = []
-            current_track_number = None
-
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-
-                # トラック開始マーカー
-                if re.match(r"\d{2}BBGN", line):
-                    track_num = line[:2]
-                    current_track_number = track_num
-                    i += 1
-                    continue
-
-                # レース場名からトラック番号を抽出（BBGNの次の行で）
-                if current_track_number is None and "ボートレース" in line:
-                    extracted_track = self.extract_track_number(line)
-                    if extracted_track:
-                        current_track_number = extracted_track
-
-                # トラック終了マーカー
-                if re.match(r"\d{2}BEND", line):
-                    current_track_number = None
-                    i += 1
-                    continue
-
-                # レースヘッダーの検出
-                if (
-                    ("Ｒ" in line or "R" in line)
-                    and "電話投票締切予定" in line
-                    and current_track_number
-                ):
-                    race_data = self.process_race_section(lines, i)
-                    if race_data:
-                        race_data["track_number"] = current_track_number
-                        race_data["year"] = year
-                        race_data["month"] = month
-                        race_data["day"] = day
-                        races.append(race_data)
-
-                i += 1
-
-            # CSVファイルに出力
-            file_exists = os.path.exists(output_file)
-
-            with open(output_file, "a", newline="", encoding="utf-8") as csvfile:
-                writer = csv.writer(csvfile)
-
-                # ヘッダーを書き込み（ファイルが新規作成の場合）
-                if not file_exists:
-                    writer.writerow(self.csv_headers)
-
-                # データを書き込み
-                for race in races:
-                    row = [
-                        race["year"],
-                        race["month"],
-                        race["day"],
-                        race["track_number"],
-                        race["race_number"],
-                        race["distance"],
-                        race["time"],
-                    ]
-
-                    # 6艇分のデータを追加
-                    for boat_num in range(1, 7):
-                        boat_key = str(boat_num)
-                        if boat_key in race["boats"]:
-                            boat = race["boats"][boat_key]
-                            row.extend(
-                                [
-                                    boat["player_id"],
-                                    boat["age"],
-                                    boat["branch"],
-                                    boat["weight"],
-                                    boat["class"],
-                                    boat["national_win_rate"],
-                                    boat["national_2nd_rate"],
-                                    boat["local_win_rate"],
-                                    boat["local_2nd_rate"],
-                                    boat["motor_number"],
-                                    boat["motor_2nd_rate"],
-                                    boat["boat_number_actual"],
-                                    boat["boat_2nd_rate"],
-                                ]
-                            )
-                        else:
-                            # データがない場合は空文字で埋める
-                            row.extend([""] * 12)
+            manifest = self.open_manifest()
+            if self.incremental and manifest.is_current(input_file, year, month, day):
+                print(f"スキップ: 前回の変換から変更がありません: {input_file}")
+                return 0
+
+            races, profile = self.parse_target(input_file, year, month, day)
+
+            # 変換済みの日であれば、その日の行を削除してから追記する
+            self.remove_replaced_days(manifest, [(year, month, day, input_file)])
+
+            # CSVファイル（またはParquet）に出力
+            output, writer = self.open_output()
+            entries_output, entries_writer = self.open_entries_output()
+            with output, entries_output:
+                self.write_target(
+                    profile, writer, entries_writer, races, year, month, day
+                )
 
-                    writer.writerow(row)
+            manifest.record(input_file, year, month, day, len(races))
+            manifest.save()
 
             print(f"処理完了: {len(races)}レースのデータを変換しました")
-            print(f"出力ファイル: {output_file}")
+            print(f"出力ファイル: {self.output_name}")
+            self.write_profile_report()
             return 0
 
         except Exception as e:
             print(f"エラー: ファイル処理中にエラーが発生しました: {e}")
             return 1
 
+    def convert_files(self, targets: Iterable[Tuple[int, int, int, str]]) -> int:
+        """複数の番組表ファイルを1プロセス・1つの出力ファイルで一括変換
+
+        targets は (年, 月, 日, 入力ファイルパス) のイテラブル
+        incremental の場合、マニフェストに記録済みで変更のないファイルはスキップする
+        """
+        file_count = 0
+        race_count = 0
+        missing_files = []
+
+        try:
+            manifest = self.open_manifest()
+            targets = list(targets)
+            if self.incremental:
+                targets, skipped = split_targets(manifest, targets)
+                print(f"スキップ: 変更のない{skipped}ファイル")
+
+            # 変換し直す日の行を削除してから追記する（行が重複しない）
+            self.remove_replaced_days(manifest, targets)
+
+            try:
+                output, writer = self.open_output()
+                entries_output, entries_writer = self.open_entries_output()
+                with output, entries_output:
+                    for year, month, day, input_file in targets:
+                        if not os.path.exists(input_file):
+                            print(
+                                f"警告: 入力ファイルが見つかりません: {input_file}"
+                            )
+                            missing_files.append(input_file)
+                            continue
+
+                        races, profile = self.parse_target(
+                            input_file, year, month, day
+                        )
+                        self.write_target(
+                            profile, writer, entries_writer, races, year, month, day
+                        )
+                        manifest.record(
+                            input_file, year, month, day, len(races)
+                        )
+
+                        file_count += 1
+                        race_count += len(races)
+            finally:
+                # 途中でエラーになった場合も、書き込み済みの日は記録しておく
+                manifest.save()
+
+        except Exception as e:
+            print(f"エラー: ファイル処理中にエラーが発生しました: {e}")
+            return 1
+
+        print(
+            f"処理完了: {file_count}ファイル・{race_count}レースのデータを変換しました"
+        )
+        print(f"出力ファイル: {self.output_name}")
+        self.write_profile_report()
+
+        if missing_files:
+            print(f"警告: {len(missing_files)}ファイルが見つかりませんでした")
+            return 1
+        return 0
+
+    def date_range_targets(
+        self, start: date, end: date
+    ) -> Iterator[Tuple[int, int, int, str]]:
+        """開始日〜終了日の各日の (年, 月, 日, 入力ファイルパス) を生成"""
+        current = start
+        while current <= end:
+            yield (
+                current.year,
+                current.month,
+                current.day,
+                self.get_input_file(current.year, current.month, current.day),
+            )
+            current += timedelta(days=1)
+
+    def directory_targets(self, directory: str) -> List[Tuple[int, int, int, str]]:
+        """ディレクトリ内の番組表ファイルを日付順に列挙"""
+        return directory_raw_files(directory, PROGRAM_FILE_PATTERN)
+
+
+def parse_date(value: str) -> date:
+    """YYYY-MM-DD形式の日付文字列を解析"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"日付はYYYY-MM-DD形式で入力してください: {value}")
+
+
+def print_usage():
+    """使用方法を表示"""
+    print(
+        "使用方法: python convert_program.py YYYY MM DD "
+        "[--format csv|parquet|sqlite] [--entries] [--incremental]"
+    )
+    print("  YYYY: 年4桁（例: 2025）")
+    print("  MM: 1桁または2桁の月（例: 7）")
+    print("  DD: 1桁または2桁の日（例: 9）")
+    print("一括変換: python convert_program.py --from YYYY-MM-DD --to YYYY-MM-DD")
+    print("          python convert_program.py --dir data/raw/programs")
+    print("オプション:")
+    print("  --format: 出力形式（csv: data/race_programs.csv に追記、")
+    print(f"            parquet: {PROGRAMS_PARQUET_DIR}/ に年月別で出力、")
+    print(f"            sqlite: {SQLITE_PATH} の programs・entries テーブル）")
+    print("  --incremental: 前回の変換から変更のない入力ファイルをスキップ")
+    print("  --encoding: 入力ファイルの文字コード（auto: 自動判定、utf-8、cp932）")
+    print("  --entries: 1艇1行の出走表テーブルも出力")
+    print(f"             （csv: data/race_entries.csv、parquet: {ENTRIES_PARQUET_DIR}/）")
+    print("  --profile: ファイルごとの段階別の処理時間・処理量・メモリ使用量を計測し、")
+    print(f"             JSONのレポートを出力（環境変数 {PROFILE_ENV} でも有効）")
+    print("  --cprofile: --profile に加えて cProfile の結果（.prof）も出力")
+
+
+def parse_args(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """コマンドライン引数を位置引数とオプションに分ける"""
+    positionals = []
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS:
+            if i + 1 >= len(args):
+                raise ValueError(f"{arg} の値を指定してください")
+            options[arg] = args[i + 1]
+            i += 2
+        elif arg in FLAG_OPTIONS:
+            options[arg] = ""
+            i += 1
+        elif arg.startswith("--"):
+            raise ValueError(f"不明なオプションです: {arg}")
+        else:
+            positionals.append(arg)
+            i += 1
+    return positionals, options
+
+
+def create_converter(options: Dict[str, str]) -> ProgramConverter:
+    """オプションに応じた ProgramConverter を作成"""
+    output_format = options.get("--format", "csv")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"出力形式は {' / '.join(OUTPUT_FORMATS)} のいずれかを指定してください: "
+            f"{output_format}"
+        )
+    encoding = options.get("--encoding", "auto")
+    if encoding not in ENCODINGS:
+        raise ValueError(
+            f"文字コードは {' / '.join(ENCODINGS)} のいずれかを指定してください: "
+            f"{encoding}"
+        )
+    return ProgramConverter(
+        output_format=output_format,
+        encoding=encoding,
+        entries="--entries" in options,
+        incremental="--incremental" in options,
+        profiler=create_profiler(
+            "convert_program", "--profile" in options, "--cprofile" in options
+        ),
+    )
+
+
+def main_batch(converter: ProgramConverter, options: Dict[str, str]) -> int:
+    """期間指定・ディレクトリ指定の一括変換"""
+    if "--dir" in options:
+        if "--from" in options or "--to" in options:
+            print("エラー: --dir と --from/--to は同時に指定できません")
+            return 1
+        if not os.path.isdir(options["--dir"]):
+            print(f"エラー: ディレクトリが見つかりません: {options['--dir']}")
+            return 1
+        targets = converter.directory_targets(options["--dir"])
+    else:
+        if "--from" not in options or "--to" not in options:
+            print("エラー: --from と --to の両方を指定してください")
+            return 1
+        try:
+            start = parse_date(options["--from"])
+            end = parse_date(options["--to"])
+        except ValueError as e:
+            print(f"エラー: {e}")
+            return 1
+        if start > end:
+            print(f"エラー: 開始日が終了日より後になっています: {start} > {end}")
+            return 1
+        targets = converter.date_range_targets(start, end)
+
+    # 出力ディレクトリの作成
+    os.makedirs(os.path.dirname(converter.output_file), exist_ok=True)
+
+    return converter.convert_files(targets)
+
 
 def main():
     """メイン関数"""
-    if len(sys.argv) != 4:
-        print("使用方法: python convert_program.py YYYY MM DD")
-        print("  YYYY: 年4桁（例: 2025）")
-        print("  MM: 1桁または2桁の月（例: 7）")
-        print("  DD: 1桁または2桁の日（例: 9）")
+    try:
+        positionals, options = parse_args(sys.argv[1:])
+        converter = create_converter(options)
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        return 1
+
+    if "--from" in options or "--to" in options or "--dir" in options:
+        if positionals:
+            print_usage()
+            return 1
+        return main_batch(converter, options)
+
+    if len(positionals) != 3:
+        print_usage()
         return 1
 
     try:
-        year = int(sys.argv[1])
-        month = int(sys.argv[2])
-        day = int(sys.argv[3])
+        year = int(positionals[0])
+        month = int(positionals[1])
+        day = int(positionals[2])
 
         # 引数の妥当性チェック
         if not (1900 <= year <= 2100):
@@ -389,7 +704,6 @@ def main():
         os.makedirs("data", exist_ok=True)
 
         # 変換処理実行
-        converter = ProgramConverter()
         return converter.convert_file(year, month, day)
 
     except ValueError:
@@ -4,7 +4,7 @@
 # 範囲指定番組表データ変換スクリプト
 # 指定された期間の番組表データを一括で変換します。
 # 期間は開始日と終了日で指定します。
-# 期間内の各日の番組表データをconvert_program.pyスクリプトを使用して変換します。
+# 期間内の各日の番組表データをconvert_program.pyの一括変換モードで変換します。
 #
 # 使用方法: ./convert_programs_range.sh START_YYYY START_MM START_DD END_YYYY END_MM END_DD
 #
@@ -61,18 +61,6 @@ date_to_epoch() {
     date -d "${year}-${month}-${day}" +%s 2>/dev/null || error_exit "無効な日付です: ${year}-${month}-${day}"
 }
 
-# 関数: エポック秒を次の日に進める
-next_day() {
-    local epoch=$1
-    echo $((epoch + 86400))  # 86400秒 = 24時間
-}
-
-# 関数: エポック秒を年月日に変換
-epoch_to_date() {
-    local epoch=$1
-    date -d "@${epoch}" "+%Y %m %d"
-}
-
 # convert_program.pyの存在確認
 if [ ! -f "./convert_program.py" ]; then
     error_exit "convert_program.py が見つかりません。同じディレクトリに配置してください。"
@@ -111,52 +99,18 @@ TOTAL_DAYS=$(( (END_EPOCH - START_EPOCH) / 86400 + 1 ))
 echo "処理対象: ${TOTAL_DAYS}日間"
 echo ""
 
-# カウンター
-SUCCESS_COUNT=0
-ERROR_COUNT=0
-CURRENT_DAY=1
+# 期間内の全ファイルを1プロセスで一括変換
+# （ProgramConverterを1つだけ生成し、出力CSVも1度だけ開いて書き込む）
+START_DATE=$(printf "%04d-%02d-%02d" "$START_YEAR" "$((10#$START_MONTH))" "$((10#$START_DAY))")
+END_DATE=$(printf "%04d-%02d-%02d" "$END_YEAR" "$((10#$END_MONTH))" "$((10#$END_DAY))")
 
-# 各日付に対して番組表データ変換処理を実行
-CURRENT_EPOCH=$START_EPOCH
-while [ "$CURRENT_EPOCH" -le "$END_EPOCH" ]; do
-    # エポック秒を年月日に変換
-    DATE_INFO=($(epoch_to_date $CURRENT_EPOCH))
-    YEAR=${DATE_INFO[0]}
-    MONTH=$((10#${DATE_INFO[1]}))  # 先頭の0を除去
-    DAY=$((10#${DATE_INFO[2]}))    # 先頭の0を除去
-    
-    echo "[${CURRENT_DAY}/${TOTAL_DAYS}] ${YEAR}年${MONTH}月${DAY}日の処理中..."
-    
-    # convert_program.pyを実行
-    if python3 convert_program.py "$YEAR" "$MONTH" "$DAY"; then
-        echo "  → 成功"
-        SUCCESS_COUNT=$((SUCCESS_COUNT + 1))
-    else
-        echo "  → エラー: ${YEAR}年${MONTH}月${DAY}日の変換に失敗しました"
-        ERROR_COUNT=$((ERROR_COUNT + 1))
-        error_exit "各日付の変換に失敗しました: ${YEAR}年${MONTH}月${DAY}日"
-    fi
-    
-    # 次の日に進む
-    CURRENT_EPOCH=$(next_day $CURRENT_EPOCH)
-    CURRENT_DAY=$((CURRENT_DAY + 1))
-    
+if python3 convert_program.py --from "$START_DATE" --to "$END_DATE"; then
     echo ""
-done
-
-echo "番組表データ一括変換完了"
-echo "============================================"
-echo "処理結果:"
-echo "  成功: ${SUCCESS_COUNT}日"
-echo "  エラー: ${ERROR_COUNT}日"
-echo "  合計: ${TOTAL_DAYS}日"
-echo "============================================"
-
-if [ "$ERROR_COUNT" -gt 0 ]; then
-    echo "警告: ${ERROR_COUNT}日分の変換でエラーが発生しました。"
-    exit 1
-else
+    echo "番組表データ一括変換完了"
     echo "全ての処理が正常に完了しました。"
     echo "出力ファイル: data/race_programs.csv"
     exit 0
+else
+    echo ""
+    error_exit "番組表データの一括変換に失敗しました: ${START_DATE} 〜 ${END_DATE}"
 fi
@@ -2,274 +2,680 @@
 # -*- coding: utf-8 -*-
 """
 ボートレース結果データ変換プログラム
-入力: k{年}{月:02d}{日:02d}_u8.txt
-出力: race_results.csv
+入力: k{年}{月:02d}{日:02d}.lzh（アーカイブ）、k{年}{月:02d}{日:02d}.txt（Shift_JIS）
+      または k{年}{月:02d}{日:02d}_u8.txt（UTF-8）
+出力: race_results.csv（--payouts を指定した場合は race_payouts.csv も）
 """
 
+import contextlib
 import csv
+import functools
+import itertools
 import os
-import re
 import sys
-
-
-def get_track_number(content):
-    """競艇場番号を取得する"""
-    track_map = {
-        "桐生": "01",
-        "戸田": "02",
-        "江戸川": "03",
-        "平和島": "04",
-        "多摩川": "05",
-        "浜名湖": "06",
-        "蒲郡": "07",
-        "常滑": "08",
-        "津": "09",
-        "三国": "10",
-        "びわこ": "11",
-        "住之江": "12",
-        "尼崎": "13",
-        "鳴門": "14",
-        "丸亀": "15",
-        "児島": "16",
-        "宮島": "17",
-        "徳山": "18",
-        "下関": "19",
-        "若松": "20",
-        "芦屋": "21",
-        "福岡": "22",
-        "唐津": "23",
-        "大村": "24",
-    }
-
-    # ファイル先頭の24KBGNから取得（最も確実）
-    match = re.search(r"^(\d{2})KBGN", content, re.MULTILINE)
-    if match:
-        return match.group(1)
-
-    # ファイル内から競艇場名を検索（全角スペースを含む可能性を考慮）
-    track_match = re.search(r"ボートレース([^\n\r]+)", content)
-    if track_match:
-        track_name_raw = track_match.group(1).strip()
-        # 全角スペースを除去して競艇場名を抽出
-        track_name = re.sub(r"[　\s]+", "", track_name_raw)
-        return track_map.get(track_name, "00")
-
-    return "00"
-
-
-def parse_race_header(race_content):
-    """レースヘッダーから基本情報を抽出"""
-    # 距離、天候、風向き、風速、波高を抽出
-    # 例: H1800m  雨　  風  北東　 5m  波　  4cm
-    header_pattern = r"H(\d+)m\s+([^\s]+)\s+風\s+([^\s]+)\s+(\d+)m\s+波\s+(\d+)cm"
-    match = re.search(header_pattern, race_content)
-
-    if match:
-        return {
-            "distance": match.group(1),
-            "weather": match.group(2),
-            "wind_direction": match.group(3),
-            "wind_speed": match.group(4),
-            "wave_height": match.group(5),
-        }
-    return {}
-
-
-def parse_boat_result(line):
-    """1行の艇結果を解析"""
-    # 着順、艇番、登番、選手名、モーター、ボート、展示タイム、進入、スタートタイミング、レースタイム
-    # 例: 01  5 3784 中　島　　友　和 40   75  6.89   5    0.10     1.51.0
-    # 特殊着順例: S0  5 3784 中　島　　友　和 40   75  6.89   5    F0.10     1.51.0
-
-    # 着順は数字(01-06)または特殊コード(S0,S1,S2,F,L0,L1,K0,K1)
-    # スタートタイミングはFで始まる場合もある
-    pattern = r"\s*([0-9]{1,2}|S[0-2]|F|L[01]|K[01])\s+(\d)\s+(\d+)\s+([^\d]+?)\s+(\d+)\s+(\d+)\s+(\d+\.\d+)\s+(\d)\s+(F?[\d.-]+)\s+([\d:.]+|\.+)"
-    match = re.match(pattern, line)
-
-    if match:
-        # スタートタイミングの処理（Fが付いている場合は-に変換）
-        start_timing = match.group(9).strip()
-        if start_timing.startswith("F"):
-            start_timing = "-" + start_timing[1:]  # F0.10 → -0.10
-
-        return {
-            "position": match.group(1).strip(),
-            "boat_number": match.group(2).strip(),
-            "registration_number": match.group(3).strip(),
-            "motor": match.group(5).strip(),
-            "boat": match.group(6).strip(),
-            "exhibition_time": match.group(7).strip(),
-            "entry_number": match.group(8).strip(),
-            "start_timing": start_timing,
-            "race_time": (
-                match.group(10).strip()
-                if match.group(10) != "." and "." in match.group(10)
-                else ""
-            ),
-        }
-    return None
-
-
-def parse_race_data(file_path, year, month, day):
-    """レース結果ファイルを解析してCSVデータを作成"""
-    results = []
-
-    try:
-        # UTF-8で試す
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-    except UnicodeDecodeError:
-        # Shift_JISで試す
-        with open(file_path, "r", encoding="shift_jis") as f:
-            content = f.read()
-
-    # 競艇場ごとのセクションを分割（[番号]KBGN から [番号]KEND まで）
-    track_pattern = r"(\d{2})KBGN(.*?)(\d{2})KEND"
-    tracks = re.findall(track_pattern, content, re.DOTALL)
-
-    for track_start_num, track_content, track_end_num in tracks:
-        # 開始番号と終了番号が一致することを確認
-        if track_start_num == track_end_num:
-            track_number = track_start_num
-            results.extend(
-                process_track_section(track_content, track_number, year, month, day)
-            )
-
-    return results
-
-
-def process_track_section(track_content, track_number, year, month, day):
-    """1つの競艇場のセクションを処理"""
-    results = []
-
-    # レースごとに分割 (1R, 2R, ... で分割)
-    race_pattern = r"\n\s*(\d{1,2})R\s+([^\n]*)\n(.*?)(?=\n\s*\d{1,2}R\s+|\n\s*第|\Z)"
-    races = re.findall(race_pattern, track_content, re.DOTALL)
-
-    for race_number, race_header, race_content in races:
-        # レース基本情報を取得（ヘッダー行から）
-        race_info = parse_race_header(race_header + "\n" + race_content)
-
-        # 着順データの部分を抽出
-        lines = race_content.split("\n")
-        in_results = False
-
-        for line in lines:
-            if "着 艇 登番" in line:
-                in_results = True
-                continue
-            if in_results and ("---" in line):
-                continue
-            if in_results and (line.strip() == "" or "単勝" in line or "複勝" in line):
-                break
-
-            if in_results and line.strip():
-                boat_result = parse_boat_result(line)
-                if boat_result:
-                    # CSVの1行を作成
-                    row = [
-                        year,
-                        month,
-                        day,
-                        track_number,
-                        race_number,
-                        race_info.get("distance", ""),
-                        race_info.get("weather", ""),
-                        race_info.get("wind_direction", ""),
-                        race_info.get("wind_speed", ""),
-                        race_info.get("wave_height", ""),
-                        boat_result["position"],
-                        boat_result["boat_number"],
-                        boat_result["registration_number"],
-                        boat_result["motor"],
-                        boat_result["boat"],
-                        boat_result["exhibition_time"],
-                        boat_result["entry_number"],
-                        boat_result["start_timing"],
-                        boat_result["race_time"],
-                    ]
-                    results.append(row)
-
-    return results
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from conversion_manifest import (
+    ConversionManifest,
+    manifest_path,
+    remove_days_from_csv,
+    split_targets,
+)
+from parquet_output import (
+    PAYOUTS_PARQUET_DIR,
+    RESULTS_PARQUET_DIR,
+    require_pyarrow,
+    write_payouts_parquet,
+    write_results_parquet,
+)
+from pipeline_profile import PROFILE_ENV, FileProfile, create_profiler
+from race_io import ENCODINGS, directory_raw_files, raw_file_path
+
+# 解析の関数は race_parser にまとめている（このモジュールからも従来どおり import できる）
+from race_parser import (  # noqa: F401
+    BOAT_RESULT_FALLBACKS,
+    get_track_number,
+    iter_race_data,
+    iter_race_rows,
+    parse_boat_result,
+    parse_race_data,
+    parse_race_header,
+)
+from race_patterns import RESULT_FILE_PATTERN
+from sqlite_store import SQLITE_PATH, SqliteStore
+
+# 一括変換時の出力バッファサイズ（バイト）
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# 出力CSVファイル
+OUTPUT_FILE = "race_results.csv"
+
+# 払戻金の出力CSVファイル（--payouts）
+PAYOUTS_FILE = "race_payouts.csv"
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = ("--from", "--to", "--dir", "--jobs", "--format", "--encoding")
+
+# 値を取らないコマンドラインオプション
+FLAG_OPTIONS = ("--incremental", "--payouts", "--profile", "--cprofile")
+
+# 出力形式
+OUTPUT_FORMATS = ("csv", "parquet", "sqlite")
+
+
+CSV_HEADERS = [
+    "年",
+    "月",
+    "日",
+    "競艇場番号",
+    "レース番号",
+    "距離",
+    "天候",
+    "風向き",
+    "風速",
+    "波高",
+    "着",
+    "艇",
+    "登番",
+    "モーター",
+    "ボート",
+    "展示タイム",
+    "進入番号",
+    "スタートタイミング",
+    "レースタイム",
+]
+
+PAYOUT_CSV_HEADERS = [
+    "年",
+    "月",
+    "日",
+    "競艇場番号",
+    "レース番号",
+    "勝式",
+    "組番",
+    "払戻金",
+    "人気",
+]
 
 
 def write_csv(results, output_file):
-    """結果をCSVファイルに出力"""
-    headers = [
-        "年",
-        "月",
-        "日",
-        "競艇場番号",
-        "レース番号",
-        "距離",
-        "天候",
-        "風向き",
-        "風速",
-        "波高",
-        "着",
-        "艇",
-        "登番",
-        "モーター",
-        "ボート",
-        "展示タイム",
-        "進入番号",
-        "スタートタイミング",
-        "レースタイム",
-    ]
+    """結果をCSVファイルに出力し、書き込んだ行数を返す
 
+    results はリストでもジェネレーターでもよく、1行ずつ順に書き込む
+    """
     # ファイルが存在するかチェック
     file_exists = os.path.exists(output_file)
 
-    with open(output_file, "a", newline="", encoding="utf-8") as f:
+    with open(
+        output_file, "a", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE
+    ) as f:
         writer = csv.writer(f)
 
         # ヘッダーを書き込み（ファイルが新規の場合のみ）
         if not file_exists:
-            writer.writerow(headers)
+            writer.writerow(CSV_HEADERS)
 
         # データを書き込み
+        row_count = 0
         for row in results:
             writer.writerow(row)
+            row_count += 1
+
+    return row_count
+
+
+def get_input_path(year, month, day, input_dir=os.path.join("data", "raw", "results")):
+    """年月日から競走成績ファイルのパスを生成（Shift_JIS のファイルを優先）"""
+    return raw_file_path(input_dir, "k", year, month, day)
+
+
+def date_range_targets(start, end):
+    """開始日〜終了日の各日の (年, 月, 日, 入力ファイルパス) のリストを作成"""
+    targets = []
+    current = start
+    while current <= end:
+        targets.append(
+            (
+                current.year,
+                current.month,
+                current.day,
+                get_input_path(current.year, current.month, current.day),
+            )
+        )
+        current += timedelta(days=1)
+    return targets
+
+
+def directory_targets(directory):
+    """ディレクトリ内の競走成績ファイルを日付順に列挙"""
+    return directory_raw_files(directory, RESULT_FILE_PATTERN)
+
+
+def parse_target(target, encoding="auto", payouts=False):
+    """(年, 月, 日, 入力ファイルパス) を解析する（プロセスプールのワーカー用）
+
+    戻り値は (行データのリスト, 払戻金の行データのリスト)。
+    payouts が False の場合、払戻金は読まずに None を返す
+    """
+    year, month, day, input_path = target
+    payout_rows = [] if payouts else None
+    rows = parse_race_data(input_path, year, month, day, encoding, payout_rows)
+    return rows, payout_rows
+
+
+def iter_target(target, encoding="auto", payouts=False):
+    """(年, 月, 日, 入力ファイルパス) を逐次解析する（行データはリストにしない）
+
+    戻り値は (行データのイテレーター, 払戻金の行データのリスト)。
+    払戻金のリストは、イテレーターを最後まで読んだ時点で揃う
+    """
+    year, month, day, input_path = target
+    payout_rows = [] if payouts else None
+    rows = iter_race_data(input_path, year, month, day, encoding, payout_rows)
+    return rows, payout_rows
+
+
+def profile_target(target, encoding="auto", payouts=False):
+    """(年, 月, 日, 入力ファイルパス) を段階ごとに計測しながら解析する（--profile）
+
+    ピーク時のメモリ使用量は、解析したプロセス（並列の場合はワーカー）で記録する。
+    戻り値は (行データのリスト, 払戻金の行データのリスト, FileProfile)
+    """
+    year, month, day, input_path = target
+    profile = FileProfile(input_path)
+    lines = profile.read_lines(encoding)
+    payout_rows = [] if payouts else None
+    fallbacks = sum(BOAT_RESULT_FALLBACKS.values())
+    with profile.stage("parse"):
+        rows = list(iter_race_rows(lines, year, month, day, payout_rows))
+    profile.rows = len(rows)
+    profile.fallbacks = sum(BOAT_RESULT_FALLBACKS.values()) - fallbacks
+    profile.finish()
+    return rows, payout_rows, profile
+
+
+def open_csv(output_file, headers):
+    """CSVファイルを追記モードで開き、(ファイル, writer) を返す"""
+    file_exists = os.path.exists(output_file)
+
+    f = open(
+        output_file, "a", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE
+    )
+    writer = csv.writer(f)
+
+    # ヘッダーを書き込み（ファイルが新規の場合のみ）
+    if not file_exists:
+        writer.writerow(headers)
+
+    return f, writer
+
+
+def open_output(output_file, output_format="csv"):
+    """出力CSVファイルを追記モードで開き、(ファイル, writer) を返す
+
+    Parquet出力の場合はファイルを開かず、(何もしないコンテキスト, None) を返す
+    SQLite出力の場合は (データベース, データベース) を返す
+    """
+    if output_format == "parquet":
+        require_pyarrow()
+        return contextlib.nullcontext(), None
+    if output_format == "sqlite":
+        store = SqliteStore(SQLITE_PATH)
+        return store, store
+    return open_csv(output_file, CSV_HEADERS)
+
+
+def open_payouts_output(output_format="csv", payouts=False):
+    """払戻金のCSVファイル（race_payouts.csv）を追記モードで開く
+
+    払戻金を出力しない場合、またはCSV出力でない場合は
+    (何もしないコンテキスト, None) を返す
+    """
+    if not payouts or output_format != "csv":
+        return contextlib.nullcontext(), None
+    return open_csv(PAYOUTS_FILE, PAYOUT_CSV_HEADERS)
+
+
+def write_day(writer, results, year, month, day, output_format="csv"):
+    """1日分の結果を出力し、行数を返す
+
+    CSVは追記、Parquetは日単位のファイル、SQLiteはその日の行を置き換える
+    """
+    if output_format == "parquet":
+        results = list(results)
+        if results:
+            write_results_parquet(results, year, month, day)
+        return len(results)
+
+    if output_format == "sqlite":
+        results = list(results)
+        if results:
+            writer.replace_results(year, month, day, results)
+        return len(results)
+
+    row_count = 0
+    for row in results:
+        writer.writerow(row)
+        row_count += 1
+    return row_count
+
+
+def write_payouts(writer, payouts_writer, rows, year, month, day, output_format="csv"):
+    """1日分の払戻金を出力（CSVは追記、Parquetは日単位のファイル、SQLiteは置き換え）"""
+    if output_format == "sqlite":
+        writer.replace_payouts(year, month, day, rows)
+    elif output_format == "parquet":
+        if rows:
+            write_payouts_parquet(rows, year, month, day)
+    else:
+        payouts_writer.writerows(rows)
+
+
+def collects_payouts(output_format="csv", payouts=False):
+    """払戻金を読むかどうか（SQLiteの場合は常に payouts テーブルにも格納する）"""
+    return payouts or output_format == "sqlite"
+
+
+def open_manifest(output_file, output_format="csv"):
+    """出力先に対応するマニフェストを読み込む"""
+    output = output_name(output_format, output_file)
+    return ConversionManifest(manifest_path(output, output_format, "results"), output)
+
+
+def remove_replaced_days(manifest, output_file, output_format, targets, payouts=False):
+    """変換し直す日の行を出力CSV（払戻金を出力する場合は race_payouts.csv も）から削除
+
+    Parquet・SQLiteは書き込み時に日単位で置き換わる
+    """
+    if output_format != "csv":
+        return
+
+    days = manifest.days_to_replace((y, m, d) for y, m, d, _ in targets)
+    remove_days_from_csv(output_file, days)
+    if payouts:
+        remove_days_from_csv(PAYOUTS_FILE, days)
+    manifest.forget(days)
+
+
+def convert_files(
+    targets,
+    output_file,
+    jobs=1,
+    output_format="csv",
+    incremental=False,
+    encoding="auto",
+    payouts=False,
+    profiler=None,
+):
+    """複数の競走成績ファイルを解析し、日付順に1つのCSVへ出力
+
+    jobs が2以上の場合はプロセスプールでファイル単位に並列解析する。
+    結果は targets の順（日付順）に書き込むため、出力は逐次実行と同一になる。
+    output_format が "parquet" の場合は日ごとのParquetファイルに出力する。
+    incremental の場合、マニフェストに記録済みで変更のないファイルはスキップする。
+    encoding は入力ファイルの文字コード（auto / utf-8 / cp932）。
+    payouts の場合、同じパスで読んだ払戻金も出力する（SQLiteの場合は常に出力）。
+    profiler（PipelineProfiler）を渡すと、ファイルごとに段階別の処理時間を記録する。
+    戻り値は (ファイル数, 行数, 見つからなかった/データのないファイルのリスト)
+    """
+    missing_files = [t[3] for t in targets if not os.path.exists(t[3])]
+    for input_path in missing_files:
+        print(f"警告: ファイル {input_path} が見つかりません")
+    targets = [t for t in targets if os.path.exists(t[3])]
+
+    manifest = open_manifest(output_file, output_format)
+    if incremental:
+        targets, skipped = split_targets(manifest, targets)
+        print(f"スキップ: 変更のない{skipped}ファイル")
+
+    # 変換し直す日の行を削除してから追記する（行が重複しない）
+    remove_replaced_days(manifest, output_file, output_format, targets, payouts)
+
+    read_payouts = collects_payouts(output_format, payouts)
+    # 計測する場合は、ファイルを1度に読み込んで段階ごとに解析する
+    parse = profile_target if profiler is not None else parse_target
+    if jobs > 1 and len(targets) > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # ワーカー間の受け渡し回数を減らすため、数ファイルずつまとめて渡す
+        chunksize = max(1, len(targets) // (jobs * 4))
+        parsed = executor.map(
+            functools.partial(parse, encoding=encoding, payouts=read_payouts),
+            targets,
+            chunksize=chunksize,
+        )
+    elif profiler is not None:
+        executor = None
+        parsed = (profile_target(t, encoding, read_payouts) for t in targets)
+    else:
+        # 逐次実行の場合はファイルごとのリストも作らず、行単位で書き込む
+        executor = None
+        parsed = (iter_target(t, encoding, read_payouts) for t in targets)
+
+    file_count = 0
+    row_count = 0
+    empty_files = []
+
+    try:
+        output, writer = open_output(output_file, output_format)
+        payouts_output, payouts_writer = open_payouts_output(output_format, payouts)
+        with output, payouts_output:
+            # executor.map は入力順に結果を返すので、書き込み順は日付順で固定
+            for target, parsed_target in zip(targets, parsed):
+                year, month, day, input_path = target
+                if profiler is not None:
+                    results, payout_rows, profile = parsed_target
+                    write_stage = profile.stage("write")
+                else:
+                    results, payout_rows = parsed_target
+                    profile = None
+                    write_stage = contextlib.nullcontext()
+
+                with write_stage:
+                    file_row_count = write_day(
+                        writer, results, year, month, day, output_format
+                    )
+                    if file_row_count and payout_rows is not None:
+                        # 払戻金のリストは行データを読み終えた時点で揃っている
+                        write_payouts(
+                            writer,
+                            payouts_writer,
+                            payout_rows,
+                            year,
+                            month,
+                            day,
+                            output_format,
+                        )
+                if profile is not None:
+                    profiler.add(profile)
+
+                if file_row_count == 0:
+                    print(f"警告: データが見つかりませんでした: {input_path}")
+                    empty_files.append(input_path)
+                    continue
+                manifest.record(input_path, year, month, day, file_row_count)
+                file_count += 1
+                row_count += file_row_count
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        # 途中でエラーになった場合も、書き込み済みの日は記録しておく
+        manifest.save()
+
+    return file_count, row_count, missing_files + empty_files
+
+
+def parse_date(value):
+    """YYYY-MM-DD形式の日付文字列を解析"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"日付はYYYY-MM-DD形式で入力してください: {value}")
+
+
+def print_usage():
+    """使用方法を表示"""
+    print(
+        "使用方法: python convert_race_result.py <年> <月> <日> "
+        "[--format csv|parquet|sqlite] [--incremental] [--payouts]"
+    )
+    print("例: python convert_race_result.py 2025 7 9")
+    print(
+        "一括変換: python convert_race_result.py "
+        "--from YYYY-MM-DD --to YYYY-MM-DD [--jobs N]"
+    )
+    print("          python convert_race_result.py --dir data/raw/results [--jobs N]")
+    print("  --jobs: 並列に解析するプロセス数（デフォルト: CPUコア数）")
+    print("  --format: 出力形式（csv: race_results.csv に追記、")
+    print(f"            parquet: {RESULTS_PARQUET_DIR}/ に年月別で出力、")
+    print(f"            sqlite: {SQLITE_PATH} の results テーブル）")
+    print("  --incremental: 前回の変換から変更のない入力ファイルをスキップ")
+    print("  --encoding: 入力ファイルの文字コード（auto: 自動判定、utf-8、cp932）")
+    print("  --payouts: 払戻金（単勝〜３連複の組番・払戻金・人気）も出力")
+    print(f"             （csv: {PAYOUTS_FILE}、parquet: {PAYOUTS_PARQUET_DIR}/、")
+    print("              sqlite: payouts テーブル。sqlite は指定がなくても格納）")
+    print("  --profile: ファイルごとの段階別の処理時間・処理量・メモリ使用量を計測し、")
+    print(f"             JSONのレポートを出力（環境変数 {PROFILE_ENV} でも有効）")
+    print("  --cprofile: --profile に加えて cProfile の結果（.prof）も出力")
+    print("             （解析の関数を計測するため、--jobs の指定にかかわらず1プロセスで実行）")
+
+
+def parse_args(args):
+    """コマンドライン引数を位置引数とオプションに分ける"""
+    positionals = []
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS:
+            if i + 1 >= len(args):
+                raise ValueError(f"{arg} の値を指定してください")
+            options[arg] = args[i + 1]
+            i += 2
+        elif arg in FLAG_OPTIONS:
+            options[arg] = ""
+            i += 1
+        elif arg.startswith("--"):
+            raise ValueError(f"不明なオプションです: {arg}")
+        else:
+            positionals.append(arg)
+            i += 1
+
+    output_format = options.get("--format", "csv")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"出力形式は {' / '.join(OUTPUT_FORMATS)} のいずれかを指定してください: "
+            f"{output_format}"
+        )
+
+    encoding = options.get("--encoding", "auto")
+    if encoding not in ENCODINGS:
+        raise ValueError(
+            f"文字コードは {' / '.join(ENCODINGS)} のいずれかを指定してください: "
+            f"{encoding}"
+        )
+
+    return positionals, options
+
+
+def output_name(output_format, output_file=OUTPUT_FILE):
+    """出力先（CSVファイル、Parquetディレクトリ、またはSQLiteデータベース）"""
+    if output_format == "parquet":
+        return RESULTS_PARQUET_DIR
+    if output_format == "sqlite":
+        return SQLITE_PATH
+    return output_file
+
+
+def main_batch(options):
+    """期間指定・ディレクトリ指定の一括変換"""
+    try:
+        jobs = int(options.get("--jobs", os.cpu_count() or 1))
+    except ValueError:
+        print("エラー: --jobs は数値で入力してください")
+        sys.exit(1)
+    if jobs < 1:
+        print(f"エラー: --jobs は1以上で入力してください: {jobs}")
+        sys.exit(1)
+
+    if "--dir" in options:
+        if "--from" in options or "--to" in options:
+            print("エラー: --dir と --from/--to は同時に指定できません")
+            sys.exit(1)
+        if not os.path.isdir(options["--dir"]):
+            print(f"エラー: ディレクトリ {options['--dir']} が見つかりません")
+            sys.exit(1)
+        targets = directory_targets(options["--dir"])
+    else:
+        if "--from" not in options or "--to" not in options:
+            print("エラー: --from と --to の両方を指定してください")
+            sys.exit(1)
+        try:
+            start = parse_date(options["--from"])
+            end = parse_date(options["--to"])
+        except ValueError as e:
+            print(f"エラー: {e}")
+            sys.exit(1)
+        if start > end:
+            print(f"エラー: 開始日が終了日より後になっています: {start} > {end}")
+            sys.exit(1)
+        targets = date_range_targets(start, end)
+
+    if "--cprofile" in options and jobs > 1:
+        # cProfile は親プロセスしか計測できないため、解析も親プロセスで行う
+        print("注意: --cprofile を指定したため、1プロセスで実行します")
+        jobs = 1
+
+    print(f"処理開始: {len(targets)}ファイル（{jobs}プロセス）")
+
+    output_format = options.get("--format", "csv")
+    profiler = create_profiler(
+        "convert_race_result", "--profile" in options, "--cprofile" in options
+    )
+    try:
+        file_count, row_count, failed_files = convert_files(
+            targets,
+            OUTPUT_FILE,
+            jobs,
+            output_format,
+            "--incremental" in options,
+            options.get("--encoding", "auto"),
+            "--payouts" in options,
+            profiler,
+        )
+    except RuntimeError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    except UnicodeDecodeError as e:
+        print(f"エラー: 入力ファイルをデコードできません（--encoding を確認してください）: {e}")
+        sys.exit(1)
+    except ValueError as e:
+        # 壊れたアーカイブなど
+        print(f"エラー: 入力ファイルを読み込めません: {e}")
+        sys.exit(1)
+
+    print(
+        f"変換完了: {file_count}ファイル・{row_count}件のデータを "
+        f"{output_name(output_format)} に出力しました"
+    )
+    if profiler is not None:
+        print(f"計測結果: {profiler.write_report()}")
+
+    if failed_files:
+        print(f"警告: {len(failed_files)}ファイルを変換できませんでした")
+        sys.exit(1)
 
 
 def main():
     """メイン関数"""
-    if len(sys.argv) != 4:
-        print("使用方法: python convert_race_result.py <年> <月> <日>")
-        print("例: python convert_race_result.py 2025 7 9")
+    try:
+        positionals, options = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        sys.exit(1)
+
+    if "--from" in options or "--to" in options or "--dir" in options:
+        if positionals:
+            print_usage()
+            sys.exit(1)
+        main_batch(options)
+        return
+
+    if len(positionals) != 3 or "--jobs" in options:
+        print_usage()
         sys.exit(1)
 
     try:
-        year = int(sys.argv[1])
-        month = int(sys.argv[2])
-        day = int(sys.argv[3])
+        year = int(positionals[0])
+        month = int(positionals[1])
+        day = int(positionals[2])
     except ValueError:
         print("エラー: 年、月、日は数値で入力してください")
         sys.exit(1)
 
     # 入力ファイル名を生成
-    input_filename = f"k{year % 100:02d}{month:02d}{day:02d}_u8.txt"
-    input_path = os.path.join("data", "raw", "results", input_filename)
+    input_path = get_input_path(year, month, day)
 
     # ファイルの存在確認
     if not os.path.exists(input_path):
         print(f"エラー: ファイル {input_path} が見つかりません")
         sys.exit(1)
 
-    print(f"処理開始: {input_path}")
+    output_format = options.get("--format", "csv")
+    manifest = open_manifest(OUTPUT_FILE, output_format)
+    if "--incremental" in options and manifest.is_current(
+        input_path, year, month, day
+    ):
+        print(f"スキップ: 前回の変換から変更がありません: {input_path}")
+        return
 
-    # データを解析
-    results = parse_race_data(input_path, year, month, day)
+    print(f"処理開始: {input_path}")
 
-    if not results:
+    # データを1行ずつ解析（払戻金は同じパスで payout_rows に追加される）
+    # 計測する場合は、ファイルを1度に読み込んで段階ごとに解析する
+    payouts = "--payouts" in options
+    target = (year, month, day, input_path)
+    encoding = options.get("--encoding", "auto")
+    read_payouts = collects_payouts(output_format, payouts)
+    profiler = create_profiler(
+        "convert_race_result", "--profile" in options, "--cprofile" in options
+    )
+    profile = None
+
+    # 1行もない場合は出力ファイルを作らずに終了
+    try:
+        if profiler is not None:
+            rows, payout_rows, profile = profile_target(target, encoding, read_payouts)
+            results = iter(rows)
+        else:
+            results, payout_rows = iter_target(target, encoding, read_payouts)
+        first_row = next(results, None)
+    except UnicodeDecodeError as e:
+        print(f"エラー: 入力ファイルをデコードできません（--encoding を確認してください）: {e}")
+        sys.exit(1)
+    except ValueError as e:
+        # 壊れたアーカイブなど
+        print(f"エラー: 入力ファイルを読み込めません: {e}")
+        sys.exit(1)
+    if first_row is None:
         print("エラー: データが見つかりませんでした")
         sys.exit(1)
+    results = itertools.chain([first_row], results)
+
+    # 変換済みの日であれば、その日の行を削除してから追記する
+    remove_replaced_days(
+        manifest,
+        OUTPUT_FILE,
+        output_format,
+        [(year, month, day, input_path)],
+        payouts,
+    )
+
+    # CSVファイル（またはParquet・SQLite）に出力（CSVは解析しながら書き込む）
+    try:
+        output, writer = open_output(OUTPUT_FILE, output_format)
+    except RuntimeError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    payouts_output, payouts_writer = open_payouts_output(output_format, payouts)
+    write_stage = profile.stage("write") if profile else contextlib.nullcontext()
+    with output, payouts_output, write_stage:
+        row_count = write_day(writer, results, year, month, day, output_format)
+        if payout_rows is not None:
+            write_payouts(
+                writer, payouts_writer, payout_rows, year, month, day, output_format
+            )
 
-    # CSVファイルに出力
-    output_file = "race_results.csv"
-    write_csv(results, output_file)
+    manifest.record(input_path, year, month, day, row_count)
+    manifest.save()
 
-    print(f"変換完了: {len(results)}件のデータを {output_file} に出力しました")
+    print(
+        f"変換完了: {row_count}件のデータを {output_name(output_format)} に出力しました"
+    )
+    if profiler is not None:
+        profiler.add(profile)
+        print(f"計測結果: {profiler.write_report()}")
 
 
 if __name__ == "__main__":
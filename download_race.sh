@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 #
 # 競走成績・番組表ダウンロードスクリプト
-# 指定されたタイプ（競走成績または番組表）のデータをダウンロード、解凍、文字コード変換を行う
+# 指定されたタイプ（競走成績または番組表）のデータ（lzh形式のアーカイブ）をダウンロードする
+# アーカイブは解凍せずに保存する（変換プログラムがアーカイブを直接読み込む）
 #
 # 使用方法: ./download_race.sh [p|r] YYYY MM DD
 #
@@ -82,66 +83,35 @@ mkdir -p "$OUTPUT_DIR"
 
 # ファイル名とURL生成
 ARCHIVE_FILENAME="${PREFIX}${YEAR_SHORT}${MONTH_PADDED}${DAY_PADDED}.lzh"
-RESULT_FILENAME="${PREFIX}${YEAR_SHORT}${MONTH_PADDED}${DAY_PADDED}.txt"
+TEXT_FILENAME="${PREFIX}${YEAR_SHORT}${MONTH_PADDED}${DAY_PADDED}.txt"
 UTF8_FILENAME="${PREFIX}${YEAR_SHORT}${MONTH_PADDED}${DAY_PADDED}_u8.txt"
 
 DOWNLOAD_URL="https://www1.mbrace.or.jp/od2/${URL_PATH}/${YEAR_FULL}${MONTH_PADDED}/${ARCHIVE_FILENAME}"
-ARCHIVE_PATH="${ARCHIVE_FILENAME}"  # カレントディレクトリに一時保存
-RESULT_PATH="${OUTPUT_DIR}/${UTF8_FILENAME}"
+RESULT_PATH="${OUTPUT_DIR}/${ARCHIVE_FILENAME}"
+TEXT_PATH="${OUTPUT_DIR}/${TEXT_FILENAME}"  # 以前のバージョンで解凍したファイル
+UTF8_PATH="${OUTPUT_DIR}/${UTF8_FILENAME}"  # 以前のバージョンでUTF-8に変換したファイル
 
 echo "処理開始: ${YEAR_FULL}年${MONTH}月${DAY}日の${TYPE_NAME}データを処理します"
 echo "ダウンロードURL: ${DOWNLOAD_URL}"
 
-# 既にファイルが存在する場合はスキップ
-if [ -f "$RESULT_PATH" ]; then
-    echo "ファイルが既に存在します: $RESULT_PATH"
-    echo "処理をスキップします。"
-    exit 0
-fi
+# 既にアーカイブ（または解凍済みのファイル）が存在する場合はスキップ
+for EXISTING_PATH in "$RESULT_PATH" "$TEXT_PATH" "$UTF8_PATH"; do
+    if [ -f "$EXISTING_PATH" ]; then
+        echo "ファイルが既に存在します: $EXISTING_PATH"
+        echo "処理をスキップします。"
+        exit 0
+    fi
+done
 
 # ダウンロード処理（wgetコマンドを使用して、指定されたURLからlzh形式の圧縮ファイルをダウンロード）
-# ダウンロードしたファイルは、カレントディレクトリに一時的に保存される（後ほど削除）
+# アーカイブは解凍せず、番組表と競走成績でそれぞれ指定のディレクトリにそのまま保存する
+# 変換プログラム（convert_program.py / convert_race_result.py）がアーカイブをメモリ上で展開して読み込む
 echo "ダウンロード中: ${ARCHIVE_FILENAME}"
-if ! wget -q --show-progress -O "$ARCHIVE_PATH" "$DOWNLOAD_URL"; then
+if ! wget -q --show-progress -O "$RESULT_PATH" "$DOWNLOAD_URL"; then
+    # 途中まで書き込まれたファイルは残さない（次回の実行でスキップされないように）
+    rm -f "$RESULT_PATH"
     error_exit "ダウンロードに失敗しました: $DOWNLOAD_URL"
 fi
 
-echo "ダウンロード完了: $ARCHIVE_PATH"
-
-# 解凍処理（lhaコマンドを使用して解凍。解凍後、ファイルはカレントディレクトリに一時保存）
-echo "解凍中: ${ARCHIVE_FILENAME}"
-if ! lha x "$ARCHIVE_PATH" > /dev/null 2>&1; then
-    error_exit "解凍に失敗しました: $ARCHIVE_PATH"
-fi
-
-# 解凍されたファイルの存在確認
-if [ ! -f "$RESULT_FILENAME" ]; then
-    error_exit "解凍後のファイルが見つかりません: $RESULT_FILENAME"
-fi
-
-echo "解凍完了: $RESULT_FILENAME"
-
-# 正常に解凍された場合、元のアーカイブファイルは削除
-if [ -f "$ARCHIVE_PATH" ]; then
-    rm "$ARCHIVE_PATH"
-    echo "アーカイブファイルを削除しました: $ARCHIVE_PATH"
-fi
-
-# 文字コード変換（Shift-JIS → UTF-8）
-# 解凍されたファイルはShift-JISエンコーディングで保存されているため、iconvコマンドを使用してUTF-8に変換
-# 変換後のファイルは番組表と競走結果でそれぞれ指定のディレクトリに保存
-echo "文字コード変換中: Shift-JIS → UTF-8"
-if ! iconv -f SHIFT_JIS -t UTF-8 "$RESULT_FILENAME" > "$RESULT_PATH"; then
-    error_exit "文字コード変換に失敗しました: $RESULT_FILENAME"
-fi
-
-echo "文字コード変換完了: $RESULT_PATH"
-
-# 一時ファイルの削除（正常に変換された場合、元のShift-JISファイルは削除）
-if [ -f "$RESULT_FILENAME" ]; then
-    rm "$RESULT_FILENAME"
-    echo "Shift-JISファイルを削除しました: $RESULT_FILENAME"
-fi
-
 echo "処理完了: ${YEAR_FULL}年${MONTH}月${DAY}日の${TYPE_NAME}データ処理が正常に完了しました"
 echo "出力ファイル: $RESULT_PATH"
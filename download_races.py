@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+番組表・競走成績の一括ダウンロードプログラム（非同期）
+
+公式サイトの番組表（B/）・競走成績（K/）のアーカイブ（lzh形式）を、
+同時接続数と1秒あたりのリクエスト数を制限しながら並行してダウンロードする。
+失敗したダウンロードは間隔を広げながら再試行し、完了した日は状態ファイルに記録する
+（中断しても、次回は完了していない日だけをダウンロードする）。
+アーカイブは解凍せずに保存し、--convert を指定するとダウンロード後にそのまま変換する。
+
+使用方法: python download_races.py [p|r|pr] --from YYYY-MM-DD --to YYYY-MM-DD
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import convert_race_result
+from convert_program import ProgramConverter
+from lzh_archive import verify_archive
+from race_io import raw_file_path
+
+# ダウンロード元（--base-url でテスト用のサーバーなどに変更できる）
+BASE_URL = "https://www1.mbrace.or.jp/od2"
+
+# 種類ごとの (表示名, URLのパス, ファイル名の先頭文字, 保存先ディレクトリ)
+DOWNLOAD_TYPES = {
+    "p": ("番組表", "B", "b", os.path.join("data", "raw", "programs")),
+    "r": ("競走成績", "K", "k", os.path.join("data", "raw", "results")),
+}
+
+# 完了した日を記録する状態ファイル
+STATE_FILE = os.path.join("data", "raw", "download_state.json")
+
+# 状態ファイルの形式のバージョン
+STATE_VERSION = 1
+
+# データなし（404）と記録した日を、次回の実行でスキップするまでの日数
+# （確認した日より NOT_FOUND_FINAL_DAYS 日以上前の日だけ。それより新しい日は
+# まだ公開されていない可能性があるため、次回も確認する）
+NOT_FOUND_FINAL_DAYS = 3
+
+# 状態ファイルを書き込む最短の間隔（秒）
+STATE_SAVE_INTERVAL = 1.0
+
+# デフォルトの同時接続数・1秒あたりのリクエスト数・再試行回数・タイムアウト（秒）
+DEFAULT_JOBS = 4
+DEFAULT_RATE = 2.0
+DEFAULT_RETRIES = 4
+DEFAULT_TIMEOUT = 30.0
+
+# 再試行の待ち時間（秒）: BACKOFF_BASE * 2^(試行回数)（最大 BACKOFF_MAX）の50〜100%
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = (
+    "--from",
+    "--to",
+    "--jobs",
+    "--rate",
+    "--retries",
+    "--timeout",
+    "--base-url",
+    "--state",
+)
+
+# 値を取らないコマンドラインオプション
+FLAG_OPTIONS = ("--convert",)
+
+# ダウンロード結果
+DONE = "done"
+SKIPPED = "skipped"
+NOT_FOUND = "not_found"
+FAILED = "failed"
+
+# 4xxのうち再試行するHTTPステータス（429 Too Many Requests）
+RETRY_STATUS_CODES = (429,)
+
+
+class DownloadState:
+    """完了した日の記録（種類ごとに YYYY-MM-DD → 保存したファイルの情報）
+
+    データなし（404）の日は {"status": "not_found", "url": ..., "checked": 確認した日}
+    として記録する（status のない記録はダウンロード済み）
+    """
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.days: Dict[str, Dict[str, Dict]] = {kind: {} for kind in DOWNLOAD_TYPES}
+        self.last_saved = 0.0
+        self.dirty = False
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for kind, days in json.load(f).get("days", {}).items():
+                    self.days.setdefault(kind, {}).update(days)
+
+    def is_done(self, kind: str, day: date) -> bool:
+        """ダウンロードしなくてよい日かチェック
+
+        ダウンロード済みで保存したファイルも残っている日と、データなしと確定した日
+        （確認した時点で NOT_FOUND_FINAL_DAYS 日以上前だった日）
+        """
+        entry = self.days[kind].get(day.isoformat())
+        if entry is None:
+            return False
+        if entry.get("status") == NOT_FOUND:
+            checked = date.fromisoformat(entry["checked"])
+            return (checked - day).days >= NOT_FOUND_FINAL_DAYS
+        return os.path.exists(entry["path"])
+
+    def record(self, kind: str, day: date, path: str, size: int) -> None:
+        """ダウンロードした日を記録し、前回の保存から時間がたっていれば保存"""
+        self.update(kind, day, {"path": path, "size": size})
+
+    def record_not_found(self, kind: str, day: date, url: str) -> None:
+        """データなし（404）の日を記録し、前回の保存から時間がたっていれば保存"""
+        checked = date.today().isoformat()
+        self.update(kind, day, {"status": NOT_FOUND, "url": url, "checked": checked})
+
+    def update(self, kind: str, day: date, entry: Dict) -> None:
+        """1日分の記録を更新し、前回の保存から時間がたっていれば保存"""
+        self.days[kind][day.isoformat()] = entry
+        self.dirty = True
+        if time.monotonic() - self.last_saved >= STATE_SAVE_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        """状態ファイルを保存（一時ファイルに書いてから置き換える）"""
+        if not self.dirty:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": STATE_VERSION,
+                    "days": {
+                        kind: dict(sorted(days.items()))
+                        for kind, days in self.days.items()
+                    },
+                },
+                f,
+                ensure_ascii=False,
+                indent=1,
+            )
+        os.replace(temp_file, self.path)
+        self.last_saved = time.monotonic()
+        self.dirty = False
+
+
+class RateLimiter:
+    """リクエストの開始間隔を 1 / rate 秒以上あける（rate が 0 以下なら制限なし）"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_time = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """次のリクエストを開始してよい時刻まで待つ"""
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+                now += delay
+            self.next_time = now + self.interval
+
+
+def archive_url(base_url: str, kind: str, day: date) -> str:
+    """アーカイブのURL（例: {base_url}/B/202401/b240101.lzh）"""
+    _, url_path, prefix, _ = DOWNLOAD_TYPES[kind]
+    return (
+        f"{base_url.rstrip('/')}/{url_path}/{day.year:04d}{day.month:02d}/"
+        f"{prefix}{day.year % 100:02d}{day.month:02d}{day.day:02d}.lzh"
+    )
+
+
+def archive_path(kind: str, day: date) -> str:
+    """アーカイブの保存先"""
+    _, _, prefix, output_dir = DOWNLOAD_TYPES[kind]
+    return os.path.join(
+        output_dir, f"{prefix}{day.year % 100:02d}{day.month:02d}{day.day:02d}.lzh"
+    )
+
+
+def existing_raw_file(kind: str, day: date) -> Optional[str]:
+    """その日の元ファイル（アーカイブ・展開済みのファイル）がすでにあればそのパス"""
+    _, _, prefix, output_dir = DOWNLOAD_TYPES[kind]
+    path = raw_file_path(output_dir, prefix, day.year, day.month, day.day)
+    return path if os.path.exists(path) else None
+
+
+def fetch_archive(url: str, timeout: float) -> bytes:
+    """アーカイブをダウンロードし、展開できること（CRCの一致）を確認して返す
+
+    途中で切れたデータや壊れたデータは ValueError（再試行の対象）
+    """
+    request = urllib.request.Request(
+        url, headers={"User-Agent": "boatrace-prediction downloader"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read()
+
+    verify_archive(data)
+    return data
+
+
+def save_archive(path: str, data: bytes) -> None:
+    """アーカイブを保存（書き込み途中のファイルが残らないよう、一時ファイルから置き換える）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_file = path + ".part"
+    with open(temp_file, "wb") as f:
+        f.write(data)
+    os.replace(temp_file, path)
+
+
+def backoff_delay(attempt: int) -> float:
+    """再試行までの待ち時間（秒）"""
+    delay = BACKOFF_BASE * (2**attempt)
+    return min(BACKOFF_MAX, delay) * (0.5 + random.random() / 2)
+
+
+async def download_day(
+    kind: str,
+    day: date,
+    base_url: str,
+    limiter: RateLimiter,
+    retries: int,
+    timeout: float,
+) -> Tuple[str, str]:
+    """1日分のアーカイブをダウンロードし、(結果, メッセージ) を返す"""
+    url = archive_url(base_url, kind, day)
+    path = archive_path(kind, day)
+
+    for attempt in range(retries + 1):
+        await limiter.wait()
+        try:
+            data = await asyncio.to_thread(fetch_archive, url, timeout)
+            await asyncio.to_thread(save_archive, path, data)
+            return DONE, path
+        except urllib.error.HTTPError as e:
+            # 開催がない日・まだ公開されていない日は 404 になる
+            if e.code == 404:
+                return NOT_FOUND, url
+            if e.code < 500 and e.code not in RETRY_STATUS_CODES:
+                return FAILED, f"{url}: HTTP {e.code}"
+            error = f"HTTP {e.code}"
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            # 接続エラー・タイムアウト・壊れたアーカイブ
+            error = str(e)
+
+        if attempt < retries:
+            delay = backoff_delay(attempt)
+            print(f"再試行: {url}（{error}、{delay:.1f}秒後）")
+            await asyncio.sleep(delay)
+
+    return FAILED, f"{url}: {error}"
+
+
+async def download_all(
+    kinds: str,
+    start: date,
+    end: date,
+    state: DownloadState,
+    base_url: str = BASE_URL,
+    jobs: int = DEFAULT_JOBS,
+    rate: float = DEFAULT_RATE,
+    retries: int = DEFAULT_RETRIES,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Dict[str, List[Tuple[str, date, str]]]:
+    """期間内の各日・各種類のアーカイブを並行してダウンロード
+
+    同時にダウンロードするのは jobs 日分まで、リクエストの開始は1秒あたり rate 回まで。
+    戻り値は結果（DONE / SKIPPED / NOT_FOUND / FAILED）ごとの (種類, 日付, メッセージ) のリスト
+    """
+    limiter = RateLimiter(rate)
+    semaphore = asyncio.Semaphore(jobs)
+    results: Dict[str, List[Tuple[str, date, str]]] = {
+        DONE: [],
+        SKIPPED: [],
+        NOT_FOUND: [],
+        FAILED: [],
+    }
+
+    async def run(kind: str, day: date) -> None:
+        existing = existing_raw_file(kind, day)
+        if state.is_done(kind, day) or existing:
+            results[SKIPPED].append((kind, day, existing or ""))
+            return
+
+        async with semaphore:
+            status, message = await download_day(
+                kind, day, base_url, limiter, retries, timeout
+            )
+        results[status].append((kind, day, message))
+
+        if status == DONE:
+            state.record(kind, day, message, os.path.getsize(message))
+            print(f"ダウンロード完了: {message}")
+        elif status == NOT_FOUND:
+            state.record_not_found(kind, day, message)
+        elif status == FAILED:
+            print(f"エラー: ダウンロードに失敗しました: {message}")
+
+    tasks = []
+    day = start
+    while day <= end:
+        for kind in kinds:
+            tasks.append(run(kind, day))
+        day += timedelta(days=1)
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # 中断された場合も、完了した日は記録しておく
+        state.save()
+
+    return results
+
+
+def convert_downloaded(kinds: str, start: date, end: date) -> int:
+    """期間内のダウンロード済みのアーカイブを変換（変更のないファイルはスキップ）"""
+    exit_code = 0
+
+    if "p" in kinds:
+        converter = ProgramConverter(incremental=True)
+        os.makedirs(os.path.dirname(converter.output_file), exist_ok=True)
+        targets = [
+            target
+            for target in converter.date_range_targets(start, end)
+            if os.path.exists(target[3])
+        ]
+        exit_code |= converter.convert_files(targets)
+
+    if "r" in kinds:
+        targets = [
+            target
+            for target in convert_race_result.date_range_targets(start, end)
+            if os.path.exists(target[3])
+        ]
+        file_count, row_count, failed_files = convert_race_result.convert_files(
+            targets,
+            convert_race_result.OUTPUT_FILE,
+            os.cpu_count() or 1,
+            incremental=True,
+        )
+        print(
+            f"変換完了: {file_count}ファイル・{row_count}件のデータを "
+            f"{convert_race_result.OUTPUT_FILE} に出力しました"
+        )
+        if failed_files:
+            exit_code = 1
+
+    return exit_code
+
+
+def parse_date(value: str) -> date:
+    """YYYY-MM-DD形式の日付文字列を解析"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"日付はYYYY-MM-DD形式で入力してください: {value}")
+
+
+def print_usage():
+    """使用方法を表示"""
+    print(
+        "使用方法: python download_races.py [p|r|pr] "
+        "--from YYYY-MM-DD --to YYYY-MM-DD [オプション]"
+    )
+    print("  p: 番組表、r: 競走成績、pr: 両方")
+    print("オプション:")
+    print(f"  --jobs: 同時にダウンロードする数（デフォルト: {DEFAULT_JOBS}）")
+    print(
+        f"  --rate: 1秒あたりのリクエスト数の上限（デフォルト: {DEFAULT_RATE}、"
+        "0 で制限なし）"
+    )
+    print(f"  --retries: 失敗したときの再試行回数（デフォルト: {DEFAULT_RETRIES}）")
+    print(f"  --timeout: 1リクエストのタイムアウト秒数（デフォルト: {DEFAULT_TIMEOUT}）")
+    print(f"  --base-url: ダウンロード元（デフォルト: {BASE_URL}）")
+    print(f"  --state: 完了した日を記録する状態ファイル（デフォルト: {STATE_FILE}）")
+    print("  --convert: ダウンロード後に変換（変更のないファイルはスキップ）")
+
+
+def parse_args(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """コマンドライン引数を位置引数とオプションに分ける"""
+    positionals = []
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS:
+            if i + 1 >= len(args):
+                raise ValueError(f"{arg} の値を指定してください")
+            options[arg] = args[i + 1]
+            i += 2
+        elif arg in FLAG_OPTIONS:
+            options[arg] = ""
+            i += 1
+        elif arg.startswith("--"):
+            raise ValueError(f"不明なオプションです: {arg}")
+        else:
+            positionals.append(arg)
+            i += 1
+    return positionals, options
+
+
+def main():
+    """メイン関数"""
+    if "--help" in sys.argv or "-h" in sys.argv:
+        print_usage()
+        return 0
+
+    try:
+        positionals, options = parse_args(sys.argv[1:])
+        if len(positionals) != 1 or not positionals[0]:
+            raise ValueError("種類（p / r / pr）を1つ指定してください")
+        kinds = positionals[0]
+        if any(kind not in DOWNLOAD_TYPES for kind in kinds):
+            raise ValueError(f"種類は p / r / pr のいずれかを指定してください: {kinds}")
+        kinds = "".join(kind for kind in DOWNLOAD_TYPES if kind in kinds)
+
+        if "--from" not in options or "--to" not in options:
+            raise ValueError("--from と --to の両方を指定してください")
+        start = parse_date(options["--from"])
+        end = parse_date(options["--to"])
+        if start > end:
+            raise ValueError(f"開始日が終了日より後になっています: {start} > {end}")
+
+        jobs = int(options.get("--jobs", DEFAULT_JOBS))
+        rate = float(options.get("--rate", DEFAULT_RATE))
+        retries = int(options.get("--retries", DEFAULT_RETRIES))
+        timeout = float(options.get("--timeout", DEFAULT_TIMEOUT))
+        if jobs < 1 or retries < 0 or timeout <= 0:
+            raise ValueError(
+                "--jobs は1以上、--retries は0以上、"
+                "--timeout は0より大きい値を指定してください"
+            )
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        return 1
+
+    state = DownloadState(options.get("--state", STATE_FILE))
+    names = "・".join(DOWNLOAD_TYPES[kind][0] for kind in kinds)
+    print(
+        f"処理開始: {start}〜{end}の{names}をダウンロードします"
+        f"（同時接続数: {jobs}、1秒あたり最大{rate}リクエスト）"
+    )
+
+    try:
+        results = asyncio.run(
+            download_all(
+                kinds,
+                start,
+                end,
+                state,
+                options.get("--base-url", BASE_URL),
+                jobs,
+                rate,
+                retries,
+                timeout,
+            )
+        )
+    except KeyboardInterrupt:
+        state.save()
+        print("中断しました（完了した日は状態ファイルに記録済みです）")
+        return 1
+
+    print(
+        f"ダウンロード結果: 完了 {len(results[DONE])}件、"
+        f"スキップ（ダウンロード済み） {len(results[SKIPPED])}件、"
+        f"データなし {len(results[NOT_FOUND])}件、失敗 {len(results[FAILED])}件"
+    )
+
+    exit_code = 1 if results[FAILED] else 0
+    if "--convert" in options:
+        exit_code |= convert_downloaded(kinds, start, end)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
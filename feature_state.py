@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+特徴量の差分更新プログラム
+
+選手・モーター・ボートごとの集計（通算の出走数・合計、直近N走の値、指数減衰した合計）を
+状態ファイル（data/feature_state.json）に保存し、1日分のレース結果を適用して更新する。
+当日の朝の特徴量は、状態ファイルと当日の番組表だけから作成する（過去の全結果は読まない）。
+
+- 直近N走の特徴量は race_features.py と同じ値になる（前日までの結果で集計）
+- 適用した日は直近 JOURNAL_DAYS 日分まで、更新前の集計を記録してロールバックできる
+- 状態ファイルは一時ファイルに書いてから置き換える（書き込み途中で壊れない）
+
+例:
+    python feature_state.py apply --from 2024-01-01 --to 2024-06-30
+    python feature_state.py apply 2024 7 1
+    python feature_state.py rollback
+    python feature_state.py features 2024 7 2
+"""
+
+import csv
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from convert_program import ProgramConverter
+from convert_race_result import CSV_HEADERS, get_input_path, iter_race_data
+from race_feature_columns import ENTITIES, METRICS, RACE_KEYS, RESULT_RENAMES
+
+# 状態ファイル
+STATE_FILE = "data/feature_state.json"
+
+# 状態ファイルの形式のバージョン
+STATE_VERSION = 1
+
+# ロールバックできる日数（更新前の集計を記録しておく日数）
+JOURNAL_DAYS = 7
+
+# 指数減衰の半減期（日）
+DECAY_HALF_LIFE = 60
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = ("--from", "--to", "--state", "--output")
+
+# コマンド
+COMMANDS = ("apply", "rollback", "features")
+
+# レース結果の行（race_results.csv と同じ並び）の列の位置
+RESULT_INDEX = {RESULT_RENAMES.get(name, name): i for i, name in enumerate(CSV_HEADERS)}
+
+
+def day_key(year: int, month: int, day: int) -> str:
+    """状態ファイルの日付（YYYY-MM-DD）"""
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def entity_key(row: List, index: Dict[str, int], columns: List[str]) -> str:
+    """集計のキー（例: 選手 "4315"、モーター "24-50"）
+
+    レース結果の行は文字列（"01"）、出走表の行は整数（1）のため、整数にしてから連結する
+    """
+    return "-".join(str(int(row[index[column]])) for column in columns)
+
+
+def to_position(value: str) -> Optional[int]:
+    """着を着順に変換（失格・フライングなどは None）"""
+    try:
+        position = int(value)
+    except ValueError:
+        return None
+    return position if 1 <= position <= 6 else None
+
+
+def result_values(rows: List[List]) -> List[List[Optional[float]]]:
+    """レース結果の各行の1走ごとの値（METRICS の順）を求める
+
+    値の定義は race_features.read_results と同じ
+    """
+    exhibition: Dict[Tuple, List[float]] = {}
+    for row in rows:
+        exhibition.setdefault(tuple(row[:5]), []).append(float(row[15]))
+
+    values = []
+    for row in rows:
+        position = to_position(row[10])
+        race_exhibition = exhibition[tuple(row[:5])]
+        values.append(
+            [
+                position,
+                float(position is not None and position <= 1),
+                float(position is not None and position <= 2),
+                float(position is not None and position <= 3),
+                float(row[17]),
+                float(row[15]) - sum(race_exhibition) / len(race_exhibition),
+            ]
+        )
+    return values
+
+
+def new_record(day: str) -> Dict:
+    """集計の初期値"""
+    metric_count = len(METRICS)
+    return {
+        "n": 0,
+        "sum": [0.0] * metric_count,
+        "cnt": [0] * metric_count,
+        "dsum": [0.0] * metric_count,
+        "dcnt": [0.0] * metric_count,
+        "recent": [],
+        "last": day,
+    }
+
+
+def decay_record(record: Dict, day: str) -> None:
+    """指数減衰した合計を day の時点まで減衰させる"""
+    elapsed = (parse_date(day) - parse_date(record["last"])).days
+    factor = 0.5 ** (elapsed / DECAY_HALF_LIFE)
+    record["dsum"] = [value * factor for value in record["dsum"]]
+    record["dcnt"] = [value * factor for value in record["dcnt"]]
+    record["last"] = day
+
+
+def update_record(record: Dict, values: List[Optional[float]], window: int) -> None:
+    """1走分の値を集計に加える（欠損値は合計・件数に含めない）"""
+    record["n"] += 1
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        record["sum"][i] += value
+        record["cnt"][i] += 1
+        record["dsum"][i] += value
+        record["dcnt"][i] += 1
+    record["recent"].append(values)
+    del record["recent"][:-window]
+
+
+def snapshot_record(record: Optional[Dict]) -> Optional[Dict]:
+    """ロールバック用に、更新前の集計を記録する（新しいキーの場合は None）"""
+    if record is None:
+        return None
+    return {
+        key: list(value) if isinstance(value, list) else value
+        for key, value in record.items()
+    }
+
+
+def compact_snapshot(snapshot: Dict, added: int, window: int) -> None:
+    """ロールバック用の記録の直近の値を、その日に窓から押し出された値だけにする
+
+    更新後の直近の値は「更新前の値の末尾 kept 件 + その日の added 件」なので、
+    押し出された先頭の値と kept があれば更新前の値に戻せる
+    """
+    recent = snapshot["recent"]
+    kept = min(len(recent), max(window - added, 0))
+    snapshot["recent"] = recent[: len(recent) - kept]
+    snapshot["kept"] = kept
+
+
+def restore_record(snapshot: Dict, record: Dict) -> Dict:
+    """ロールバック用の記録と現在の集計から、更新前の集計を復元する"""
+    restored = dict(snapshot)
+    kept = restored.pop("kept")
+    restored["recent"] = snapshot["recent"] + record["recent"][:kept]
+    return restored
+
+
+def mean(total: float, count: float) -> Optional[float]:
+    """平均（件数が0なら None）"""
+    return total / count if count > 0 else None
+
+
+def feature_headers() -> List[str]:
+    """特徴量の列名（出走表のキーの後に続く列）
+
+    直近N走の列は race_features.py と同じ名前
+    """
+    headers = []
+    for name, (_, window) in ENTITIES.items():
+        for prefix in (f"{name}{window}走", f"{name}通算"):
+            headers.append(f"{prefix}_出走数")
+            headers.extend(f"{prefix}_{metric}" for metric in METRICS.values())
+        headers.extend(f"{name}減衰_{metric}" for metric in METRICS.values())
+    return headers
+
+
+def record_features(record: Optional[Dict]) -> List:
+    """1つの集計から特徴量の値を求める（集計がなければすべて None）"""
+    metric_count = len(METRICS)
+    if record is None:
+        return [None] * (2 + 3 * metric_count)
+
+    recent = record["recent"]
+    features: List = [len(recent)]
+    for i in range(metric_count):
+        values = [run[i] for run in recent if run[i] is not None]
+        features.append(mean(sum(values), len(values)))
+    features.append(record["n"])
+    for totals, counts in (("sum", "cnt"), ("dsum", "dcnt")):
+        features.extend(
+            mean(record[totals][i], record[counts][i]) for i in range(metric_count)
+        )
+    return features
+
+
+class FeatureState:
+    """選手・モーター・ボートごとの集計の状態"""
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.last_date: Optional[str] = None
+        self.aggregates: Dict[str, Dict[str, Dict]] = {name: {} for name in ENTITIES}
+        self.journal: List[Dict] = []
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != STATE_VERSION:
+                raise ValueError(f"状態ファイルの形式が異なります: {path}")
+            self.last_date = data["last_date"]
+            self.aggregates = data["aggregates"]
+            self.journal = data["journal"]
+
+    def apply_day(self, year: int, month: int, day: int, rows: List[List]) -> int:
+        """1日分のレース結果（race_results.csv と同じ並びの行）を集計に加える
+
+        適用済みの最後の日より後の日だけ適用できる。戻り値は更新した集計の数
+        """
+        today = day_key(year, month, day)
+        if self.last_date is not None and today <= self.last_date:
+            raise ValueError(
+                f"{today} は適用済みの日（{self.last_date}）以前です"
+                "（適用し直す場合は先にロールバックしてください）"
+            )
+
+        # 同じ日の中はレース場・レース番号の順に加える（race_features.py と同じ順）
+        rows = sorted(rows, key=lambda row: (int(row[3]), int(row[4])))
+        before: Dict[str, Dict[str, Optional[Dict]]] = {name: {} for name in ENTITIES}
+        added: Dict[str, Dict[str, int]] = {name: {} for name in ENTITIES}
+        for row, values in zip(rows, result_values(rows)):
+            for name, (columns, window) in ENTITIES.items():
+                key = entity_key(row, RESULT_INDEX, columns)
+                records = self.aggregates[name]
+                if key not in before[name]:
+                    # その日の最初の更新の前に、ロールバック用に元の集計を記録する
+                    before[name][key] = snapshot_record(records.get(key))
+                    record = records.setdefault(key, new_record(today))
+                    decay_record(record, today)
+                update_record(records[key], values, window)
+                added[name][key] = added[name].get(key, 0) + 1
+
+        for name, (_, window) in ENTITIES.items():
+            for key, snapshot in before[name].items():
+                if snapshot is not None:
+                    compact_snapshot(snapshot, added[name][key], window)
+
+        self.journal.append(
+            {"date": today, "previous_last_date": self.last_date, "before": before}
+        )
+        del self.journal[:-JOURNAL_DAYS]
+        self.last_date = today
+        return sum(len(records) for records in before.values())
+
+    def rollback(self) -> str:
+        """最後に適用した日を取り消し、取り消した日（YYYY-MM-DD）を返す"""
+        if not self.journal:
+            raise ValueError("ロールバックできる日がありません")
+
+        entry = self.journal.pop()
+        for name, snapshots in entry["before"].items():
+            records = self.aggregates[name]
+            for key, snapshot in snapshots.items():
+                if snapshot is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = restore_record(snapshot, records[key])
+        self.last_date = entry["previous_last_date"]
+        return entry["date"]
+
+    def features(self, entry_rows: List[List], index: Dict[str, int]) -> List[List]:
+        """出走表の各艇の特徴量の行（出走表のキー + feature_headers の列）を作成
+
+        index は出走表の行の列名 → 位置。対象日より前の日の結果だけを使うため、
+        対象日以降の結果を適用済みの場合はエラーにする
+        """
+        rows = []
+        for entry in entry_rows:
+            target = day_key(*(int(entry[index[column]]) for column in RACE_KEYS[:3]))
+            if self.last_date is not None and self.last_date >= target:
+                raise ValueError(
+                    f"{target} の特徴量に使えない結果（{self.last_date}まで）を"
+                    "適用済みです（ロールバックしてください）"
+                )
+            row = [entry[index[column]] for column in RACE_KEYS]
+            for name, (columns, _) in ENTITIES.items():
+                key = entity_key(entry, index, columns)
+                row.extend(record_features(self.aggregates[name].get(key)))
+            rows.append(row)
+        return rows
+
+    def save(self) -> None:
+        """状態を保存（一時ファイルに書いてから置き換える）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": STATE_VERSION,
+                    "last_date": self.last_date,
+                    "aggregates": self.aggregates,
+                    "journal": self.journal,
+                },
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(temp_file, self.path)
+
+
+def apply_days(state: FeatureState, days: Iterable[date]) -> Tuple[int, int]:
+    """各日のレース結果を状態に適用し、(適用した日数, 見つからなかった日数) を返す"""
+    applied = 0
+    missing = 0
+    for current in days:
+        input_path = get_input_path(current.year, current.month, current.day)
+        if not os.path.exists(input_path):
+            print(f"警告: ファイル {input_path} が見つかりません")
+            missing += 1
+            continue
+        year, month, day = current.year, current.month, current.day
+        rows = list(iter_race_data(input_path, year, month, day))
+        updated = state.apply_day(year, month, day, rows)
+        print(f"適用: {current}（{len(rows)}件、集計 {updated}件を更新）")
+        applied += 1
+    return applied, missing
+
+
+def format_value(value) -> object:
+    """CSVに出力する値（欠損値は空欄、小数は4桁に丸める）"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return round(value, 4)
+    return value
+
+
+def write_features(rows: List[List], output_file: str) -> None:
+    """特徴量をCSVに出力"""
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(RACE_KEYS + feature_headers())
+        for row in rows:
+            writer.writerow([format_value(value) for value in row])
+
+
+def parse_date(value: str) -> date:
+    """YYYY-MM-DD形式の日付文字列を解析"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"日付はYYYY-MM-DD形式で入力してください: {value}")
+
+
+def parse_day(positionals: List[str]) -> date:
+    """位置引数の <年> <月> <日> を解析"""
+    if len(positionals) != 3:
+        raise ValueError("<年> <月> <日> を指定してください")
+    try:
+        return date(*(int(value) for value in positionals))
+    except ValueError:
+        raise ValueError(f"日付が正しくありません: {' '.join(positionals)}")
+
+
+def print_usage():
+    """使用方法を表示"""
+    print("使用方法: python feature_state.py apply <年> <月> <日>")
+    print("          python feature_state.py apply --from YYYY-MM-DD --to YYYY-MM-DD")
+    print("          python feature_state.py rollback")
+    print("          python feature_state.py features <年> <月> <日> [--output FILE]")
+    print("  apply: その日のレース結果を集計に加える（期間指定は日付順に適用）")
+    print(f"  rollback: 最後に適用した日を取り消す（直近{JOURNAL_DAYS}日分まで）")
+    print("  features: その日の番組表の各艇の特徴量を出力")
+    print(f"  --state: 状態ファイル（デフォルト: {STATE_FILE}）")
+    print("  --output: 特徴量の出力ファイル（デフォルト: data/race_features_YYYYMMDD.csv）")
+
+
+def parse_args(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """コマンドライン引数を位置引数とオプションに分ける"""
+    positionals = []
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS:
+            if i + 1 >= len(args):
+                raise ValueError(f"{arg} の値を指定してください")
+            options[arg] = args[i + 1]
+            i += 2
+        elif arg.startswith("--"):
+            raise ValueError(f"不明なオプションです: {arg}")
+        else:
+            positionals.append(arg)
+            i += 1
+
+    if not positionals or positionals[0] not in COMMANDS:
+        raise ValueError(f"コマンドは {' / '.join(COMMANDS)} のいずれかを指定してください")
+    return positionals, options
+
+
+def main_apply(state: FeatureState, positionals: List[str], options: Dict[str, str]):
+    """apply コマンド"""
+    if "--from" in options or "--to" in options:
+        if positionals or "--from" not in options or "--to" not in options:
+            raise ValueError(
+                "--from と --to の両方を指定してください（<年> <月> <日> とは併用不可）"
+            )
+        start = parse_date(options["--from"])
+        end = parse_date(options["--to"])
+        if start > end:
+            raise ValueError(f"開始日が終了日より後になっています: {start} > {end}")
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    else:
+        days = [parse_day(positionals)]
+
+    try:
+        applied, missing = apply_days(state, days)
+    finally:
+        # 途中でエラーになった場合も、適用済みの日までは保存する
+        state.save()
+
+    print(f"適用完了: {applied}日分を {state.path} に保存しました（最終日: {state.last_date}）")
+    if len(days) == 1 and missing:
+        sys.exit(1)
+
+
+def main_features(state: FeatureState, positionals: List[str], options: Dict[str, str]):
+    """features コマンド"""
+    target = parse_day(positionals)
+    converter = ProgramConverter()
+    input_file = converter.get_input_file(target.year, target.month, target.day)
+    if not os.path.exists(input_file):
+        print(f"エラー: ファイル {input_file} が見つかりません")
+        sys.exit(1)
+
+    races = converter.parse_file(input_file, target.year, target.month, target.day)
+    entry_rows = [row for race in races for row in converter.build_entry_rows(race)]
+    index = {name: i for i, name in enumerate(converter.entries_headers)}
+    rows = state.features(entry_rows, index)
+
+    output_file = options.get(
+        "--output", f"data/race_features_{target:%Y%m%d}.csv"
+    )
+    write_features(rows, output_file)
+    print(f"作成完了: {len(rows)}件の特徴量を {output_file} に出力しました")
+
+
+def main():
+    """メイン関数"""
+    try:
+        positionals, options = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        sys.exit(1)
+
+    command = positionals.pop(0)
+    try:
+        state = FeatureState(options.get("--state", STATE_FILE))
+        if command == "apply":
+            main_apply(state, positionals, options)
+        elif command == "rollback":
+            day = state.rollback()
+            state.save()
+            print(f"ロールバック完了: {day} を取り消しました（最終日: {state.last_date}）")
+        else:
+            main_features(state, positionals, options)
+    except ValueError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LZH（LHA）アーカイブの読み込み
+
+公式サイトからダウンロードした番組表・競走成績のアーカイブ（b/kYYMMDD.lzh）を
+展開せずにメモリ上で読み込み、格納されているファイルの内容を返す。
+lha コマンドや一時ファイルは使わない。
+
+対応している形式
+- ヘッダーレベル: 0 / 1 / 2
+- 圧縮方式: -lh0-（無圧縮）、-lh5- / -lh6- / -lh7-（スライド辞書 + 静的ハフマン符号）
+"""
+
+import array
+import struct
+import sys
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+# 圧縮方式ごとのスライド辞書のサイズ（ビット数）と、位置の記号数のビット数
+DICTIONARY_BITS = {b"-lh5-": (13, 4), b"-lh6-": (15, 5), b"-lh7-": (16, 5)}
+
+# 無圧縮の方式
+STORED_METHODS = (b"-lh0-", b"-lz4-")
+
+# 文字・一致長の記号数（256文字 + 一致長3〜256）と、その数のビット数
+NC = 510
+CBIT = 9
+
+# 文字・一致長の符号長を符号化する記号数と、その数のビット数
+NT = 19
+TBIT = 5
+
+# 一致長の最小値
+THRESHOLD = 3
+
+# スライド辞書の初期値（一致位置がデータの先頭より前を指す場合は空白）
+INITIAL_BYTE = b" "
+
+# CRC-16（LHAのファイル内容のチェックサム、多項式 0xA001）の1バイト分の表
+CRC16_TABLE = []
+for _value in range(256):
+    for _ in range(8):
+        _value = (_value >> 1) ^ 0xA001 if _value & 1 else _value >> 1
+    CRC16_TABLE.append(_value)
+del _value
+
+# 展開中に壊れたデータで起きる例外（ヘッダー・圧縮データが途中で切れている、
+# 符号が表の範囲外を指すなど）。ValueError に変換して返す
+DECODE_ERRORS = (struct.error, IndexError, KeyError)
+
+# 2バイト分の表（最初に CRC を計算するときに作成。作成は crc16_word_table で行う）
+CRC16_WORD_TABLE: Optional[List[int]] = None
+CRC16_WORD_TABLE_LOCK = threading.Lock()
+
+
+def crc16_word_table() -> List[int]:
+    """2バイト分の表を返す（最初の呼び出しで作成）
+
+    複数のスレッドから同時に呼ばれても、ロックの中で1度だけ作成し、
+    作成し終えた表を1度に代入するため、作成途中の表は参照されない
+    """
+    global CRC16_WORD_TABLE
+    word_table = CRC16_WORD_TABLE
+    if word_table is None:
+        with CRC16_WORD_TABLE_LOCK:
+            word_table = CRC16_WORD_TABLE
+            if word_table is None:
+                table = CRC16_TABLE
+                word_table = [
+                    (value >> 8) ^ table[value & 0xFF]
+                    for value in ((x >> 8) ^ table[x & 0xFF] for x in range(1 << 16))
+                ]
+                CRC16_WORD_TABLE = word_table
+    return word_table
+
+
+def crc16(data: bytes) -> int:
+    """LHAのCRC-16を計算
+
+    2バイト（リトルエンディアン）ずつ表を引き、1バイトずつ計算するより
+    ループの回数を半分にする
+    """
+    table = CRC16_TABLE
+    word_table = crc16_word_table()
+
+    even = len(data) - len(data) % 2
+    words = array.array("H", data[:even])
+    if sys.byteorder == "big":
+        words.byteswap()
+
+    crc = 0
+    for word in words:
+        crc = word_table[crc ^ word]
+    if even < len(data):
+        crc = (crc >> 8) ^ table[(crc ^ data[-1]) & 0xFF]
+    return crc
+
+
+def build_table(lengths: List[int]) -> Tuple[List[int], int]:
+    """符号長のリストから、ハフマン符号の復号表を作成
+
+    符号は符号長の短い順・記号の番号順に割り当てる（カノニカルハフマン符号）。
+    表は最大の符号長のビット数で引き、各要素は (記号 << 5) | 符号長。
+    戻り値は (復号表, 表を引くビット数)
+    """
+    table_bits = max(lengths)
+    if not 0 < table_bits <= 16:
+        raise ValueError("ハフマン符号表が不正です")
+
+    table = [0] * (1 << table_bits)
+    code = 0
+    for length in range(1, table_bits + 1):
+        span = 1 << (table_bits - length)
+        for symbol, symbol_length in enumerate(lengths):
+            if symbol_length != length:
+                continue
+            start = code * span
+            table[start : start + span] = [symbol << 5 | length] * span
+            code += 1
+        code <<= 1
+
+    if code != 1 << (table_bits + 1):
+        raise ValueError("ハフマン符号表が不正です")
+    return table, table_bits
+
+
+class BitReader:
+    """圧縮データを上位ビットから順に読む"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+        self.buffer = 0
+        self.count = 0
+
+    def fill(self, bits: int) -> None:
+        """バッファに bits ビット以上たまるまで読み込む"""
+        while self.count < bits:
+            # 末尾を越えて先読みした分は 0 とする
+            chunk = self.data[self.position : self.position + 4].ljust(4, b"\0")
+            self.position += 4
+            self.buffer = (self.buffer & ((1 << self.count) - 1)) << 32 | (
+                int.from_bytes(chunk, "big")
+            )
+            self.count += 32
+
+    def peek(self, bits: int) -> int:
+        """bits ビットを読み進めずに返す"""
+        self.fill(bits)
+        return (self.buffer >> (self.count - bits)) & ((1 << bits) - 1)
+
+    def read(self, bits: int) -> int:
+        """bits ビットを読む"""
+        value = self.peek(bits)
+        self.count -= bits
+        return value
+
+    def decode(self, table: List[int], table_bits: int) -> int:
+        """ハフマン符号を1つ復号して記号を返す"""
+        entry = table[self.peek(table_bits)] if table_bits else table[0]
+        self.count -= entry & 31
+        return entry >> 5
+
+
+def single_table(symbol: int) -> Tuple[List[int], int]:
+    """記号が1種類だけの場合の復号表（0ビットで記号が決まる）"""
+    return [symbol << 5], 0
+
+
+def read_pt_lengths(
+    reader: BitReader, symbol_count: int, count_bits: int, special: int
+) -> Tuple[List[int], int]:
+    """位置（または文字・一致長の符号長）の符号長を読み、復号表を返す"""
+    count = reader.read(count_bits)
+    if count == 0:
+        return single_table(reader.read(count_bits))
+    if count > symbol_count:
+        raise ValueError("ハフマン符号表が不正です")
+
+    lengths = [0] * symbol_count
+    i = 0
+    while i < count:
+        length = reader.peek(3)
+        if length == 7:
+            # 7以上は 111 に続く 1 の数で表す（0 で終わる）
+            reader.count -= 3
+            while reader.read(1):
+                length += 1
+        else:
+            reader.count -= 3
+        lengths[i] = length
+        i += 1
+        if i == special:
+            i += reader.read(2)
+
+    return build_table(lengths)
+
+
+def read_c_lengths(
+    reader: BitReader, pt: Tuple[List[int], int]
+) -> Tuple[List[int], int]:
+    """文字・一致長の符号長を読み、復号表を返す"""
+    count = reader.read(CBIT)
+    if count == 0:
+        return single_table(reader.read(CBIT))
+    if count > NC:
+        raise ValueError("ハフマン符号表が不正です")
+
+    pt_table, pt_bits = pt
+    lengths = [0] * NC
+    i = 0
+    while i < count:
+        code = reader.decode(pt_table, pt_bits)
+        if code == 0:
+            i += 1
+        elif code == 1:
+            i += reader.read(4) + 3
+        elif code == 2:
+            i += reader.read(CBIT) + 20
+        else:
+            lengths[i] = code - 2
+            i += 1
+
+    return build_table(lengths)
+
+
+def decompress_lh(
+    data: bytes, original_size: int, dictionary_bits: int, position_bits: int
+) -> bytes:
+    """-lh5- / -lh6- / -lh7- の圧縮データを展開
+
+    1記号ごとのメソッド呼び出しを避けるため、ビットの読み込みはループ内で行う
+    （符号表の読み込みだけ BitReader を使う）
+    """
+    dictionary_size = 1 << dictionary_bits
+    position_count = dictionary_bits + 1
+
+    reader = BitReader(data)
+    source = reader.data
+    # 先頭に辞書の初期値を置き、展開後に取り除く
+    output = bytearray(INITIAL_BYTE * dictionary_size)
+    end = dictionary_size + original_size
+
+    buffer = count = position = 0
+    block_size = 0
+    c_table = p_table = []
+    c_bits = p_bits = c_mask = p_mask = 0
+    while len(output) < end:
+        if block_size == 0:
+            reader.buffer, reader.count, reader.position = buffer, count, position
+            block_size = reader.read(16)
+            pt = read_pt_lengths(reader, NT, TBIT, 3)
+            c_table, c_bits = read_c_lengths(reader, pt)
+            p_table, p_bits = read_pt_lengths(
+                reader, position_count, position_bits, -1
+            )
+            c_mask = (1 << c_bits) - 1
+            p_mask = (1 << p_bits) - 1
+            buffer, count, position = reader.buffer, reader.count, reader.position
+        block_size -= 1
+
+        # 1記号分（文字・一致長 + 位置 + 位置の下位ビット）を読めるだけ補充
+        if count < 48:
+            chunk = source[position : position + 8].ljust(8, b"\0")
+            buffer = (buffer & ((1 << count) - 1)) << 64 | int.from_bytes(chunk, "big")
+            position += 8
+            count += 64
+
+        entry = c_table[(buffer >> (count - c_bits)) & c_mask]
+        count -= entry & 31
+        code = entry >> 5
+        if code < 256:
+            output.append(code)
+            continue
+
+        # 一致長と一致位置（何バイト前からコピーするか）
+        length = code - 256 + THRESHOLD
+        entry = p_table[(buffer >> (count - p_bits)) & p_mask]
+        count -= entry & 31
+        distance = entry >> 5
+        if distance > 1:
+            extra_bits = distance - 1
+            count -= extra_bits
+            distance = (1 << extra_bits) + (
+                (buffer >> count) & ((1 << extra_bits) - 1)
+            )
+        start = len(output) - distance - 1
+        if distance + 1 >= length:
+            output += output[start : start + length]
+        else:
+            # コピー元とコピー先が重なる場合は、同じ並びのくり返しになる
+            pattern = output[start:]
+            output += (pattern * (length // len(pattern) + 1))[:length]
+
+    return bytes(output[dictionary_size:end])
+
+
+def decompress(method: bytes, data: bytes, original_size: int) -> bytes:
+    """圧縮方式に応じて展開"""
+    if method in STORED_METHODS:
+        return bytes(data[:original_size])
+    if method in DICTIONARY_BITS:
+        dictionary_bits, position_bits = DICTIONARY_BITS[method]
+        return decompress_lh(data, original_size, dictionary_bits, position_bits)
+    raise ValueError(f"対応していない圧縮方式です: {method.decode('ascii', 'replace')}")
+
+
+def read_extended_headers(data: bytes, position: int, size: int) -> Tuple[str, int]:
+    """拡張ヘッダーを読み、(ファイル名, 拡張ヘッダーの合計サイズ) を返す
+
+    各拡張ヘッダーは [種類 1バイト][内容][次の拡張ヘッダーのサイズ 2バイト]
+    """
+    name = ""
+    total = 0
+    while size:
+        if position + size > len(data):
+            raise ValueError("拡張ヘッダーが途中で切れています")
+        if data[position] == 0x01:
+            name = data[position + 1 : position + size - 2].decode("cp932")
+        total += size
+        position += size
+        (size,) = struct.unpack_from("<H", data, position - 2)
+    return name, total
+
+
+def iter_members(data: bytes) -> Iterator[Tuple[str, bytes]]:
+    """アーカイブのバイト列から、格納されているファイルを (ファイル名, 内容) で順に返す"""
+    position = 0
+    while position < len(data) and data[position] != 0:
+        if position + 22 > len(data):
+            raise ValueError("ヘッダーが途中で切れています")
+
+        method = data[position + 2 : position + 7]
+        packed_size, original_size = struct.unpack_from("<II", data, position + 7)
+        level = data[position + 20]
+
+        if level in (0, 1):
+            header_size = data[position] + 2
+            name_length = data[position + 21]
+            name = data[position + 22 : position + 22 + name_length].decode("cp932")
+            (crc,) = struct.unpack_from("<H", data, position + 22 + name_length)
+            data_start = position + header_size
+            if level == 1:
+                (extended_size,) = struct.unpack_from("<H", data, data_start - 2)
+                extended_name, extended_total = read_extended_headers(
+                    data, data_start, extended_size
+                )
+                name = extended_name or name
+                # レベル1は拡張ヘッダーのサイズが圧縮サイズに含まれる
+                data_start += extended_total
+                packed_size -= extended_total
+        elif level == 2:
+            (header_size,) = struct.unpack_from("<H", data, position)
+            (crc,) = struct.unpack_from("<H", data, position + 21)
+            (extended_size,) = struct.unpack_from("<H", data, position + 24)
+            name, _ = read_extended_headers(data, position + 26, extended_size)
+            data_start = position + header_size
+        else:
+            raise ValueError(f"対応していないヘッダーレベルです: {level}")
+
+        data_end = data_start + packed_size
+        if data_end > len(data):
+            raise ValueError(f"圧縮データが途中で切れています: {name}")
+
+        content = decompress(method, data[data_start:data_end], original_size)
+        if len(content) != original_size or crc16(content) != crc:
+            raise ValueError(f"展開したデータのCRCが一致しません: {name}")
+
+        yield name, content
+        position = data_end
+
+
+def verify_archive(data: bytes) -> int:
+    """アーカイブのすべてのファイルを展開してCRCを確認し、ファイル数を返す
+
+    壊れたデータ・途中で切れたデータ・ファイルが1つもないデータは ValueError
+    （展開中のどの例外も ValueError にするため、呼び出し側は ValueError だけを扱えばよい）
+    """
+    try:
+        count = sum(1 for _ in iter_members(data))
+    except DECODE_ERRORS as e:
+        raise ValueError(f"アーカイブが壊れています: {e!r}") from e
+    if count == 0:
+        raise ValueError("アーカイブにファイルがありません")
+    return count
+
+
+def read_member(archive_path: str, suffix: str = ".txt") -> bytes:
+    """アーカイブに格納されている、名前が suffix で終わる最初のファイルの内容を返す"""
+    with open(archive_path, "rb") as f:
+        data = f.read()
+
+    try:
+        for name, content in iter_members(data):
+            if name.lower().endswith(suffix):
+                return content
+    except (ValueError, *DECODE_ERRORS) as e:
+        raise ValueError(f"アーカイブを展開できません: {archive_path}: {e}") from e
+    raise ValueError(f"アーカイブに {suffix} のファイルがありません: {archive_path}")
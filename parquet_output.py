@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet出力プログラム
+
+番組表・競走成績の変換結果を、型付きの列指向形式（Parquet）で出力する。
+出力先は年・月でパーティション分割し（year=YYYY/month=MM/）、1日分を1ファイルにする。
+レース場番号・級別・支部などの繰り返しの多い列は辞書エンコードする。
+
+pyarrow が必要（pip install pyarrow）
+"""
+
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# 出力先ディレクトリ
+PROGRAMS_PARQUET_DIR = "data/parquet/race_programs"
+RESULTS_PARQUET_DIR = "data/parquet/race_results"
+ENTRIES_PARQUET_DIR = "data/parquet/race_entries"
+PAYOUTS_PARQUET_DIR = "data/parquet/race_payouts"
+
+
+def require_pyarrow() -> None:
+    """pyarrow がインストールされているかチェック"""
+    if pa is None:
+        raise RuntimeError("Parquet出力には pyarrow が必要です（pip install pyarrow）")
+
+
+def to_int(value) -> Optional[int]:
+    """整数に変換（空文字は欠損値）"""
+    if value == "" or value is None:
+        return None
+    return int(value)
+
+
+def to_float(value) -> Optional[float]:
+    """浮動小数点数に変換（空文字は欠損値）"""
+    if value == "" or value is None:
+        return None
+    return float(value)
+
+
+def to_str(value) -> Optional[str]:
+    """文字列に変換（空文字は欠損値）"""
+    if value == "" or value is None:
+        return None
+    return str(value)
+
+
+def race_time_to_seconds(value) -> Optional[float]:
+    """レースタイム（例: 1.49.7 = 1分49秒7）を秒に変換（空文字は欠損値）"""
+    if value == "" or value is None:
+        return None
+    minutes, seconds, tenths = value.split(".")
+    return int(minutes) * 60 + int(seconds) + int(tenths) / 10
+
+
+# 列の型の定義: 型名 → (pyarrowの型を返す関数, 値の変換関数)
+COLUMN_TYPES: Dict[str, Tuple[Callable[[], "pa.DataType"], Callable]] = {
+    "int8": (lambda: pa.int8(), to_int),
+    "int16": (lambda: pa.int16(), to_int),
+    "int32": (lambda: pa.int32(), to_int),
+    "float32": (lambda: pa.float32(), to_float),
+    "string": (lambda: pa.string(), to_str),
+    "category": (lambda: pa.dictionary(pa.int8(), pa.string()), to_str),
+    "race_time": (lambda: pa.float32(), race_time_to_seconds),
+}
+
+# 番組表の列定義（列名, 型名）
+PROGRAM_RACE_COLUMNS = [
+    ("年", "int16"),
+    ("月", "int8"),
+    ("日", "int8"),
+    ("レース場番号", "category"),
+    ("レース番号", "int8"),
+    ("距離(m)", "int16"),
+    ("投票締切時間", "string"),
+]
+PROGRAM_BOAT_COLUMNS = [
+    ("選手登番", "int16"),
+    ("年齢", "int8"),
+    ("支部", "category"),
+    ("体重", "int8"),
+    ("級別", "category"),
+    ("全国勝率", "float32"),
+    ("全国2連率", "float32"),
+    ("当地勝率", "float32"),
+    ("当地2連率", "float32"),
+    ("モーター番号", "int16"),
+    ("モーター2連率", "float32"),
+    ("ボート番号", "int16"),
+    ("ボート2連率", "float32"),
+]
+PROGRAM_COLUMNS = PROGRAM_RACE_COLUMNS + [
+    (f"{boat}艇_{name}", type_name)
+    for boat in range(1, 7)
+    for name, type_name in PROGRAM_BOAT_COLUMNS
+]
+
+# 出走表（1艇1行）の列定義（列名, 型名）
+# レース場番号・級別は変換時に整数コードにしている
+ENTRY_COLUMNS = [
+    ("年", "int16"),
+    ("月", "int8"),
+    ("日", "int8"),
+    ("レース場番号", "int8"),
+    ("レース番号", "int8"),
+    ("艇", "int8"),
+] + [
+    (name, "int8" if name == "級別" else type_name)
+    for name, type_name in PROGRAM_BOAT_COLUMNS
+]
+
+# 競走成績の列定義（列名, 型名）
+# レースタイムは秒に変換するため列名を変える
+RESULT_COLUMNS = [
+    ("年", "int16"),
+    ("月", "int8"),
+    ("日", "int8"),
+    ("競艇場番号", "category"),
+    ("レース番号", "int8"),
+    ("距離", "int16"),
+    ("天候", "category"),
+    ("風向き", "category"),
+    ("風速", "int8"),
+    ("波高", "int16"),
+    ("着", "category"),
+    ("艇", "int8"),
+    ("登番", "int16"),
+    ("モーター", "int16"),
+    ("ボート", "int16"),
+    ("展示タイム", "float32"),
+    ("進入番号", "int8"),
+    ("スタートタイミング", "float32"),
+    ("レースタイム(秒)", "race_time"),
+]
+
+# 払戻金の列定義（列名, 型名）
+# 払戻金は100円あたりの金額（円）、単勝・複勝・特払いの人気は欠損値
+PAYOUT_COLUMNS = [
+    ("年", "int16"),
+    ("月", "int8"),
+    ("日", "int8"),
+    ("競艇場番号", "category"),
+    ("レース番号", "int8"),
+    ("勝式", "category"),
+    ("組番", "string"),
+    ("払戻金", "int32"),
+    ("人気", "int16"),
+]
+
+
+def build_table(rows: Iterable[List], columns: List[Tuple[str, str]]) -> "pa.Table":
+    """CSVと同じ並びの行データから、型付きのテーブルを作成"""
+    require_pyarrow()
+
+    values: List[List] = [[] for _ in columns]
+    for row in rows:
+        for i, value in enumerate(row):
+            values[i].append(value)
+
+    arrays = []
+    fields = []
+    for (name, type_name), column_values in zip(columns, values):
+        make_type, convert = COLUMN_TYPES[type_name]
+        arrow_type = make_type()
+        arrays.append(
+            pa.array([convert(value) for value in column_values], type=arrow_type)
+        )
+        fields.append(pa.field(name, arrow_type))
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def partition_path(
+    output_dir: str, prefix: str, year: int, month: int, day: int
+) -> str:
+    """年・月でパーティション分割した1日分の出力ファイルパスを生成"""
+    return os.path.join(
+        output_dir,
+        f"year={year:04d}",
+        f"month={month:02d}",
+        f"{prefix}{year % 100:02d}{month:02d}{day:02d}.parquet",
+    )
+
+
+def write_table(table: "pa.Table", output_file: str) -> None:
+    """テーブルをParquetファイルに出力（同じ日のファイルがあれば置き換える）"""
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    # 書き込み途中のファイルを読まれないよう、一時ファイルに書いてから置き換える
+    temp_file = output_file + ".tmp"
+    pq.write_table(table, temp_file, compression="zstd")
+    os.replace(temp_file, output_file)
+
+
+def write_programs_parquet(
+    rows: Iterable[List],
+    year: int,
+    month: int,
+    day: int,
+    output_dir: str = PROGRAMS_PARQUET_DIR,
+) -> str:
+    """番組表の1日分の行データをParquetに出力し、出力ファイルパスを返す"""
+    output_file = partition_path(output_dir, "b", year, month, day)
+    write_table(build_table(rows, PROGRAM_COLUMNS), output_file)
+    return output_file
+
+
+def write_entries_parquet(
+    rows: Iterable[List],
+    year: int,
+    month: int,
+    day: int,
+    output_dir: str = ENTRIES_PARQUET_DIR,
+) -> str:
+    """出走表（1艇1行）の1日分の行データをParquetに出力し、出力ファイルパスを返す"""
+    output_file = partition_path(output_dir, "e", year, month, day)
+    write_table(build_table(rows, ENTRY_COLUMNS), output_file)
+    return output_file
+
+
+def write_results_parquet(
+    rows: Iterable[List],
+    year: int,
+    month: int,
+    day: int,
+    output_dir: str = RESULTS_PARQUET_DIR,
+) -> str:
+    """競走成績の1日分の行データをParquetに出力し、出力ファイルパスを返す"""
+    output_file = partition_path(output_dir, "k", year, month, day)
+    write_table(build_table(rows, RESULT_COLUMNS), output_file)
+    return output_file
+
+
+def write_payouts_parquet(
+    rows: Iterable[List],
+    year: int,
+    month: int,
+    day: int,
+    output_dir: str = PAYOUTS_PARQUET_DIR,
+) -> str:
+    """払戻金の1日分の行データをParquetに出力し、出力ファイルパスを返す"""
+    output_file = partition_path(output_dir, "k", year, month, day)
+    write_table(build_table(rows, PAYOUT_COLUMNS), output_file)
+    return output_file
+
+
+def read_parquet(
+    output_dir: str, year: Optional[int] = None, month: Optional[int] = None
+) -> "pa.Table":
+    """出力したParquetを読み込む（年・月を指定するとそのパーティションだけを読む）
+
+    ファイルはメモリマップで読み込む
+    """
+    require_pyarrow()
+
+    path = output_dir
+    if year is not None:
+        path = os.path.join(path, f"year={year:04d}")
+        if month is not None:
+            path = os.path.join(path, f"month={month:02d}")
+
+    return pq.read_table(path, memory_map=True, partitioning=None)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+変換処理の計測（--profile / 環境変数 BOATRACE_PROFILE）
+
+convert_program.py / convert_race_result.py の変換で、ファイルごとの段階別の処理時間
+（読み込み・展開、デコード、解析、書き込み）、行数・件数と1秒あたりの処理量、
+ピーク時のメモリ使用量（RSS）を記録し、JSONのレポートに出力する。
+
+- 計測時は各ファイルを1度に読み込んでから段階ごとに処理する
+  （通常の変換はデコードしながら1行ずつ解析するため、段階ごとには分けられない）
+- 解析はトラック・レースの区切りと行の解析を1パスで行うため「解析」の1段階として計測する。
+  関数ごとの内訳は --cprofile（cProfile の結果も保存）で確認する
+- 環境変数 BOATRACE_PROFILE にファイル名を指定すると、そのファイルにレポートを出力する
+  （"1" などファイル名でない値の場合は data/profile/ に出力）
+
+例:
+    python convert_race_result.py --from 2024-01-01 --to 2024-01-31 --profile
+    BOATRACE_PROFILE=data/profile/results.json python convert_race_result.py 2024 1 1
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from lzh_archive import read_member
+from race_io import ARCHIVE_SUFFIX, DETECT_SIZE, detect_head_encoding
+
+try:
+    import resource
+except ImportError:
+    # Windows には resource がない（ピーク時のメモリ使用量は記録しない）
+    resource = None
+
+# 計測を有効にする環境変数（値はレポートのファイル名、または "1"）
+PROFILE_ENV = "BOATRACE_PROFILE"
+
+# レポートの出力先（ファイル名を指定しない場合）
+PROFILE_DIR = "data/profile"
+
+# cProfile の結果のうち、レポートに含める関数の数（累積時間の上位）
+PROFILE_TOP_FUNCTIONS = 30
+
+# 計測する段階（レポートの並び順）
+STAGES = ("read", "decode", "parse", "write")
+
+
+def peak_rss_kb() -> Optional[int]:
+    """プロセスのピーク時のメモリ使用量（KB、Linux の ru_maxrss）"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def per_second(count: int, elapsed: float) -> Optional[float]:
+    """1秒あたりの件数（時間が0の場合は None）"""
+    if elapsed <= 0:
+        return None
+    return round(count / elapsed, 1)
+
+
+class FileProfile:
+    """1ファイル分の計測結果（プロセスプールのワーカーから返せるように単純な属性だけ持つ）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.bytes = 0
+        self.lines = 0
+        self.rows = 0
+        # 固定位置で切り出せず、正規表現で解析した行の数（競走成績の艇の行）
+        self.fallbacks = 0
+        self.stages: Dict[str, float] = {}
+        self.peak_rss_kb: Optional[int] = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """with の中の処理時間を段階 name に加算する"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def read_lines(self, encoding: str = "auto") -> io.StringIO:
+        """ファイルを読み込んでデコードし、1行ずつ読めるテキストを返す
+
+        改行は open_raw と同じく "\\n" に揃える
+        """
+        with self.stage("read"):
+            if self.path.lower().endswith(ARCHIVE_SUFFIX):
+                content = read_member(self.path)
+            else:
+                with open(self.path, "rb") as f:
+                    content = f.read()
+        with self.stage("decode"):
+            if encoding == "auto":
+                encoding = detect_head_encoding(content[:DETECT_SIZE])
+            text = content.decode(encoding)
+        self.bytes = len(content)
+        self.lines = text.count("\n")
+        return io.StringIO(text, newline=None)
+
+    def finish(self) -> None:
+        """ファイルの処理が終わった時点のピーク時のメモリ使用量を記録
+
+        ファイルを解析したプロセスで呼ぶ（プロセスプールの場合は親プロセスではなくワーカー）
+        """
+        self.peak_rss_kb = peak_rss_kb()
+
+    def as_dict(self) -> Dict:
+        """レポートの1ファイル分"""
+        elapsed = sum(self.stages.values())
+        return {
+            "path": self.path,
+            "bytes": self.bytes,
+            "lines": self.lines,
+            "rows": self.rows,
+            "fallbacks": self.fallbacks,
+            "elapsed": round(elapsed, 6),
+            "stages": {
+                name: round(self.stages[name], 6)
+                for name in STAGES
+                if name in self.stages
+            },
+            "lines_per_sec": per_second(self.lines, elapsed),
+            "rows_per_sec": per_second(self.rows, elapsed),
+            "peak_rss_kb": self.peak_rss_kb,
+        }
+
+
+class PipelineProfiler:
+    """変換全体の計測（ファイルごとの FileProfile を集めてレポートを出力する）"""
+
+    def __init__(self, program: str, report_file: str, cprofile: bool = False):
+        self.program = program
+        self.report_file = report_file
+        self.files: List[FileProfile] = []
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.cprofile = cProfile.Profile() if cprofile else None
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def file(self, path: str) -> FileProfile:
+        """1ファイル分の計測を開始する"""
+        profile = FileProfile(path)
+        self.files.append(profile)
+        return profile
+
+    def add(self, profile: FileProfile) -> None:
+        """プロセスプールのワーカーで計測したファイルを加える"""
+        self.files.append(profile)
+
+    @property
+    def cprofile_file(self) -> str:
+        """cProfile の結果のファイル（レポートと同じ名前で拡張子 .prof）"""
+        return os.path.splitext(self.report_file)[0] + ".prof"
+
+    def totals(self) -> Dict:
+        """全ファイルの合計"""
+        stages = {}
+        for name in STAGES:
+            values = [f.stages[name] for f in self.files if name in f.stages]
+            if values:
+                stages[name] = round(sum(values), 6)
+        elapsed = sum(stages.values())
+        lines = sum(f.lines for f in self.files)
+        rows = sum(f.rows for f in self.files)
+        return {
+            "files": len(self.files),
+            "bytes": sum(f.bytes for f in self.files),
+            "lines": lines,
+            "rows": rows,
+            "fallbacks": sum(f.fallbacks for f in self.files),
+            "elapsed": round(elapsed, 6),
+            "stages": stages,
+            "lines_per_sec": per_second(lines, elapsed),
+            "rows_per_sec": per_second(rows, elapsed),
+        }
+
+    def top_functions(self) -> List[Dict]:
+        """cProfile の結果のうち、累積時間の上位の関数"""
+        stats = pstats.Stats(self.cprofile).sort_stats("cumulative")
+        functions = []
+        for func in stats.fcn_list[:PROFILE_TOP_FUNCTIONS]:
+            calls, _, total, cumulative, _ = stats.stats[func]
+            file_name, line, name = func
+            functions.append(
+                {
+                    "function": f"{os.path.basename(file_name)}:{line}({name})",
+                    "calls": calls,
+                    "total": round(total, 6),
+                    "cumulative": round(cumulative, 6),
+                }
+            )
+        return functions
+
+    def write_report(self) -> str:
+        """レポート（と cProfile の結果）を出力し、レポートのファイル名を返す"""
+        directory = os.path.dirname(self.report_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        report = {
+            "program": self.program,
+            "started": self.started_at.isoformat(timespec="seconds"),
+            "elapsed": round(time.perf_counter() - self.started, 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "totals": self.totals(),
+            "files": [f.as_dict() for f in self.files],
+        }
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_file)
+            report["cprofile"] = self.cprofile_file
+            report["functions"] = self.top_functions()
+
+        with open(self.report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        return self.report_file
+
+
+def create_profiler(
+    program: str, profile: bool = False, cprofile: bool = False
+) -> Optional[PipelineProfiler]:
+    """オプション・環境変数で計測が有効な場合に PipelineProfiler を作成
+
+    --cprofile は --profile を含む。計測しない場合は None
+    """
+    value = os.environ.get(PROFILE_ENV, "")
+    if not (profile or cprofile or value):
+        return None
+
+    if value.endswith(".json"):
+        report_file = value
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        report_file = os.path.join(PROFILE_DIR, f"{program}-{timestamp}.json")
+    return PipelineProfiler(program, report_file, cprofile)
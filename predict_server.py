@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+当日予測サーバー
+
+起動時に当日の番組表を ProgramConverter で1度だけ解析し、特徴量の状態ファイル
+（feature_state.py）から各艇の特徴量の行列を作ってモデルとともにメモリに保持する。
+レースごとの予測リクエスト（レース場番号, レース番号）には、その6艇分の行を
+まとめてスコア計算して返す（リクエストごとにファイルを読んだり解析したりしない）。
+
+- GET /predict?track=24&race=1 → 6艇のスコアと1着確率（スコアのソフトマックス）
+- GET /races → 予測できるレースの一覧
+- GET /health → 状態
+
+モデル:
+- .json: 線形モデル {"weights": {特徴量名: 係数, ...}, "bias": 切片}
+  （欠損値はその日の出走表の平均で補う）
+- それ以外: LightGBM のモデルファイル（lightgbm が必要、特徴量は feature_headers の順）
+- 指定なし: 直近10走の平均着順とモーターの2連対率による基準（ベースライン）のスコア
+
+例: python predict_server.py 2024 7 1 --model data/model.json --port 8088
+"""
+
+import json
+import math
+import os
+import sys
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from convert_program import ProgramConverter
+from feature_state import STATE_FILE, FeatureState, feature_headers
+from race_feature_columns import RACE_KEYS
+
+try:
+    import lightgbm as lgb
+except ImportError:
+    lgb = None
+
+# 待ち受けるアドレス・ポート（docker-compose で公開しているポート）
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8088
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = ("--model", "--state", "--host", "--port")
+
+# モデルを指定しない場合の基準（ベースライン）の係数
+BASELINE_WEIGHTS = {
+    "選手10走_平均着順": -1.0,
+    "モーター30走_2連対率": 1.0,
+}
+
+
+class LinearModel:
+    """線形モデル（スコア = 特徴量 @ 係数 + 切片）"""
+
+    # 欠損値を補う必要がある（LightGBM は欠損値をそのまま扱える）
+    fills_missing = True
+
+    def __init__(self, weights: Dict[str, float], bias: float, headers: List[str]):
+        unknown = sorted(set(weights) - set(headers))
+        if unknown:
+            raise ValueError(f"不明な特徴量です: {', '.join(unknown)}")
+        self.coefficients = np.array([weights.get(name, 0.0) for name in headers])
+        self.bias = bias
+
+    @classmethod
+    def load(cls, path: str, headers: List[str]) -> "LinearModel":
+        """JSONのモデルファイルを読み込む"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["weights"], data.get("bias", 0.0), headers)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """各艇のスコア"""
+        return features @ self.coefficients + self.bias
+
+
+class LightGBMModel:
+    """LightGBM のモデル"""
+
+    fills_missing = False
+
+    def __init__(self, path: str, headers: List[str]):
+        if lgb is None:
+            raise RuntimeError("LightGBM のモデルには lightgbm が必要です（pip install lightgbm）")
+        self.booster = lgb.Booster(model_file=path)
+        if self.booster.num_feature() != len(headers):
+            raise ValueError(
+                f"モデルの特徴量の数（{self.booster.num_feature()}）が"
+                f"特徴量の列数（{len(headers)}）と一致しません"
+            )
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """各艇のスコア"""
+        return self.booster.predict(features)
+
+
+def load_model(path: Optional[str], headers: List[str]):
+    """モデルを読み込む（指定なしの場合は基準のスコア）"""
+    if path is None:
+        return LinearModel(BASELINE_WEIGHTS, 0.0, headers)
+    if path.endswith(".json"):
+        return LinearModel.load(path, headers)
+    return LightGBMModel(path, headers)
+
+
+def softmax(scores: np.ndarray) -> np.ndarray:
+    """スコアをレース内の確率（合計1）にする"""
+    exp = np.exp(scores - scores.max())
+    return exp / exp.sum()
+
+
+class RacePredictor:
+    """1日分の出走表の特徴量とモデルを保持し、レースごとに予測する"""
+
+    def __init__(self, feature_rows: List[List], headers: List[str], model):
+        self.model = model
+        self.headers = headers
+
+        # 出走表のキー（レース場番号, レース番号, 艇）と特徴量の行列
+        key_count = len(RACE_KEYS)
+        feature_rows = sorted(feature_rows, key=lambda row: tuple(row[3:6]))
+        self.boats = np.array([row[5] for row in feature_rows], dtype=np.int8)
+        self.features = np.array(
+            [
+                [math.nan if value is None else value for value in row[key_count:]]
+                for row in feature_rows
+            ],
+            dtype=float,
+        )
+        if model.fills_missing and len(self.features):
+            # 欠損値（初出走の選手など）はその日の出走表の平均で補う
+            with np.errstate(invalid="ignore"):
+                means = np.nanmean(self.features, axis=0)
+            means = np.where(np.isnan(means), 0.0, means)
+            missing = np.isnan(self.features)
+            self.features[missing] = np.take(means, np.nonzero(missing)[1])
+
+        # (レース場番号, レース番号) → 行の範囲
+        self.races: Dict[Tuple[int, int], slice] = {}
+        start = 0
+        for i in range(1, len(feature_rows) + 1):
+            race_key = feature_rows[start][3:5]
+            if i == len(feature_rows) or feature_rows[i][3:5] != race_key:
+                self.races[(int(race_key[0]), int(race_key[1]))] = slice(start, i)
+                start = i
+
+    def predict(self, track: int, race: int) -> Optional[List[Dict]]:
+        """1レースの各艇のスコアと1着確率（レースがなければ None）"""
+        rows = self.races.get((track, race))
+        if rows is None:
+            return None
+        scores = np.asarray(self.model.predict(self.features[rows]), dtype=float)
+        probabilities = softmax(scores)
+        return [
+            {"艇": int(boat), "スコア": float(score), "1着確率": float(probability)}
+            for boat, score, probability in zip(
+                self.boats[rows], scores, probabilities
+            )
+        ]
+
+
+class PredictHandler(BaseHTTPRequestHandler):
+    """予測リクエストの処理（predictor はサーバー起動時に設定する）"""
+
+    predictor: RacePredictor = None
+    target: date = None
+
+    # keep-alive で接続を使い回す（リクエストごとの接続のコストを省く）
+    protocol_version = "HTTP/1.1"
+
+    # ヘッダーと本文を別々に送るため、Nagleアルゴリズムで応答が遅れないようにする
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/predict":
+            self.handle_predict(parse_qs(url.query))
+        elif url.path == "/races":
+            races = [
+                {"track": track, "race": race}
+                for track, race in sorted(self.predictor.races)
+            ]
+            self.send_json(200, {"date": str(self.target), "races": races})
+        elif url.path == "/health":
+            self.send_json(
+                200, {"date": str(self.target), "races": len(self.predictor.races)}
+            )
+        else:
+            self.send_json(404, {"error": f"不明なパスです: {url.path}"})
+
+    def handle_predict(self, query: Dict[str, List[str]]):
+        """GET /predict?track=..&race=.."""
+        try:
+            track = int(query["track"][0])
+            race = int(query["race"][0])
+        except (KeyError, ValueError):
+            self.send_json(400, {"error": "track と race を数値で指定してください"})
+            return
+
+        started = time.perf_counter()
+        boats = self.predictor.predict(track, race)
+        if boats is None:
+            self.send_json(404, {"error": f"レースがありません: {track}場 {race}R"})
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        self.send_json(
+            200,
+            {
+                "date": str(self.target),
+                "track": track,
+                "race": race,
+                "boats": boats,
+                "elapsed_ms": round(elapsed, 3),
+            },
+        )
+
+    def send_json(self, status: int, body: Dict):
+        """JSONで応答する"""
+        content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # リクエストごとのログは出さない（標準エラー出力への書き込みを省く）
+        pass
+
+
+def load_predictor(
+    target: date, model_path: Optional[str], state_path: str
+) -> RacePredictor:
+    """当日の番組表を解析し、特徴量とモデルを読み込む"""
+    converter = ProgramConverter()
+    input_file = converter.get_input_file(target.year, target.month, target.day)
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(input_file)
+
+    races = converter.parse_file(input_file, target.year, target.month, target.day)
+    entry_rows = [row for race in races for row in converter.build_entry_rows(race)]
+    index = {name: i for i, name in enumerate(converter.entries_headers)}
+    feature_rows = FeatureState(state_path).features(entry_rows, index)
+
+    headers = feature_headers()
+    return RacePredictor(feature_rows, headers, load_model(model_path, headers))
+
+
+def print_usage():
+    """使用方法を表示"""
+    print("使用方法: python predict_server.py <年> <月> <日> [オプション]")
+    print("  --model: モデルファイル（.json: 線形モデル、それ以外: LightGBM）")
+    print("           指定なしの場合は基準（直近10走の平均着順・モーター2連対率）")
+    print(f"  --state: 特徴量の状態ファイル（デフォルト: {STATE_FILE}）")
+    print(f"  --host: 待ち受けるアドレス（デフォルト: {DEFAULT_HOST}）")
+    print(f"  --port: 待ち受けるポート（デフォルト: {DEFAULT_PORT}）")
+
+
+def parse_args(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """コマンドライン引数を位置引数とオプションに分ける"""
+    positionals = []
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS:
+            if i + 1 >= len(args):
+                raise ValueError(f"{arg} の値を指定してください")
+            options[arg] = args[i + 1]
+            i += 2
+        elif arg.startswith("--"):
+            raise ValueError(f"不明なオプションです: {arg}")
+        else:
+            positionals.append(arg)
+            i += 1
+
+    if len(positionals) != 3:
+        raise ValueError("<年> <月> <日> を指定してください")
+    return positionals, options
+
+
+def main():
+    """メイン関数"""
+    try:
+        positionals, options = parse_args(sys.argv[1:])
+        target = date(*(int(value) for value in positionals))
+        port = int(options.get("--port", DEFAULT_PORT))
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        sys.exit(1)
+
+    started = time.perf_counter()
+    try:
+        predictor = load_predictor(
+            target, options.get("--model"), options.get("--state", STATE_FILE)
+        )
+    except FileNotFoundError as e:
+        print(f"エラー: ファイルが見つかりません: {e}")
+        sys.exit(1)
+    except (RuntimeError, ValueError) as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    print(f"読み込み完了: {target} の {len(predictor.races)}レース（{elapsed:.2f}秒）")
+
+    PredictHandler.predictor = predictor
+    PredictHandler.target = target
+    host = options.get("--host", DEFAULT_HOST)
+    server = ThreadingHTTPServer((host, port), PredictHandler)
+    print(f"待ち受け開始: http://{host}:{port}/predict?track=<番号>&race=<番号>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("終了します")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+特徴量の列の定義
+
+race_features.py（pandas で一括集計）と feature_state.py（状態ファイルで差分更新）で
+共通の、集計のキー・集計の単位・1走ごとの値の列名をまとめたもの。
+feature_state.py・predict_server.py は numpy・pandas を読み込まずに使えるように、
+このモジュールには標準ライブラリ以外を import しない
+"""
+
+from typing import Dict, List, Tuple
+
+# 出走表（対象の艇）のキー
+RACE_KEYS = ["年", "月", "日", "レース場番号", "レース番号", "艇"]
+
+# レース結果の列名 → 出走表の列名（集計のキーを出走表と揃える）
+RESULT_RENAMES = {
+    "競艇場番号": "レース場番号",
+    "登番": "選手登番",
+    "モーター": "モーター番号",
+    "ボート": "ボート番号",
+}
+
+# 集計の単位: 名前 → (キーの列, 直近何走で集計するか)
+# モーター・ボートの番号はレース場ごとの番号のため、レース場と組み合わせる
+ENTITIES: Dict[str, Tuple[List[str], int]] = {
+    "選手": (["選手登番"], 10),
+    "モーター": (["レース場番号", "モーター番号"], 30),
+    "ボート": (["レース場番号", "ボート番号"], 30),
+}
+
+# 1走ごとの値（レース結果から作る列 → 特徴量の名前）
+# 着順は失格・フライングなどの場合は欠損値、1着〜3連対は0/1（失格・フライングは0）
+METRICS = {
+    "着順": "平均着順",
+    "1着": "1着率",
+    "2連対": "2連対率",
+    "3連対": "3連対率",
+    "スタートタイミング": "平均ST",
+    "展示タイム差": "展示タイム差",
+}
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+特徴量作成プログラム
+
+出走表テーブル（data/race_entries.csv、convert_program.py --entries）の各艇について、
+レース結果データ（race_results.csv）から選手・モーター・ボートごとの直近の成績を集計する。
+
+- 選手（登番）・モーター（レース場, モーター番号）・ボート（レース場, ボート番号）ごとに、
+  直近N走の平均着順・1着率・2連対率・3連対率・平均スタートタイミング・展示タイム差を求める
+- 集計には対象レースの日付より前の日のレースだけを使う（同じ日のレースの結果は含めない）
+
+集計は pandas のグループ単位の累積和の差（直近N走の窓）で一括して求め、
+対象の艇には merge_asof（前日以前の最も新しい集計）で結び付ける。
+Pythonのループで艇ごと・レースごとに集計しないため、1年分でも数秒で作成できる
+（CSVへの書き出しは数値の文字列化に時間がかかるため、大量の場合は Parquet で出力する）。
+
+例: python race_features.py --output data/race_features.parquet
+"""
+
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from race_feature_columns import ENTITIES, METRICS, RACE_KEYS, RESULT_RENAMES
+
+# 入力・出力ファイル
+ENTRIES_FILE = "data/race_entries.csv"
+RESULTS_FILE = "race_results.csv"
+OUTPUT_FILE = "data/race_features.csv"
+
+# 値を取るコマンドラインオプション
+VALUE_OPTIONS = ("--entries", "--results", "--output")
+
+
+def read_results(path: str = RESULTS_FILE) -> pd.DataFrame:
+    """レース結果データを読み込み、1走ごとの値の列を作る"""
+    results = pd.read_csv(
+        path,
+        usecols=[
+            "年",
+            "月",
+            "日",
+            "競艇場番号",
+            "レース番号",
+            "着",
+            "登番",
+            "モーター",
+            "ボート",
+            "展示タイム",
+            "スタートタイミング",
+        ],
+        dtype={"着": str},
+    ).rename(columns=RESULT_RENAMES)
+
+    # 失格・フライング（S0〜S2, F）などの着は欠損値（1着〜3連対は0）
+    position = pd.to_numeric(results.pop("着"), errors="coerce")
+    position = position.where(position.between(1, 6))
+
+    results["日付"] = race_dates(results)
+    results["着順"] = position
+    for column, top in (("1着", 1), ("2連対", 2), ("3連対", 3)):
+        results[column] = (position <= top).astype(float)
+    # 展示タイム差: 同じレースの平均展示タイムとの差（小さいほど速い）
+    race_keys = ["日付", "レース場番号", "レース番号"]
+    race_mean = results.groupby(race_keys)["展示タイム"].transform("mean")
+    results["展示タイム差"] = results.pop("展示タイム") - race_mean
+
+    return results
+
+
+def read_entries(path: str = ENTRIES_FILE) -> pd.DataFrame:
+    """出走表テーブル（1艇1行）の、特徴量のキーになる列を読み込む"""
+    entries = pd.read_csv(
+        path, usecols=RACE_KEYS + ["選手登番", "モーター番号", "ボート番号"]
+    )
+    entries["日付"] = race_dates(entries)
+    return entries
+
+
+def race_dates(frame: pd.DataFrame) -> pd.Series:
+    """年・月・日の列から日付の列を作る"""
+    return pd.to_datetime(
+        pd.DataFrame({"year": frame["年"], "month": frame["月"], "day": frame["日"]})
+    )
+
+
+def rolling_history(
+    results: pd.DataFrame, keys: List[str], window: int, prefix: str
+) -> pd.DataFrame:
+    """キーごとに、各日の最終レース時点での直近 window 走の集計を求める
+
+    戻り値はキー・日付ごとに1行で、その日のレースまでを含む集計。
+    対象のレースには翌日以降の日付で結び付ける（merge_asof の allow_exact_matches=False）
+    """
+    history = results.dropna(subset=keys).sort_values(
+        keys + ["日付", "レース場番号", "レース番号"], kind="stable"
+    )
+    history = history.reset_index(drop=True)
+
+    # キーでソート済みのため、同じキーの行は連続している
+    groups = history.groupby(keys, sort=False)
+    # グループ内の通し番号から、直近 window 走の窓の開始行を求める
+    position = groups.cumcount().to_numpy()
+    row = np.arange(len(history))
+    window_start = row - np.minimum(position, window - 1)
+    end = row + 1
+
+    features = history[keys + ["日付"]].copy()
+    features[f"{prefix}_出走数"] = np.minimum(position + 1, window)
+    for column, name in METRICS.items():
+        # 窓の合計 = 累積和の差（欠損値は合計・件数の両方から除く）
+        values = history[column].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        sums = np.r_[0.0, np.cumsum(np.where(valid, values, 0.0))]
+        counts = np.r_[0, np.cumsum(valid)]
+        total = sums[end] - sums[window_start]
+        count = counts[end] - counts[window_start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            features[f"{prefix}_{name}"] = np.where(count > 0, total / count, np.nan)
+
+    # 同じ日に複数走した場合は、その日の最後のレースの時点の集計を残す
+    return features.drop_duplicates(subset=keys + ["日付"], keep="last")
+
+
+def build_features(
+    entries: pd.DataFrame,
+    results: pd.DataFrame,
+    entities: Dict[str, Tuple[List[str], int]] = ENTITIES,
+) -> pd.DataFrame:
+    """出走表の各艇に、選手・モーター・ボートごとの直近の成績を結び付ける
+
+    対象レースの日付より前の日の結果だけを使う（同じ日の結果は使わない）
+    """
+    features = entries.sort_values("日付", kind="stable")
+    for prefix, (keys, window) in entities.items():
+        history = rolling_history(results, keys, window, f"{prefix}{window}走")
+        features = pd.merge_asof(
+            features,
+            history.sort_values("日付", kind="stable"),
+            on="日付",
+            by=keys,
+            allow_exact_matches=False,
+        )
+
+    # 出走表の順に戻す（出走数は、集計のない艇を欠損値にした整数）
+    features = features.sort_values(
+        ["日付", "レース場番号", "レース番号", "艇"], kind="stable"
+    ).reset_index(drop=True)
+    for column in features.columns:
+        if column.endswith("_出走数"):
+            features[column] = features[column].astype("Int16")
+    return features.drop(columns=["日付", "選手登番", "モーター番号", "ボート番号"])
+
+
+def write_features(features: pd.DataFrame, output_file: str) -> None:
+    """特徴量を出力（拡張子が .parquet の場合はParquet、それ以外はCSV）"""
+    if output_file.endswith(".parquet"):
+        features.to_parquet(output_file, index=False, compression="zstd")
+    else:
+        features.round(4).to_csv(output_file, index=False)
+
+
+def print_usage():
+    """使用方法を表示"""
+    print("使用方法: python race_features.py [オプション]")
+    print(f"  --entries: 出走表テーブル（デフォルト: {ENTRIES_FILE}）")
+    print(f"  --results: レース結果データ（デフォルト: {RESULTS_FILE}）")
+    print(f"  --output: 出力ファイル（デフォルト: {OUTPUT_FILE}、.parquet でParquet）")
+
+
+def parse_args(args: List[str]) -> Dict[str, str]:
+    """コマンドライン引数を解析"""
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg not in VALUE_OPTIONS:
+            raise ValueError(f"不明な引数です: {arg}")
+        if i + 1 >= len(args):
+            raise ValueError(f"{arg} の値を指定してください")
+        options[arg] = args[i + 1]
+        i += 2
+    return options
+
+
+def main():
+    """メイン関数"""
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"エラー: {e}")
+        print_usage()
+        sys.exit(1)
+
+    entries_file = options.get("--entries", ENTRIES_FILE)
+    results_file = options.get("--results", RESULTS_FILE)
+    output_file = options.get("--output", OUTPUT_FILE)
+
+    try:
+        entries = read_entries(entries_file)
+        results = read_results(results_file)
+    except FileNotFoundError as e:
+        print(f"エラー: ファイルが見つかりません: {e.filename}")
+        sys.exit(1)
+
+    print(f"処理開始: 出走表 {len(entries)}件、レース結果 {len(results)}件")
+    features = build_features(entries, results)
+    write_features(features, output_file)
+    print(f"作成完了: {len(features)}件の特徴量を {output_file} に出力しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生データのレース位置の索引（バイト列のままトラック・レースの区切りを探す）
+
+番組表・競走成績ファイルをデコードせずに mmap で開き（アーカイブはメモリ上で展開し）、
+トラック（レース場）・レースの区切りのバイト位置だけを求める。
+レースの区切りはトラックごとに、最初に必要になったときに探す。
+1レース分を読む場合は、そのレースの範囲（とトラックの開始・終了マーカーの行）だけを
+デコードして共通パーサー（race_parser）で解析するため、1日分の他のレースは読まない。
+
+- トラック: {番号}BBGN 〜 {番号}BEND（番組表）、{番号}KBGN 〜 {番号}KEND（競走成績）
+- レース（番組表）: 「電話投票締切予定」を含むレースヘッダーの行から、次のレースヘッダーの行まで
+- レース（競走成績）: レース開始の行（例: "   7R ..."）から、次のレース開始の行まで
+  （トラックの先頭の払戻金一覧の行も同じ形式のため、同じレース番号は後の行を使う）
+
+例:
+    python race_index.py data/raw/results/k240615_u8.txt          # 索引の一覧
+    python race_index.py data/raw/results/k240615_u8.txt 23 7     # 唐津 7R の結果だけを解析
+"""
+
+import csv
+import io
+import mmap
+import os
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from convert_program import ProgramConverter
+from convert_race_result import CSV_HEADERS
+from lzh_archive import read_member
+from race_io import ARCHIVE_SUFFIX, DETECT_SIZE, detect_head_encoding
+from race_parser import (
+    TRACKS,
+    ProgramRace,
+    iter_race_rows,
+    parse_program_lines,
+    parse_program_race_header,
+)
+from race_patterns import (
+    PROGRAM_FILE_PATTERN,
+    PROGRAM_RACE_HEADER_MARK,
+    RAW_RESULT_RACE_START_PATTERN,
+    RAW_TRACK_MARK_PATTERN,
+    RESULT_FILE_PATTERN,
+)
+
+# ファイルの種類（トラックのマーカーの文字）
+PROGRAM_KIND = "B"
+RESULT_KIND = "K"
+
+
+class TrackRange(NamedTuple):
+    """トラックのバイト位置
+
+    終了マーカーの行がない場合（ファイルの途中で終わっている場合）は
+    end_marker・end ともファイル末尾
+    """
+
+    begin: int  # 開始マーカーの行の先頭
+    body: int  # 開始マーカーの次の行の先頭
+    end_marker: int  # 終了マーカーの行の先頭
+    end: int  # 終了マーカーの次の行の先頭
+
+
+class RaceIndex:
+    """番組表・競走成績ファイル1つ分のトラック・レースのバイト位置
+
+    tracks はレース場番号（"01"〜"24"）→ TrackRange（作成時に探す）、
+    races はレース場番号 → {レース番号: (開始位置, 終了位置)}（track_races で探したもの）。
+    with で使う（mmap とファイルは close で閉じる）
+    """
+
+    def __init__(self, path: str, encoding: str = "auto"):
+        self.path = path
+        self.kind: Optional[str] = None
+        self.tracks: Dict[str, TrackRange] = {}
+        self.races: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        self._file = None
+        self._mmap = None
+
+        if path.lower().endswith(ARCHIVE_SUFFIX):
+            self.data = read_member(path)
+        elif os.path.getsize(path) == 0:
+            # 空のファイルは mmap できない
+            self.data = b""
+        else:
+            self._file = open(path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = self._mmap
+
+        if encoding == "auto":
+            encoding = detect_head_encoding(self.data[:DETECT_SIZE])
+        self.encoding = encoding
+
+        self.scan_tracks()
+
+    def __enter__(self) -> "RaceIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """mmap とファイルを閉じる"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def line_end(self, position: int) -> int:
+        """position を含む行の次の行の先頭（最後の行はファイル末尾）"""
+        end = self.data.find(b"\n", position)
+        return len(self.data) if end < 0 else end + 1
+
+    def find_lines(self, literal: bytes, pattern, start: int, end: int) -> List:
+        """literal を bytes.find で探し、それを含む行の先頭から pattern に合う行を返す
+
+        正規表現で全体を走査するより速い。pattern は行頭から literal を含む部分までに合うもの
+        （cp932 の2バイト目が literal と同じ値でも、行頭からの pattern で除く）
+        """
+        matches = []
+        position = self.data.find(literal, start, end)
+        while position >= 0:
+            newline = self.data.rfind(b"\n", start, position)
+            line_start = start if newline < 0 else newline + 1
+            match = pattern.match(self.data, line_start, end)
+            if match and match.start() <= position < match.end():
+                matches.append(match)
+            position = self.data.find(literal, position + len(literal), end)
+        return matches
+
+    def scan_tracks(self) -> None:
+        """トラックの開始・終了マーカーの行を探す"""
+        size = len(self.data)
+        marks = self.find_lines(b"BGN", RAW_TRACK_MARK_PATTERN, 0, size)
+        marks += self.find_lines(b"END", RAW_TRACK_MARK_PATTERN, 0, size)
+        marks.sort(key=lambda match: match.start())
+
+        begin = None
+        for match in marks:
+            track_number, kind, mark = (
+                group.decode("ascii") for group in match.groups()
+            )
+            if mark == "BGN":
+                self.kind = self.kind or kind
+                begin = (track_number, match.start(), self.line_end(match.end()))
+            elif begin is not None and begin[0] == track_number:
+                end = self.line_end(match.end())
+                self.tracks[track_number] = TrackRange(*begin[1:], match.start(), end)
+                begin = None
+
+        if begin is not None:
+            # 終了マーカーがないトラックはファイル末尾まで
+            self.tracks[begin[0]] = TrackRange(*begin[1:], size, size)
+
+    def track_races(self, track_number: str) -> Dict[int, Tuple[int, int]]:
+        """トラックのレース番号 → (開始位置, 終了位置)（ないトラックは空の辞書）"""
+        if track_number not in self.races:
+            track = self.tracks.get(track_number)
+            if track is None:
+                return {}
+            if self.kind == PROGRAM_KIND:
+                starts = self.scan_program_races(track)
+            else:
+                starts = self.scan_result_races(track)
+            self.races[track_number] = race_ranges(track, starts)
+        return self.races[track_number]
+
+    def race_range(
+        self, track_number: str, race_number: int
+    ) -> Optional[Tuple[int, int]]:
+        """レースの (開始位置, 終了位置)（索引にないレースは None）"""
+        return self.track_races(track_number).get(race_number)
+
+    def scan_program_races(self, track: TrackRange) -> List[Tuple[int, int]]:
+        """番組表のレースヘッダーの行を探す（行だけをデコードしてレース番号を求める）"""
+        mark = PROGRAM_RACE_HEADER_MARK.encode(self.encoding)
+        starts = []
+        position = self.data.find(mark, track.body, track.end_marker)
+        while position >= 0:
+            newline = self.data.rfind(b"\n", track.body, position)
+            start = track.body if newline < 0 else newline + 1
+            end = self.line_end(position)
+            line = self.decode(start, end).strip()
+            if "Ｒ" in line or "R" in line:
+                header = parse_program_race_header(line)
+                starts.append((start, int(header.race_number) if header else 0))
+            position = self.data.find(mark, end, track.end_marker)
+        return starts
+
+    def scan_result_races(self, track: TrackRange) -> List[Tuple[int, int]]:
+        """競走成績のレース開始の行を探す（レース番号は ASCII のまま読む）"""
+        matches = self.find_lines(
+            b"R", RAW_RESULT_RACE_START_PATTERN, track.body, track.end_marker
+        )
+        return [(match.start(), int(match.group(1))) for match in matches]
+
+    def decode(self, start: int, end: int) -> str:
+        """バイト位置 start〜end をデコード"""
+        return self.data[start:end].decode(self.encoding)
+
+    def track_text(self, track_number: str) -> str:
+        """トラック全体（開始・終了マーカーの行を含む）をデコード"""
+        track = self.tracks[track_number]
+        return self.decode(track.begin, track.end)
+
+    def race_text(self, track_number: str, race_number: int) -> str:
+        """1レース分をデコード
+
+        そのまま共通パーサーで解析できるように、トラックの開始・終了マーカーの行で挟む
+        """
+        track = self.tracks[track_number]
+        start, stop = self.track_races(track_number)[race_number]
+        return (
+            self.decode(track.begin, track.body)
+            + self.decode(start, stop)
+            + self.decode(track.end_marker, track.end)
+        )
+
+
+def race_ranges(
+    track: TrackRange, starts: List[Tuple[int, int]]
+) -> Dict[int, Tuple[int, int]]:
+    """レースの開始位置のリスト [(開始位置, レース番号), ...] からレースの範囲を求める
+
+    各レースは次のレースの開始位置（最後のレースはトラックの終了マーカー）まで。
+    同じレース番号は後の範囲を使い、レース番号が 0 の区切りはレースの範囲の終わりにだけ使う
+    """
+    ranges = {}
+    for i, (start, race_number) in enumerate(starts):
+        stop = starts[i + 1][0] if i + 1 < len(starts) else track.end_marker
+        if race_number:
+            ranges[race_number] = (start, stop)
+    return ranges
+
+
+def text_lines(text: str) -> io.StringIO:
+    """デコードした範囲を1行ずつ読めるテキストにする（改行は open_raw と同じく "\\n"）"""
+    return io.StringIO(text, newline=None)
+
+
+def read_program_race(
+    index: RaceIndex,
+    year: int,
+    month: int,
+    day: int,
+    track_number: str,
+    race_number: int,
+) -> Optional[ProgramRace]:
+    """番組表の1レース分だけを解析（索引にない・6艇そろっていないレースは None）"""
+    if index.race_range(track_number, race_number) is None:
+        return None
+    lines = text_lines(index.race_text(track_number, race_number))
+    races = parse_program_lines(lines, year, month, day)
+    return races[0] if races else None
+
+
+def read_result_race(
+    index: RaceIndex,
+    year: int,
+    month: int,
+    day: int,
+    track_number: str,
+    race_number: int,
+    payouts: Optional[List[List]] = None,
+) -> List[Tuple]:
+    """競走成績の1レース分だけを解析し、race_results.csv の行データを返す
+
+    payouts にリストを渡すと、そのレースの払戻金の行データも追加する
+    """
+    if index.race_range(track_number, race_number) is None:
+        return []
+    lines = text_lines(index.race_text(track_number, race_number))
+    return list(iter_race_rows(lines, year, month, day, payouts))
+
+
+def file_date(path: str) -> Optional[Tuple[int, int, int]]:
+    """番組表・競走成績のファイル名から (年, 月, 日) を求める（ファイル名が違う場合は None）"""
+    file_name = os.path.basename(path)
+    match = PROGRAM_FILE_PATTERN.match(file_name) or RESULT_FILE_PATTERN.match(
+        file_name
+    )
+    if not match:
+        return None
+    year, month, day = match.groups()
+    return 2000 + int(year), int(month), int(day)
+
+
+def print_index(index: RaceIndex) -> None:
+    """索引（トラックごとのバイト位置とレース番号）を表示"""
+    kind = "番組表" if index.kind == PROGRAM_KIND else "競走成績"
+    print(f"{index.path}: {kind}、{len(index.data):,}バイト（{index.encoding}）")
+    for track_number, track in index.tracks.items():
+        races = sorted(index.track_races(track_number))
+        print(
+            f"  {track_number} {TRACKS.get(track_number, '不明'):<4}"
+            f" {track.begin:>9,}〜{track.end:>9,}"
+            f" レース: {', '.join(str(race) for race in races)}"
+        )
+
+
+def print_race(
+    index: RaceIndex,
+    date: Tuple[int, int, int],
+    track_number: str,
+    race_numbers: List[int],
+) -> int:
+    """指定したレースを解析し、CSVの行として標準出力に表示して、表示した行数を返す"""
+    writer = csv.writer(sys.stdout)
+    row_count = 0
+    if index.kind == PROGRAM_KIND:
+        converter = ProgramConverter()
+        writer.writerow(converter.csv_headers)
+        for race_number in race_numbers:
+            race = read_program_race(index, *date, track_number, race_number)
+            if race is not None:
+                writer.writerow(converter.build_row(race))
+                row_count += 1
+    else:
+        writer.writerow(CSV_HEADERS)
+        for race_number in race_numbers:
+            rows = read_result_race(index, *date, track_number, race_number)
+            writer.writerows(rows)
+            row_count += len(rows)
+    return row_count
+
+
+def print_usage():
+    """使用方法を表示"""
+    print("使用方法: python race_index.py <ファイル名> [レース場番号 [レース番号]]")
+    print("  ファイル名: 番組表・競走成績のファイル（b/kYYMMDD.txt, _u8.txt, .lzh）")
+    print("  レース場番号・レース番号を省略: トラック・レースの索引を表示")
+    print("  レース場番号のみ: そのトラックの全レースを解析してCSVで表示")
+    print("  レース場番号とレース番号: そのレースだけを解析してCSVで表示")
+
+
+def main():
+    """メイン関数"""
+    args = sys.argv[1:]
+    if not args or len(args) > 3 or "--help" in args or "-h" in args:
+        print_usage()
+        sys.exit(0 if args else 1)
+
+    path = args[0]
+    if not os.path.exists(path):
+        print(f"エラー: ファイル {path} が見つかりません")
+        sys.exit(1)
+
+    try:
+        track_number = f"{int(args[1]):02d}" if len(args) > 1 else None
+        race_number = int(args[2]) if len(args) > 2 else None
+    except ValueError:
+        print("エラー: レース場番号・レース番号は数値で指定してください")
+        sys.exit(1)
+
+    try:
+        with RaceIndex(path) as index:
+            if track_number is None:
+                print_index(index)
+                return
+
+            date = file_date(path)
+            if date is None:
+                print(f"エラー: ファイル名から日付を読み取れません: {path}")
+                sys.exit(1)
+            if track_number not in index.tracks:
+                print(f"エラー: レース場番号 {track_number} のデータがありません")
+                sys.exit(1)
+
+            if (
+                race_number is not None
+                and index.race_range(track_number, race_number) is None
+            ):
+                print(f"エラー: {track_number} {race_number}R のデータがありません")
+                sys.exit(1)
+
+            if race_number is None:
+                race_numbers = sorted(index.track_races(track_number))
+            else:
+                race_numbers = [race_number]
+            if print_race(index, date, track_number, race_numbers) == 0:
+                print("エラー: データが見つかりませんでした", file=sys.stderr)
+                sys.exit(1)
+    except (UnicodeDecodeError, ValueError) as e:
+        print(f"エラー: 入力ファイルを読み込めません: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+番組表・競走成績の元ファイルの読み込み
+
+公式サイトの番組表・競走成績ファイルは LZH のアーカイブ（b/kYYMMDD.lzh）で、
+中身のテキストは Shift_JIS（cp932）。以前のバージョンで展開したファイル（b/kYYMMDD.txt）や
+iconv で UTF-8 に変換したファイル（b/kYYMMDD_u8.txt）も残っている。
+いずれも変換せずにそのまま開き（アーカイブはメモリ上で展開し）、読み込み時に1度だけデコードする。
+"""
+
+import codecs
+import io
+import os
+from typing import List, Pattern, TextIO, Tuple
+
+from lzh_archive import read_member
+
+# 文字コードの指定（auto: ファイルの先頭から判定）
+ENCODINGS = ("auto", "utf-8", "cp932")
+
+# 文字コード判定で読み込むファイル先頭のサイズ（バイト）
+DETECT_SIZE = 64 * 1024
+
+# 元ファイルの接尾辞（同じ日のファイルが複数ある場合は、この順に優先する）
+# 展開済みのテキストはアーカイブの展開が不要なため、アーカイブより優先する
+RAW_SUFFIXES = (".txt", "_u8.txt", ".lzh")
+
+# LZHアーカイブの拡張子
+ARCHIVE_SUFFIX = ".lzh"
+
+
+def detect_head_encoding(head: bytes) -> str:
+    """ファイルの先頭のバイト列が UTF-8 としてデコードできれば "utf-8"、できなければ "cp932"
+
+    読み込みの区切りで途中になったマルチバイト文字はエラーにしない（final=False）
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        decoder.decode(head, final=False)
+    except UnicodeDecodeError:
+        return "cp932"
+    return "utf-8"
+
+
+def detect_encoding(path: str) -> str:
+    """ファイルの先頭を読んで文字コードを判定する
+
+    先頭の会場名・レース名で判定できるため、ファイル全体は読まない
+    """
+    with open(path, "rb") as f:
+        return detect_head_encoding(f.read(DETECT_SIZE))
+
+
+def open_raw(path: str, encoding: str = "auto") -> TextIO:
+    """番組表・競走成績のファイル（またはLZHアーカイブ）をテキストとして開く
+
+    アーカイブは一時ファイルに展開せず、メモリ上で展開した内容をデコードしながら読む。
+    encoding が "auto" の場合はファイルの先頭から判定する
+    """
+    if path.lower().endswith(ARCHIVE_SUFFIX):
+        content = read_member(path)
+        if encoding == "auto":
+            encoding = detect_head_encoding(content[:DETECT_SIZE])
+        return io.TextIOWrapper(io.BytesIO(content), encoding=encoding)
+
+    if encoding == "auto":
+        encoding = detect_encoding(path)
+    return open(path, "r", encoding=encoding)
+
+
+def raw_file_path(directory: str, prefix: str, year: int, month: int, day: int) -> str:
+    """年月日から元ファイルのパスを生成
+
+    {prefix}YYMMDD.txt（Shift_JIS）、{prefix}YYMMDD_u8.txt（UTF-8）、
+    {prefix}YYMMDD.lzh（アーカイブ）の順に、存在する最初のファイルのパスを返す。
+    どれもなければアーカイブのパスを返す
+    """
+    name = f"{prefix}{year % 100:02d}{month:02d}{day:02d}"
+    for suffix in RAW_SUFFIXES:
+        path = os.path.join(directory, name + suffix)
+        if os.path.exists(path):
+            return path
+    return path
+
+
+def raw_suffix_rank(file_name: str) -> int:
+    """ファイル名の接尾辞の優先順位（RAW_SUFFIXES の順）"""
+    if file_name.endswith("_u8.txt"):
+        return RAW_SUFFIXES.index("_u8.txt")
+    if file_name.endswith(".txt"):
+        return RAW_SUFFIXES.index(".txt")
+    return RAW_SUFFIXES.index(ARCHIVE_SUFFIX)
+
+
+def directory_raw_files(
+    directory: str, pattern: Pattern
+) -> List[Tuple[int, int, int, str]]:
+    """ディレクトリ内の元ファイルを (年, 月, 日, パス) で日付順に列挙
+
+    同じ日のファイルが複数ある場合（アーカイブと展開済みのファイルなど）は、
+    RAW_SUFFIXES の順で最初のものだけを対象にする（同じ日を2回変換しない）
+    """
+    files = {}
+    for file_name in os.listdir(directory):
+        match = pattern.match(file_name)
+        if not match:
+            continue
+        key = (2000 + int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        rank = raw_suffix_rank(file_name)
+        if key not in files or rank < files[key][0]:
+            files[key] = (rank, os.path.join(directory, file_name))
+
+    return [key + (files[key][1],) for key in sorted(files)]
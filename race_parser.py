@@ -0,0 +1,792 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+番組表・競走成績の共通パーサー
+
+convert_program.py / convert_race_result.py / extract_race_info.py の解析処理をまとめたもの。
+各プログラムは入出力（引数・CSV・Parquet・SQLite）だけを受け持ち、解析はこのモジュールの
+関数で行う（解析の高速化や修正は1か所で済む）。
+
+- レース場: 番号と名前の表（TRACKS）を1つだけ持つ
+- 固定幅の行: 列の表（名前, 開始位置, 終了位置）から切り出す（fixed_width_parser）。
+  競走成績の艇の行は、列の形式が合わない場合だけ正規表現で解析する
+- 解析結果: 艇・レースは NamedTuple（属性名で参照でき、CSVの行にもそのまま展開できる）。
+  1年分をメモリに持っても辞書よりオブジェクトの数・サイズが小さい
+"""
+
+from collections import Counter
+from operator import itemgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from race_io import open_raw
+from race_patterns import (
+    BOAT_RESULT_PATTERN,
+    DIGIT_TRANSLATION,
+    PROGRAM_DISTANCE_PATTERN,
+    PROGRAM_RACE_HEADER_MARK,
+    PROGRAM_RACE_MARK_PATTERN,
+    PROGRAM_RACE_NUMBER_PATTERN,
+    PROGRAM_TIME_PATTERN,
+    PROGRAM_TRACK_BEGIN_PATTERN,
+    PROGRAM_TRACK_END_PATTERN,
+    PROGRAM_ZENKAKU_RACE_NUMBER_PATTERN,
+    RESULT_PAYOUT_BET_PATTERN,
+    RESULT_PAYOUT_CONTINUATION_PATTERN,
+    RESULT_PAYOUT_ENTRY_PATTERN,
+    RESULT_PAYOUT_SPECIAL_PATTERN,
+    RESULT_RACE_END_PATTERN,
+    RESULT_RACE_HEADER_PATTERN,
+    RESULT_RACE_START_PATTERN,
+    RESULT_TRACK_BEGIN_MARK_PATTERN,
+    RESULT_TRACK_BEGIN_PATTERN,
+    RESULT_TRACK_END_MARK_PATTERN,
+    RESULT_VENUE_NAME_PATTERN,
+    SPACES_PATTERN,
+)
+
+# ---------------------------------------------------------------------------
+# レース場
+# ---------------------------------------------------------------------------
+
+# レース場番号 → レース場名
+TRACKS: Dict[str, str] = {
+    "01": "桐生",
+    "02": "戸田",
+    "03": "江戸川",
+    "04": "平和島",
+    "05": "多摩川",
+    "06": "浜名湖",
+    "07": "蒲郡",
+    "08": "常滑",
+    "09": "津",
+    "10": "三国",
+    "11": "びわこ",
+    "12": "住之江",
+    "13": "尼崎",
+    "14": "鳴門",
+    "15": "丸亀",
+    "16": "児島",
+    "17": "宮島",
+    "18": "徳山",
+    "19": "下関",
+    "20": "若松",
+    "21": "芦屋",
+    "22": "福岡",
+    "23": "唐津",
+    "24": "大村",
+}
+
+# レース場名 → レース場番号
+TRACK_NUMBERS: Dict[str, str] = {name: number for number, name in TRACKS.items()}
+
+
+def find_track_number(text: str) -> Optional[str]:
+    """レース場名を含む文字列からレース場番号を求める（番号の順に最初に見つかった名前）"""
+    for track_name, track_number in TRACK_NUMBERS.items():
+        if track_name in text:
+            return track_number
+    return None
+
+
+# ---------------------------------------------------------------------------
+# 固定幅の行
+# ---------------------------------------------------------------------------
+
+# 固定幅の列の表: (名前, 開始位置, 終了位置)
+Columns = Sequence[Tuple[str, int, int]]
+
+
+def fixed_width_parser(
+    columns: Columns, make: Callable[[Iterable[str]], Any] = list
+) -> Callable[[str], Any]:
+    """列の表から、行を列ごとに切り出して前後の空白を除く関数を作る
+
+    切り出し位置は関数を作るときに1度だけ slice にしておき、切り出しと空白の除去は
+    itemgetter / map で行う（列ごとの Python の処理をしない）。
+    結果は make で作る（既定は list、NamedTuple の _make を渡せば直接その型になる）
+    """
+    slices = [slice(start, end) for _, start, end in columns]
+    strip = str.strip
+    if len(slices) == 1:
+        # 列が1つだと itemgetter は tuple でなく文字列を返す
+        (only,) = slices
+
+        def parse_one(line: str) -> Any:
+            return make([line[only].strip()])
+
+        return parse_one
+    getter = itemgetter(*slices)
+
+    def parse(line: str) -> Any:
+        return make(map(strip, getter(line)))
+
+    return parse
+
+
+# ---------------------------------------------------------------------------
+# 番組表
+# ---------------------------------------------------------------------------
+
+
+class ProgramBoat(NamedTuple):
+    """番組表の1艇分（値はファイル上の文字列）"""
+
+    boat_number: str
+    player_id: str
+    player_name: str
+    age: str
+    branch: str
+    weight: str
+    player_class: str
+    national_win_rate: str
+    national_2nd_rate: str
+    local_win_rate: str
+    local_2nd_rate: str
+    motor_number: str
+    motor_2nd_rate: str
+    boat_number_actual: str
+    boat_2nd_rate: str
+
+
+class ProgramRaceHeader(NamedTuple):
+    """番組表のレースヘッダー"""
+
+    race_number: str
+    race_name: str
+    distance: str
+    time: str
+
+
+class ProgramRace(NamedTuple):
+    """番組表の1レース分
+
+    boats は1〜6号艇の ProgramBoat（艇番 - 1 の位置、データがない艇は None）
+    """
+
+    year: int
+    month: int
+    day: int
+    track_number: str
+    race_number: str
+    race_name: str
+    distance: str
+    time: str
+    boats: Tuple[Optional[ProgramBoat], ...]
+
+
+# 番組表の艇の行の列（ProgramBoat の項目の順）
+# 例: "1 4315 山田太郎35大阪52A1 6.50 45.20 6.80 50.00 12 38.50 34 33.10"
+PROGRAM_BOAT_COLUMNS: Columns = (
+    ("boat_number", 0, 1),
+    ("player_id", 2, 6),
+    ("player_name", 6, 10),
+    ("age", 10, 12),
+    ("branch", 12, 14),
+    ("weight", 14, 16),
+    ("player_class", 16, 18),
+    ("national_win_rate", 19, 23),
+    ("national_2nd_rate", 24, 29),
+    ("local_win_rate", 30, 34),
+    ("local_2nd_rate", 35, 40),
+    ("motor_number", 41, 43),
+    ("motor_2nd_rate", 44, 49),
+    ("boat_number_actual", 50, 52),
+    ("boat_2nd_rate", 53, 58),
+)
+
+# 1レースの艇数
+BOATS_PER_RACE = 6
+
+# 艇の行の先頭の艇番
+PROGRAM_BOAT_NUMBERS = "123456"
+
+# レース区間を終わらせる行の先頭（トラック終了・ファイル終了）
+PROGRAM_END_MARKERS = ("BEND", "FINALB")
+
+# 艇の行の最低限の長さ（ボート2連率まで）
+PROGRAM_BOAT_LINE_LENGTH = PROGRAM_BOAT_COLUMNS[-1][2]
+
+split_program_boat = fixed_width_parser(PROGRAM_BOAT_COLUMNS, ProgramBoat._make)
+
+
+def parse_deadline(time_str: str) -> str:
+    """投票締切時間を解析してHH:MM形式に変換"""
+    # 時間パターンをマッチ（全角数字・全角コロンにも一致する）
+    match = PROGRAM_TIME_PATTERN.search(time_str)
+    if match:
+        # 一致した数字だけを半角に変換
+        hour = match.group(1).translate(DIGIT_TRANSLATION).zfill(2)
+        minute = match.group(2).translate(DIGIT_TRANSLATION)
+        return f"{hour}:{minute}"
+    return ""
+
+
+def parse_program_boat(line: str) -> Optional[ProgramBoat]:
+    """番組表の艇の行を固定位置で切り出す（艇の行でなければ None）"""
+    # 行の長さをチェック（最低限ボート2連率まで取得できる長さ）
+    if len(line) < PROGRAM_BOAT_LINE_LENGTH:
+        return None
+
+    # 艇番（最初の1文字）が数字でない行（区切り線・空白始まりの行など）は無効
+    if not line[0].isdigit():
+        return None
+
+    # ヘッダー行を除外
+    if "選手" in line or "登番" in line or "番号" in line:
+        return None
+
+    # 選手登番が4桁の数字でない場合は無効
+    if not line[2:6].isdigit():
+        return None
+
+    return split_program_boat(line)
+
+
+def parse_program_race_header(line: str) -> Optional[ProgramRaceHeader]:
+    """番組表のレースヘッダー情報を解析
+
+    パターンは全角・半角の両方に一致するため、行全体は変換せず、一致した数字だけを
+    半角に変換する
+    """
+    # レース番号を抽出（全角・半角両対応）
+    race_match = PROGRAM_RACE_NUMBER_PATTERN.search(line)
+    if not race_match:
+        # 全角数字のRパターンも試す
+        race_match = PROGRAM_ZENKAKU_RACE_NUMBER_PATTERN.search(line)
+        if not race_match:
+            return None
+    race_number = race_match.group(1).translate(DIGIT_TRANSLATION)
+
+    # 距離を抽出（H1800m形式）
+    distance_match = PROGRAM_DISTANCE_PATTERN.search(line)
+    distance = (
+        distance_match.group(1).translate(DIGIT_TRANSLATION) if distance_match else ""
+    )
+
+    # レース名はデフォルト値
+    return ProgramRaceHeader(race_number, "予選", distance, parse_deadline(line))
+
+
+def parse_program_lines(
+    lines: Iterable[str], year: int, month: int, day: int
+) -> List[ProgramRace]:
+    """番組表の各行を1パスで解析してレースデータのリストを返す
+
+    各行は1度だけ読み、次の状態遷移で処理する
+    トラック開始(BBGN) → レースヘッダー → 艇データ → 次のレース/トラック終了(BEND)
+    """
+    races = []
+    current_track_number = None
+
+    # 処理中のレース区間の状態（艇は艇番 - 1 の位置に入れる）
+    in_race = False
+    race_header = None
+    boats = [None] * BOATS_PER_RACE
+
+    def finish_race():
+        # 6艇すべてのデータがある場合のみレースとして採用
+        if race_header and None not in boats:
+            races.append(
+                ProgramRace(
+                    year, month, day, race_track_number, *race_header, tuple(boats)
+                )
+            )
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        # レース区間の中で、レース番号・締切の表記を含まない行は区間の終わりでも新しい
+        # レースでもないため、艇の行は切り出し、マーカー・終了の行以外は読み飛ばす
+        if in_race and "Ｒ" not in line and PROGRAM_RACE_HEADER_MARK not in line:
+            if line[0].isdigit():
+                if line[1:2] == " " and line[0] in PROGRAM_BOAT_NUMBERS:
+                    boat = parse_program_boat(line)
+                    if boat:
+                        boats[int(line[0]) - 1] = boat
+                    continue
+            elif not line.startswith(PROGRAM_END_MARKERS):
+                continue
+
+        # マーカー行（{番号}BBGN / {番号}BEND）は3〜6文字目で判別できる
+        marker = line[2:6]
+        is_track_begin = marker == "BBGN" and PROGRAM_TRACK_BEGIN_PATTERN.match(line)
+        is_track_end = marker == "BEND" and PROGRAM_TRACK_END_PATTERN.match(line)
+        is_race_header = PROGRAM_RACE_HEADER_MARK in line and (
+            "Ｒ" in line or "R" in line
+        )
+
+        # 処理中のレース区間の終了判定（次のレース・トラック終了・ファイル終了）
+        if in_race and (
+            is_track_end
+            or ("Ｒ" in line and PROGRAM_RACE_MARK_PATTERN.search(line))
+            or line.startswith(PROGRAM_END_MARKERS)
+        ):
+            finish_race()
+            in_race = False
+
+        # トラック開始マーカー
+        if is_track_begin:
+            current_track_number = line[:2]
+            continue
+
+        # レース場名からトラック番号を抽出（BBGNの次の行で）
+        if current_track_number is None and "ボートレース" in line:
+            extracted_track = find_track_number(line)
+            if extracted_track:
+                current_track_number = extracted_track
+
+        # トラック終了マーカー
+        if is_track_end:
+            current_track_number = None
+            continue
+
+        # レースヘッダーで新しいレース区間を開始
+        if is_race_header and current_track_number:
+            in_race = True
+            race_header = None
+            boats = [None] * BOATS_PER_RACE
+            race_track_number = current_track_number
+
+        if not in_race:
+            continue
+
+        # レースヘッダーの解析
+        if is_race_header:
+            race_header = parse_program_race_header(line)
+            continue
+
+        # 艇データの解析（艇番で始まる行のみ）
+        if line[0].isdigit():
+            boat = parse_program_boat(line)
+            if boat and "1" <= boat.boat_number <= "6":
+                boats[int(boat.boat_number) - 1] = boat
+
+    if in_race:
+        finish_race()
+
+    return races
+
+
+# ---------------------------------------------------------------------------
+# 競走成績
+# ---------------------------------------------------------------------------
+
+
+class ResultRaceHeader(NamedTuple):
+    """競走成績のレースヘッダー（見つからない項目は空文字）"""
+
+    distance: str = ""
+    weather: str = ""
+    wind_direction: str = ""
+    wind_speed: str = ""
+    wave_height: str = ""
+
+
+class BoatResult(NamedTuple):
+    """競走成績の1艇分（race_results.csv の着〜レースタイムの順）"""
+
+    position: str
+    boat_number: str
+    registration_number: str
+    motor: str
+    boat: str
+    exhibition_time: str
+    entry_number: str
+    start_timing: str
+    race_time: str
+
+
+# 払戻金の勝式（ファイル上の表記 → 出力する表記）
+PAYOUT_BET_TYPES = {
+    "単勝": "単勝",
+    "複勝": "複勝",
+    "２連単": "2連単",
+    "２連複": "2連複",
+    "拡連複": "拡連複",
+    "３連単": "3連単",
+    "３連複": "3連複",
+}
+
+# 特払い（的中がない場合の返還）の組番
+SPECIAL_PAYOUT_COMBINATION = "特払い"
+
+# ヘッダーがないレースの値
+EMPTY_RESULT_HEADER = ResultRaceHeader()
+
+# 競走成績の艇の行の列（BoatResult の項目の順、選手名は出力しないため切り出さない）
+# 例: "  01  1 3501 川　上　　昇　平 50   12  6.89   1    0.08     1.49.7"
+RESULT_BOAT_COLUMNS: Columns = (
+    ("position", 2, 4),
+    ("boat_number", 6, 7),
+    ("registration_number", 8, 12),
+    ("motor", 22, 24),
+    ("boat", 26, 29),
+    ("exhibition_time", 31, 35),
+    ("entry_number", 38, 39),
+    ("start_timing", 42, 47),
+    ("race_time", 52, 58),
+)
+
+# 固定位置で切り出す艇の行の長さ（レースタイムまで）
+RESULT_BOAT_LINE_LENGTH = RESULT_BOAT_COLUMNS[-1][2]
+
+# 列の間の空白の位置（空白でない行は、値が列からはみ出しているため切り出さない）
+RESULT_BOAT_GAPS = (
+    (0, 2),
+    (4, 6),
+    (7, 8),
+    (12, 13),
+    (21, 22),
+    (24, 26),
+    (29, 31),
+    (35, 38),
+    (39, 42),
+    (47, 52),
+)
+
+# 数字以外の着（BOAT_RESULT_PATTERN と同じ: フライング、失格、出遅れ、欠場）
+SPECIAL_POSITIONS = frozenset(("F", "S0", "S1", "S2", "L0", "L1", "K0", "K1"))
+
+# レースタイムがない（失格・フライングなど）場合の表記
+NO_RACE_TIME = ".  ."
+
+# 列を1度に取り出す（1文字の列は添字で取り出し、前後の空白は列ごとに除く）
+split_result_boat = itemgetter(
+    *(
+        slice(start, end) if end - start > 1 else start
+        for _, start, end in RESULT_BOAT_COLUMNS
+    )
+)
+
+# 列の間の文字を1文字ずつ取り出し、すべて空白であることを確認する
+RESULT_BOAT_GAP_COLUMNS = tuple(
+    column for start, end in RESULT_BOAT_GAPS for column in range(start, end)
+)
+result_boat_gaps = itemgetter(*RESULT_BOAT_GAP_COLUMNS)
+RESULT_BOAT_GAP_SPACES = (" ",) * len(RESULT_BOAT_GAP_COLUMNS)
+
+# 固定位置で切り出せず、正規表現で解析した艇の行の数
+# （"matched": 正規表現で解析できた行、"unmatched": 正規表現でも解析できなかった行）
+BOAT_RESULT_FALLBACKS: Counter = Counter()
+
+
+def get_track_number(content: str) -> str:
+    """競走成績の内容から競艇場番号を取得する（見つからない場合は "00"）"""
+    # ファイル先頭の24KBGNから取得（最も確実）
+    match = RESULT_TRACK_BEGIN_PATTERN.search(content)
+    if match:
+        return match.group(1)
+
+    # ファイル内から競艇場名を検索（全角スペースを含む可能性を考慮）
+    track_match = RESULT_VENUE_NAME_PATTERN.search(content)
+    if track_match:
+        # 全角スペースを除去して競艇場名を抽出
+        track_name = SPACES_PATTERN.sub("", track_match.group(1).strip())
+        return TRACK_NUMBERS.get(track_name, "00")
+
+    return "00"
+
+
+def parse_race_header(race_content: str) -> ResultRaceHeader:
+    """競走成績のレースヘッダーから距離・天候・風向き・風速・波高を抽出"""
+    # 例: H1800m  雨　  風  北東　 5m  波　  4cm
+    match = RESULT_RACE_HEADER_PATTERN.search(race_content)
+    if match:
+        return ResultRaceHeader(*match.groups())
+    return EMPTY_RESULT_HEADER
+
+
+def split_boat_result(line: str) -> Optional[BoatResult]:
+    """艇結果の行を固定位置で切り出す
+
+    各列の値が BOAT_RESULT_PATTERN と同じ形式の場合だけ BoatResult を返し、
+    形式が合わない行（長さ・列の間の空白・値の形式）は None を返す。
+    特殊な着（F, S0〜S2, L0・L1, K0・K1）はそのまま、スタートタイミングの F は -、
+    レースタイムの ".  ." は空文字にする（正規表現で解析した場合と同じ値）
+    """
+    if len(line) != RESULT_BOAT_LINE_LENGTH:
+        return None
+    if result_boat_gaps(line) != RESULT_BOAT_GAP_SPACES:
+        return None
+
+    (
+        position,
+        boat_number,
+        registration_number,
+        motor,
+        boat,
+        exhibition_time,
+        entry_number,
+        start_timing,
+        race_time,
+    ) = split_result_boat(line)
+
+    # 数字の値は正規表現の \d と同じく isdecimal で判定する（着は半角数字のみ）
+    position = position.rstrip()
+    if not (
+        position.isdecimal() and position.isascii() or position in SPECIAL_POSITIONS
+    ):
+        return None
+    motor = motor.lstrip()
+    boat = boat.lstrip()
+    if not (
+        boat_number.isdecimal()
+        and registration_number.isdecimal()
+        and motor.isdecimal()
+        and boat.isdecimal()
+        and entry_number.isdecimal()
+    ):
+        return None
+
+    # 展示タイム（例: 6.89）
+    if not (
+        exhibition_time[1] == "."
+        and exhibition_time[0].isdecimal()
+        and exhibition_time[2:].isdecimal()
+    ):
+        return None
+
+    # スタートタイミング（例: 0.08、F0.01 → -0.01）
+    start_timing = start_timing.lstrip()
+    if start_timing[:1] == "F":
+        start_timing = "-" + start_timing[1:]
+    if not start_timing.lstrip("-").replace(".", "").isdecimal():
+        return None
+
+    # レースタイム（例: 1.49.7、記録なしは ".  ."）
+    race_time = race_time.strip()
+    if race_time == NO_RACE_TIME:
+        race_time = ""
+    elif not ("." in race_time and race_time.replace(".", "").isdecimal()):
+        return None
+
+    return BoatResult(
+        position,
+        boat_number,
+        registration_number,
+        motor,
+        boat,
+        exhibition_time,
+        entry_number,
+        start_timing,
+        race_time,
+    )
+
+
+def match_boat_result(line: str) -> Optional[BoatResult]:
+    """1行の艇結果を正規表現で解析（固定位置で切り出せない行に使う）"""
+    # 着順、艇番、登番、選手名、モーター、ボート、展示タイム、進入、スタートタイミング、レースタイム
+    # 例: 01  5 3784 中　島　　友　和 40   75  6.89   5    0.10     1.51.0
+    # 特殊着順例: S0  5 3784 中　島　　友　和 40   75  6.89   5    F0.10     1.51.0
+    match = BOAT_RESULT_PATTERN.match(line)
+    if not match:
+        return None
+
+    # スタートタイミングの処理（Fが付いている場合は-に変換）
+    start_timing = match.group(9).strip()
+    if start_timing.startswith("F"):
+        start_timing = "-" + start_timing[1:]  # F0.10 → -0.10
+
+    race_time = match.group(10)
+    return BoatResult(
+        match.group(1).strip(),
+        match.group(2).strip(),
+        match.group(3).strip(),
+        match.group(5).strip(),
+        match.group(6).strip(),
+        match.group(7).strip(),
+        match.group(8).strip(),
+        start_timing,
+        race_time.strip() if race_time != "." and "." in race_time else "",
+    )
+
+
+def parse_boat_result(line: str) -> Optional[BoatResult]:
+    """1行の艇結果を解析
+
+    固定位置で切り出し、形式が合わない場合だけ正規表現で解析する
+    （正規表現で解析した行の数は BOAT_RESULT_FALLBACKS に数える）
+    """
+    boat_result = split_boat_result(line)
+    if boat_result is not None:
+        return boat_result
+
+    boat_result = match_boat_result(line)
+    BOAT_RESULT_FALLBACKS["matched" if boat_result else "unmatched"] += 1
+    return boat_result
+
+
+def parse_payout_line(
+    line: str, bet_type: Optional[str]
+) -> Tuple[Optional[str], List[Tuple[str, str, str]]]:
+    """払戻金の1行を解析し、(勝式, [(組番, 払戻金, 人気), ...]) を返す
+
+    勝式を省略した行（拡連複の2組目以降・同着）は、直前の行の勝式 bet_type とする。
+    払戻金の行でなければ (None, [])、不成立の場合は (勝式, []) を返す
+    例: "        ２連単   1-3        390  人気     1 " → ("2連単", [("1-3", "390", "1")])
+    """
+    match = RESULT_PAYOUT_BET_PATTERN.match(line)
+    if match:
+        bet_type = PAYOUT_BET_TYPES[match.group(1)]
+    elif bet_type is None or not RESULT_PAYOUT_CONTINUATION_PATTERN.match(line):
+        return None, []
+
+    if "特払い" in line:
+        special = RESULT_PAYOUT_SPECIAL_PATTERN.search(line)
+        return bet_type, [(SPECIAL_PAYOUT_COMBINATION, special.group(1), "")]
+
+    # findall は人気のない組（単勝・複勝）の人気を空文字で返す
+    start = match.end() if match else 0
+    return bet_type, RESULT_PAYOUT_ENTRY_PATTERN.findall(line, start)
+
+
+def append_payouts(
+    payouts: List[List], line: str, bet_type: Optional[str], race_key: List
+) -> Optional[str]:
+    """払戻金の1行を解析して payouts に行を追加し、その行の勝式を返す
+
+    race_key は [年, 月, 日, 競艇場番号, レース番号]
+    """
+    bet_type, entries = parse_payout_line(line, bet_type)
+    payouts.extend([*race_key, bet_type, *entry] for entry in entries)
+    return bet_type
+
+
+def iter_race_rows(
+    lines: Iterable[str],
+    year: int,
+    month: int,
+    day: int,
+    payouts: Optional[List[List]] = None,
+) -> Iterator[Tuple]:
+    """レース結果の各行を1パスで解析し、レースの着順ブロックが閉じるごとに行データを返す
+
+    行データは race_results.csv の1行のタプル（年, 月, 日, 競艇場番号, レース番号,
+    ResultRaceHeader の項目, BoatResult の項目）。
+    競艇場のセクションは [番号]KBGN 〜 [番号]KEND で、競艇場番号は KBGN 側から取得する。
+    レースのセクションはレース開始行（1R, 2R, ...）から、次のレース開始行・
+    「第」で始まる行・競艇場セクションの終了までとする。
+    payouts にリストを渡すと、着順ブロックの後の払戻金（単勝〜３連複）を
+    [年, 月, 日, 競艇場番号, レース番号, 勝式, 組番, 払戻金, 人気] の行として追加する。
+    競艇場ごとの先頭の払戻金一覧は、各レースの払戻金と同じ内容のため読まない
+    """
+    track_number = None
+
+    # 処理中のレースの状態
+    race_number = None
+    race_key_header = ()
+    race_rows = []
+    in_results = False
+    results_done = False
+    bet_type = None
+
+    for line in lines:
+        line = line.rstrip("\n")
+
+        if track_number is None:
+            # 競艇場セクションの開始
+            track_match = RESULT_TRACK_BEGIN_MARK_PATTERN.search(line)
+            if track_match:
+                track_number = track_match.group(1)
+            continue
+
+        race_start = RESULT_RACE_START_PATTERN.match(line)
+        track_end = "KEND" in line and RESULT_TRACK_END_MARK_PATTERN.search(line)
+
+        # 処理中のレースの終了（次のレース・「第」で始まる行・競艇場セクションの終了）
+        if race_start or track_end or RESULT_RACE_END_PATTERN.match(line):
+            if race_rows:
+                yield from race_rows
+            race_number = None
+            race_rows = []
+
+        if track_end:
+            track_number = None
+            continue
+
+        if race_start:
+            # レース基本情報を取得（ヘッダー行から）
+            race_number = race_start.group(1)
+            race_header = parse_race_header(race_start.group(2))
+            race_key_header = (year, month, day, track_number, race_number)
+            race_key_header += race_header
+            in_results = False
+            results_done = False
+            bet_type = None
+            continue
+
+        if race_number is None:
+            continue
+        if results_done:
+            if payouts is not None:
+                race_key = [year, month, day, track_number, race_number]
+                bet_type = append_payouts(payouts, line, bet_type, race_key)
+            continue
+
+        # 着順データの部分を抽出
+        if "着 艇 登番" in line:
+            in_results = True
+            continue
+        if not in_results:
+            continue
+        if "---" in line:
+            continue
+        if line.strip() == "" or "単勝" in line or "複勝" in line:
+            # 着順ブロックの終了
+            results_done = True
+            yield from race_rows
+            race_rows = []
+            if payouts is not None and line.strip():
+                # 空行を挟まずに払戻金が始まった場合は、この行から払戻金として読む
+                race_key = [year, month, day, track_number, race_number]
+                bet_type = append_payouts(payouts, line, None, race_key)
+            continue
+
+        boat_result = parse_boat_result(line)
+        if boat_result:
+            # CSVの1行を作成（年〜レースヘッダーはレース内の行で同じオブジェクトを共有）
+            race_rows.append(race_key_header + boat_result)
+
+    # ファイル末尾で閉じていないレース（KENDがない場合）は出力しない
+
+
+def iter_race_data(
+    file_path: str,
+    year: int,
+    month: int,
+    day: int,
+    encoding: str = "auto",
+    payouts: Optional[List[List]] = None,
+) -> Iterator[Tuple]:
+    """レース結果ファイルを1行ずつ読み、レースごとにCSVの行データを返す
+
+    encoding が "auto" の場合はファイルの先頭から UTF-8 / cp932（Shift_JIS）を判定する。
+    payouts にリストを渡すと、同じパスで払戻金の行データを追加する
+    """
+    with open_raw(file_path, encoding) as f:
+        yield from iter_race_rows(f, year, month, day, payouts)
+
+
+def parse_race_data(
+    file_path: str,
+    year: int,
+    month: int,
+    day: int,
+    encoding: str = "auto",
+    payouts: Optional[List[List]] = None,
+) -> List[Tuple]:
+    """レース結果ファイルを解析してCSVデータを作成"""
+    return list(iter_race_data(file_path, year, month, day, encoding, payouts))
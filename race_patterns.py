@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+番組表・競走成績パーサー共通の正規表現・変換テーブル
+
+race_parser.py（convert_program.py / convert_race_result.py / extract_race_info.py の
+共通パーサー）・race_index.py（生データのレース位置の索引）で使う正規表現と
+全角→半角の変換テーブルを、モジュール読み込み時に1度だけ生成する
+"""
+
+import re
+
+# ---------------------------------------------------------------------------
+# ファイル名
+# ---------------------------------------------------------------------------
+
+# 番組表ファイル名（アーカイブ: b{年下2桁}{月}{日}.lzh、
+# Shift_JIS: b{年下2桁}{月}{日}.txt、UTF-8: b{年下2桁}{月}{日}_u8.txt）
+PROGRAM_FILE_PATTERN = re.compile(r"^b(\d{2})(\d{2})(\d{2})(?:\.txt|_u8\.txt|\.lzh)$")
+
+# 競走成績ファイル名（アーカイブ: k{年下2桁}{月}{日}.lzh、
+# Shift_JIS: k{年下2桁}{月}{日}.txt、UTF-8: k{年下2桁}{月}{日}_u8.txt）
+RESULT_FILE_PATTERN = re.compile(r"^k(\d{2})(\d{2})(\d{2})(?:\.txt|_u8\.txt|\.lzh)$")
+
+# ---------------------------------------------------------------------------
+# 全角→半角の変換テーブル
+# ---------------------------------------------------------------------------
+
+DIGIT_TRANSLATION = str.maketrans("０１２３４５６７８９", "0123456789")
+
+# ---------------------------------------------------------------------------
+# 番組表（convert_program.py）
+# ---------------------------------------------------------------------------
+
+# トラック開始・終了マーカー（{番号}BBGN / {番号}BEND）
+PROGRAM_TRACK_BEGIN_PATTERN = re.compile(r"\d{2}BBGN")
+PROGRAM_TRACK_END_PATTERN = re.compile(r"\d{2}BEND")
+
+# レース番号（例: １Ｒ）を含む行
+PROGRAM_RACE_MARK_PATTERN = re.compile(r"\d+Ｒ")
+
+# レースヘッダーの各項目（レース番号・距離・投票締切時間）
+# \d は全角数字にも一致するため、行全体は半角にせず、一致した部分だけを半角にする
+PROGRAM_RACE_NUMBER_PATTERN = re.compile(r"(\d{1,2})[RＲ]")
+PROGRAM_ZENKAKU_RACE_NUMBER_PATTERN = re.compile(r"[　\s]*([０１２３４５６７８９]+)[Ｒ]")
+PROGRAM_DISTANCE_PATTERN = re.compile(r"[HＨ](\d+)[mｍ]")
+PROGRAM_TIME_PATTERN = re.compile(r"(\d{1,2})[：:](\d{2})")
+
+# ---------------------------------------------------------------------------
+# 競走成績（convert_race_result.py）
+# ---------------------------------------------------------------------------
+
+# 行頭の [番号]KBGN
+RESULT_TRACK_BEGIN_PATTERN = re.compile(r"^(\d{2})KBGN", re.MULTILINE)
+
+# 競艇場セクションの開始・終了マーカー（[番号]KBGN 〜 [番号]KEND）
+RESULT_TRACK_BEGIN_MARK_PATTERN = re.compile(r"(\d{2})KBGN")
+RESULT_TRACK_END_MARK_PATTERN = re.compile(r"(\d{2})KEND")
+
+# 競艇場名（ボートレース大　村）と、名前に含まれる空白
+RESULT_VENUE_NAME_PATTERN = re.compile(r"ボートレース([^\n\r]+)")
+SPACES_PATTERN = re.compile(r"[　\s]+")
+
+# レースのセクションの開始行（例: "   1R       予選 ..."）と、
+# レースのセクションを終了させる行（例: "   第 1日 ..."）
+RESULT_RACE_START_PATTERN = re.compile(r"\s*(\d{1,2})R\s+([^\n]*)")
+RESULT_RACE_END_PATTERN = re.compile(r"\s*第")
+
+# レースヘッダーの距離、天候、風向き、風速、波高
+# 例: H1800m  雨　  風  北東　 5m  波　  4cm
+RESULT_RACE_HEADER_PATTERN = re.compile(
+    r"H(\d+)m\s+([^\s]+)\s+風\s+([^\s]+)\s+(\d+)m\s+波\s+(\d+)cm"
+)
+
+# 1行の艇結果
+# 着順は数字(01-06)または特殊コード(S0,S1,S2,F,L0,L1,K0,K1)
+# スタートタイミングはFで始まる場合もある
+BOAT_RESULT_PATTERN = re.compile(
+    r"\s*([0-9]{1,2}|S[0-2]|F|L[01]|K[01])\s+(\d)\s+(\d+)\s+([^\d]+?)\s+(\d+)\s+"
+    r"(\d+)\s+(\d+\.\d+)\s+(\d)\s+(F?[\d.-]+)\s+([\d:.]+|\.+)"
+)
+
+# 払戻金の勝式の行（例: "        ２連単   1-3        390  人気     1 "）
+# 拡連複・同着の2行目以降は勝式を省略した行（例: "                 1-6        420  人気     7 "）
+RESULT_PAYOUT_BET_PATTERN = re.compile(
+    r" {8}(単勝|複勝|２連単|２連複|拡連複|３連単|３連複)\s"
+)
+RESULT_PAYOUT_CONTINUATION_PATTERN = re.compile(r" {17}\d")
+
+# 払戻金の組番・払戻金・人気（複勝は1行に2組）と、特払い（例: "特払い   70"）
+RESULT_PAYOUT_ENTRY_PATTERN = re.compile(r"(\d(?:-\d){0,2})\s+(\d+)(?:\s+人気\s+(\d+))?")
+RESULT_PAYOUT_SPECIAL_PATTERN = re.compile(r"特払い\s+(\d+)")
+
+# ---------------------------------------------------------------------------
+# 生データのバイト列（race_index.py）
+# ---------------------------------------------------------------------------
+
+# トラックの開始・終了マーカーの行（例: 24BBGN、24KEND）
+# 行頭の ASCII の文字のため、cp932（Shift_JIS）のファイルでもデコードせずに探せる
+# （2バイト文字の2バイト目に改行は現れないため、行頭は必ず文字の先頭になる）
+RAW_TRACK_MARK_PATTERN = re.compile(rb"^[ \t]*(\d{2})([BK])(BGN|END)", re.MULTILINE)
+
+# 競走成績のレースのセクションの開始行（RESULT_RACE_START_PATTERN と同じ行）
+RAW_RESULT_RACE_START_PATTERN = re.compile(rb"^[ \t]*(\d{1,2})R[ \t]", re.MULTILINE)
+
+# 番組表のレースヘッダーの行に含まれる文字列（バイト列ではファイルの文字コードで探す）
+PROGRAM_RACE_HEADER_MARK = "電話投票締切予定"
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+番組表・レース結果の突合プログラム
+
+番組表データ（data/race_programs.csv）とレース結果データ（race_results.csv）を
+(日付, レース場, レース, 艇) で突合し、日付ごとに次の不一致を報告する
+- 番組表のみ: 番組表にある艇がレース結果にない（欠場など）
+- 結果のみ: レース結果にある艇が番組表にない
+- 登番・モーターの不一致: 同じ艇で選手登番・モーター番号が異なる
+
+番組表を1度読んでハッシュ表にし、レース結果は1行ずつ突合する（1回の走査）。
+ハッシュ表のキー・値は整数に詰めて持ち、1年分でも少ないメモリで突合できる。
+"""
+
+import csv
+import sys
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+from race_parser import TRACKS
+
+# 入力ファイル
+PROGRAMS_FILE = "data/race_programs.csv"
+RESULTS_FILE = "race_results.csv"
+
+# 番組表の1艇あたりの列数と、艇ごとの列の先頭位置・選手登番/モーター番号の位置
+PROGRAM_RACE_COLUMNS = 7
+PROGRAM_BOAT_COLUMNS = 13
+PROGRAM_PLAYER_OFFSET = 0
+PROGRAM_MOTOR_OFFSET = 9
+
+# レース結果の列の位置
+RESULT_TRACK_COLUMN = 3
+RESULT_RACE_COLUMN = 4
+RESULT_BOAT_COLUMN = 11
+RESULT_PLAYER_COLUMN = 12
+RESULT_MOTOR_COLUMN = 13
+
+# 番組表の値（選手登番・モーター番号）を詰めるときのモーター番号の桁
+# モーター番号は +1 して詰める（不明の -1 が 0 になり、選手登番に繰り下がらない）
+MOTOR_FACTOR = 10000
+
+# 不一致の種類（報告の表示順）
+KINDS = ["番組表のみ", "結果のみ", "登番不一致", "モーター不一致"]
+
+
+def pack_boat_key(track: int, race: int, boat: int) -> int:
+    """(レース場, レース, 艇) を1つの整数に詰める"""
+    return (track * 100 + race) * 10 + boat
+
+
+def unpack_boat_key(key: int) -> Tuple[int, int, int]:
+    """pack_boat_key の逆変換"""
+    track_race, boat = divmod(key, 10)
+    track, race = divmod(track_race, 100)
+    return track, race, boat
+
+
+def pack_entry(player: int, motor: int) -> int:
+    """(選手登番, モーター番号) を1つの整数に詰める
+
+    モーター番号が範囲外（-1〜9998 以外）の場合は不明（-1）として詰める
+    """
+    if not -1 <= motor < MOTOR_FACTOR - 1:
+        motor = -1
+    return player * MOTOR_FACTOR + motor + 1
+
+
+def unpack_entry(packed: int) -> Tuple[int, int]:
+    """pack_entry の逆変換"""
+    player, motor = divmod(packed, MOTOR_FACTOR)
+    return player, motor - 1
+
+
+def to_int(value: str) -> int:
+    """整数に変換（空文字・数値でない値は -1）"""
+    try:
+        return int(value)
+    except ValueError:
+        return -1
+
+
+def load_programs(programs_file: str) -> Dict[Tuple[int, int, int], Dict[int, int]]:
+    """番組表を {(年, 月, 日): {艇のキー: pack_entry(選手登番, モーター番号)}} に読み込む"""
+    programs: Dict[Tuple[int, int, int], Dict[int, int]] = defaultdict(dict)
+
+    with open(programs_file, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader)  # ヘッダー
+
+        for row in reader:
+            if not row:
+                continue
+            day_entries = programs[(int(row[0]), int(row[1]), int(row[2]))]
+            track = int(row[3])
+            race = int(row[4])
+
+            for boat in range(1, 7):
+                start = PROGRAM_RACE_COLUMNS + (boat - 1) * PROGRAM_BOAT_COLUMNS
+                player = row[start + PROGRAM_PLAYER_OFFSET]
+                if player == "":
+                    continue
+                motor = to_int(row[start + PROGRAM_MOTOR_OFFSET])
+                key = pack_boat_key(track, race, boat)
+                day_entries[key] = pack_entry(int(player), motor)
+
+    return programs
+
+
+def iter_results(
+    results_file: str,
+) -> Iterator[Tuple[Tuple[int, int, int], List[str]]]:
+    """レース結果を1行ずつ ((年, 月, 日), 行) で生成"""
+    with open(results_file, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader)  # ヘッダー
+
+        for row in reader:
+            if not row:
+                continue
+            yield (int(row[0]), int(row[1]), int(row[2])), row
+
+
+def reconcile(programs_file: str, results_file: str) -> Dict:
+    """番組表とレース結果を突合する
+
+    戻り値は次のキーを持つ辞書
+    - discrepancies: {(年, 月, 日): [(種類, レース場, レース, 艇, 詳細), ...]}
+    - programs_only_days: {(年, 月, 日): 艇数} 結果が1件もない日
+    - results_only_days: {(年, 月, 日): 艇数} 番組表が1件もない日
+    - program_count / result_count / matched_count: 艇数
+    """
+    programs = load_programs(programs_file)
+    program_count = sum(len(entries) for entries in programs.values())
+
+    discrepancies: Dict[Tuple[int, int, int], List[Tuple]] = defaultdict(list)
+    results_only_days: Dict[Tuple[int, int, int], int] = defaultdict(int)
+    result_days = set()
+    result_count = 0
+    matched_count = 0
+
+    for day, row in iter_results(results_file):
+        result_count += 1
+
+        day_entries = programs.get(day)
+        if day_entries is None:
+            results_only_days[day] += 1
+            continue
+        result_days.add(day)
+
+        track = int(row[RESULT_TRACK_COLUMN])
+        race = int(row[RESULT_RACE_COLUMN])
+        boat = int(row[RESULT_BOAT_COLUMN])
+
+        # 突合した艇は取り除き、最後に残ったものを「番組表のみ」とする
+        packed = day_entries.pop(pack_boat_key(track, race, boat), None)
+        if packed is None:
+            discrepancies[day].append(("結果のみ", track, race, boat, ""))
+            continue
+
+        program_player, program_motor = unpack_entry(packed)
+        result_player = to_int(row[RESULT_PLAYER_COLUMN])
+        result_motor = to_int(row[RESULT_MOTOR_COLUMN])
+
+        if program_player != result_player:
+            discrepancies[day].append(
+                (
+                    "登番不一致",
+                    track,
+                    race,
+                    boat,
+                    f"番組表 {program_player} / 結果 {result_player}",
+                )
+            )
+        if program_motor != result_motor:
+            discrepancies[day].append(
+                (
+                    "モーター不一致",
+                    track,
+                    race,
+                    boat,
+                    f"番組表 {program_motor} / 結果 {result_motor}",
+                )
+            )
+        if program_player == result_player and program_motor == result_motor:
+            matched_count += 1
+
+    # 結果のある日で突合されずに残った艇は「番組表のみ」
+    # 結果が1件もない日は、艇ごとではなく日単位で集計する
+    programs_only_days = {}
+    for day, day_entries in programs.items():
+        if day not in result_days:
+            programs_only_days[day] = len(day_entries)
+            continue
+        for key in day_entries:
+            track, race, boat = unpack_boat_key(key)
+            discrepancies[day].append(("番組表のみ", track, race, boat, ""))
+
+    return {
+        "discrepancies": discrepancies,
+        "programs_only_days": programs_only_days,
+        "results_only_days": results_only_days,
+        "program_count": program_count,
+        "result_count": result_count,
+        "matched_count": matched_count,
+    }
+
+
+def format_day(day: Tuple[int, int, int]) -> str:
+    """日付の表示（YYYY年MM月DD日）"""
+    year, month, day_of_month = day
+    return f"{year}年{month:02d}月{day_of_month:02d}日"
+
+
+def print_report(report: Dict, show_details: bool = False) -> None:
+    """突合結果を表示"""
+    discrepancies = report["discrepancies"]
+
+    kind_totals = dict.fromkeys(KINDS, 0)
+    for items in discrepancies.values():
+        for item in items:
+            kind_totals[item[0]] += 1
+
+    print("=== 番組表・レース結果の突合結果 ===\n")
+    print(f"番組表: {report['program_count']} 艇")
+    print(f"レース結果: {report['result_count']} 艇")
+    print(f"一致: {report['matched_count']} 艇")
+    for kind in KINDS:
+        print(f"{kind}: {kind_totals[kind]} 艇")
+    print(
+        f"結果のない日: {len(report['programs_only_days'])} 日"
+        f"（{sum(report['programs_only_days'].values())} 艇）"
+    )
+    print(
+        f"番組表のない日: {len(report['results_only_days'])} 日"
+        f"（{sum(report['results_only_days'].values())} 艇）"
+    )
+    print()
+
+    print("=== 日付別の不一致 ===")
+    for day in sorted(discrepancies):
+        items = discrepancies[day]
+        if not items:
+            continue
+
+        counts = dict.fromkeys(KINDS, 0)
+        for item in items:
+            counts[item[0]] += 1
+        summary = " ".join(
+            f"{kind}: {counts[kind]}" for kind in KINDS if counts[kind]
+        )
+        print(f"【{format_day(day)}】 {summary}")
+
+        if show_details:
+            for kind, track, race, boat, detail in sorted(
+                items, key=lambda item: (item[1], item[2], item[3])
+            ):
+                track_name = TRACKS.get(f"{track:02d}", "不明")
+                line = f"  {track_name}({track:02d}) {race}R {boat}艇: {kind} {detail}"
+                print(line.rstrip())
+
+
+def main():
+    """メイン関数"""
+    if "--help" in sys.argv or "-h" in sys.argv:
+        print(
+            "使用方法: python reconcile_races.py "
+            "[--programs ファイル名] [--results ファイル名] [--details]"
+        )
+        print(f"  --programs: 番組表データ（デフォルト: {PROGRAMS_FILE}）")
+        print(f"  --results: レース結果データ（デフォルト: {RESULTS_FILE}）")
+        print("  --details: 不一致を艇ごとに表示（デフォルト: 日付ごとの件数のみ）")
+        return 0
+
+    programs_file = PROGRAMS_FILE
+    results_file = RESULTS_FILE
+    show_details = False
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] in ("--programs", "--results") and i + 1 < len(args):
+            if args[i] == "--programs":
+                programs_file = args[i + 1]
+            else:
+                results_file = args[i + 1]
+            i += 2
+        elif args[i] == "--details":
+            show_details = True
+            i += 1
+        else:
+            print(f"エラー: 不明なオプションです: {args[i]}")
+            return 1
+
+    try:
+        report = reconcile(programs_file, results_file)
+    except FileNotFoundError as e:
+        print(f"エラー: ファイルが見つかりません: {e.filename}")
+        return 1
+    except (ValueError, IndexError) as e:
+        print(f"エラー: ファイル読み込み中にエラーが発生しました: {e}")
+        return 1
+
+    print_report(report, show_details)
+
+    # 不一致が1件でもあれば終了コード1
+    if any(report["discrepancies"].values()):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite出力プログラム
+
+番組表・出走表（1艇1行）・競走成績・払戻金の変換結果を、インデックス付きのSQLiteデータベースに格納する。
+1日分ずつトランザクション内で、その日の行を削除してから executemany でまとめて挿入する
+（同じ日を変換し直しても行は重複しない）。
+
+例: 選手4315の2024年の出走
+    SELECT * FROM entries
+    WHERE player_id = 4315 AND race_date BETWEEN '2024-01-01' AND '2024-12-31'
+"""
+
+import os
+import sqlite3
+from typing import Iterable, List
+
+from parquet_output import to_float, to_int, to_str
+
+# データベースファイル（番組表・競走成績で共通）
+SQLITE_PATH = "data/boatrace.db"
+
+# テーブル・インデックスの定義
+# 日付は範囲検索しやすいよう YYYY-MM-DD 形式の文字列で持つ
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS programs (
+    race_date TEXT NOT NULL,
+    track INTEGER NOT NULL,
+    race INTEGER NOT NULL,
+    distance INTEGER,
+    deadline TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_programs_race ON programs (race_date, track, race);
+
+CREATE TABLE IF NOT EXISTS entries (
+    race_date TEXT NOT NULL,
+    track INTEGER NOT NULL,
+    race INTEGER NOT NULL,
+    boat INTEGER NOT NULL,
+    player_id INTEGER,
+    age INTEGER,
+    branch TEXT,
+    weight INTEGER,
+    class INTEGER,
+    national_win_rate REAL,
+    national_2nd_rate REAL,
+    local_win_rate REAL,
+    local_2nd_rate REAL,
+    motor INTEGER,
+    motor_2nd_rate REAL,
+    boat_number INTEGER,
+    boat_2nd_rate REAL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_race ON entries (race_date, track, race);
+CREATE INDEX IF NOT EXISTS idx_entries_player ON entries (player_id, race_date);
+CREATE INDEX IF NOT EXISTS idx_entries_motor ON entries (track, motor, race_date);
+
+CREATE TABLE IF NOT EXISTS results (
+    race_date TEXT NOT NULL,
+    track INTEGER NOT NULL,
+    race INTEGER NOT NULL,
+    distance INTEGER,
+    weather TEXT,
+    wind_direction TEXT,
+    wind_speed INTEGER,
+    wave_height INTEGER,
+    finish TEXT,
+    boat INTEGER,
+    player_id INTEGER,
+    motor INTEGER,
+    boat_number INTEGER,
+    exhibition_time REAL,
+    course INTEGER,
+    start_timing REAL,
+    race_time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_race ON results (race_date, track, race);
+CREATE INDEX IF NOT EXISTS idx_results_player ON results (player_id, race_date);
+CREATE INDEX IF NOT EXISTS idx_results_motor ON results (track, motor, race_date);
+
+CREATE TABLE IF NOT EXISTS payouts (
+    race_date TEXT NOT NULL,
+    track INTEGER NOT NULL,
+    race INTEGER NOT NULL,
+    bet_type TEXT NOT NULL,
+    combination TEXT NOT NULL,
+    payout INTEGER,
+    popularity INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_payouts_race
+    ON payouts (race_date, track, race, bet_type, combination);
+"""
+
+# 行の各列の変換関数（CSVと同じ並びの行 → テーブルの列）
+# モーター番号はレース場ごとの番号のため、インデックスはレース場と組み合わせる
+ENTRY_CONVERTERS = [
+    to_int,  # 艇
+    to_int,  # 選手登番
+    to_int,  # 年齢
+    to_str,  # 支部
+    to_int,  # 体重
+    to_int,  # 級別（整数コード）
+    to_float,  # 全国勝率
+    to_float,  # 全国2連率
+    to_float,  # 当地勝率
+    to_float,  # 当地2連率
+    to_int,  # モーター番号
+    to_float,  # モーター2連率
+    to_int,  # ボート番号
+    to_float,  # ボート2連率
+]
+RESULT_CONVERTERS = [
+    to_int,  # 距離
+    to_str,  # 天候
+    to_str,  # 風向き
+    to_int,  # 風速
+    to_int,  # 波高
+    to_str,  # 着
+    to_int,  # 艇
+    to_int,  # 登番
+    to_int,  # モーター
+    to_int,  # ボート
+    to_float,  # 展示タイム
+    to_int,  # 進入番号
+    to_float,  # スタートタイミング
+    to_str,  # レースタイム
+]
+
+
+def race_date(year: int, month: int, day: int) -> str:
+    """日付の列の値（YYYY-MM-DD）"""
+    return f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
+
+
+class SqliteStore:
+    """変換結果を格納するSQLiteデータベース"""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # 一括挿入を速くするため、コミットごとの同期を減らす
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "SqliteStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """データベースを閉じる"""
+        self.connection.close()
+
+    def replace_day(self, table: str, date: str, rows: Iterable[tuple]) -> None:
+        """1日分の行を、その日の既存の行と置き換える（トランザクションは呼び出し元）"""
+        rows = list(rows)
+        self.connection.execute(f"DELETE FROM {table} WHERE race_date = ?", (date,))
+        if rows:
+            placeholders = ", ".join("?" * len(rows[0]))
+            self.connection.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})", rows
+            )
+
+    def replace_programs(
+        self,
+        year: int,
+        month: int,
+        day: int,
+        program_rows: List[List],
+        entry_rows: List[List],
+    ) -> None:
+        """番組表の1日分（横持ちの行と、1艇1行の出走表の行）を1トランザクションで格納
+
+        program_rows は race_programs.csv、entry_rows は race_entries.csv と同じ並び
+        """
+        date = race_date(year, month, day)
+        with self.connection:
+            self.replace_day(
+                "programs",
+                date,
+                (
+                    (date, int(row[3]), int(row[4]), to_int(row[5]), to_str(row[6]))
+                    for row in program_rows
+                ),
+            )
+            self.replace_day(
+                "entries",
+                date,
+                (
+                    (date, row[3], row[4])
+                    + tuple(
+                        convert(value)
+                        for convert, value in zip(ENTRY_CONVERTERS, row[5:])
+                    )
+                    for row in entry_rows
+                ),
+            )
+
+    def replace_results(
+        self, year: int, month: int, day: int, rows: List[List]
+    ) -> None:
+        """競走成績の1日分を1トランザクションで格納（rows は race_results.csv と同じ並び）"""
+        date = race_date(year, month, day)
+        with self.connection:
+            self.replace_day(
+                "results",
+                date,
+                (
+                    (date, int(row[3]), int(row[4]))
+                    + tuple(
+                        convert(value)
+                        for convert, value in zip(RESULT_CONVERTERS, row[5:])
+                    )
+                    for row in rows
+                ),
+            )
+
+    def replace_payouts(
+        self, year: int, month: int, day: int, rows: List[List]
+    ) -> None:
+        """払戻金の1日分を1トランザクションで格納（rows は race_payouts.csv と同じ並び）"""
+        date = race_date(year, month, day)
+        with self.connection:
+            self.replace_day(
+                "payouts",
+                date,
+                (
+                    (
+                        date,
+                        int(row[3]),
+                        int(row[4]),
+                        row[5],
+                        row[6],
+                        to_int(row[7]),
+                        to_int(row[8]),
+                    )
+                    for row in rows
+                ),
+            )
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+download_races の確認
+
+テスト用のHTTPサーバー（http.server）をスレッドで起動し、--base-url と同じように
+ダウンロード元をそのサーバーに向けて、一時ディレクトリに保存する
+- 1月1日: 正しいアーカイブ
+- 1月2日: 404（データなし）
+- 1月3日: 1回目は 500、2回目は正しいアーカイブ（再試行）
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import download_races  # noqa: E402
+from download_races import (  # noqa: E402
+    DONE,
+    NOT_FOUND,
+    SKIPPED,
+    DownloadState,
+    download_all,
+)
+from test_lzh_archive import make_archive  # noqa: E402
+
+CONTENT = "　１Ｒ  予選\r\n".encode("cp932") * 100
+ARCHIVE = make_archive([("b240101.txt", CONTENT, CONTENT)])
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """パスごとに決めた応答を返す（server.responses はパス → 応答のステータスのリスト）"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        statuses = self.server.responses.get(self.path, [404])
+        # 最後のステータスをくり返す
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        self.send_response(status)
+        body = ARCHIVE if status == 200 else b""
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadRacesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.requests = []
+        self.server.responses = {
+            "/B/202401/b240101.lzh": [200],
+            "/B/202401/b240102.lzh": [404],
+            "/B/202401/b240103.lzh": [500, 200],
+        }
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        # 保存先（data/raw/...）は作業ディレクトリからの相対パス
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.work_dir.name)
+        self.state_file = os.path.join("data", "raw", "download_state.json")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.work_dir.cleanup()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def download(self):
+        """1月1日〜3日の番組表をダウンロードし、結果ごとの日のリストを返す"""
+        state = DownloadState(self.state_file)
+        with mock.patch.object(download_races, "BACKOFF_BASE", 0.01):
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = asyncio.run(
+                    download_all(
+                        "p",
+                        date(2024, 1, 1),
+                        date(2024, 1, 3),
+                        state,
+                        self.base_url,
+                        jobs=2,
+                        rate=0,
+                        retries=2,
+                        timeout=5,
+                    )
+                )
+        return {
+            status: sorted(day.day for _, day, _ in entries)
+            for status, entries in results.items()
+        }
+
+    def test_download_retry_and_resume(self):
+        results = self.download()
+        self.assertEqual(results[DONE], [1, 3])
+        self.assertEqual(results[NOT_FOUND], [2])
+
+        # 保存したアーカイブ
+        for name in ("b240101.lzh", "b240103.lzh"):
+            with open(os.path.join("data", "raw", "programs", name), "rb") as f:
+                self.assertEqual(f.read(), ARCHIVE)
+        missing = os.path.join("data", "raw", "programs", "b240102.lzh")
+        self.assertFalse(os.path.exists(missing))
+
+        # 500 の後に再試行している
+        self.assertEqual(self.server.requests.count("/B/202401/b240103.lzh"), 2)
+
+        # 状態ファイル（データなしの日も記録）
+        with open(self.state_file, "r", encoding="utf-8") as f:
+            days = json.load(f)["days"]["p"]
+        self.assertEqual(sorted(days), ["2024-01-01", "2024-01-02", "2024-01-03"])
+        self.assertEqual(days["2024-01-02"]["status"], NOT_FOUND)
+        self.assertEqual(days["2024-01-03"]["size"], len(ARCHIVE))
+
+        # 2回目はダウンロード済み・データなしの日をリクエストしない
+        request_count = len(self.server.requests)
+        results = self.download()
+        self.assertEqual(results[SKIPPED], [1, 2, 3])
+        self.assertEqual(len(self.server.requests), request_count)
+
+    def test_recent_not_found_is_checked_again(self):
+        """確認した日に近い日のデータなしは、まだ公開されていない可能性があるため再確認"""
+        state = DownloadState(self.state_file)
+        today = date.today()
+        state.record_not_found("p", today, "url")
+        self.assertFalse(state.is_done("p", today))
+        state.record_not_found("p", date(2024, 1, 2), "url")
+        self.assertTrue(state.is_done("p", date(2024, 1, 2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+lzh_archive の確認
+
+アーカイブはテストの中で作成する（ヘッダーレベル0・無圧縮の -lh0- と、
+圧縮データを壊した -lh5-）
+"""
+
+import os
+import random
+import struct
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lzh_archive  # noqa: E402
+from lzh_archive import crc16, verify_archive  # noqa: E402
+
+
+def make_archive(members, method=b"-lh0-"):
+    """(ファイル名, 内容, 格納するデータ) のリストからヘッダーレベル0のアーカイブを作成"""
+    archive = b""
+    for name, content, packed in members:
+        encoded_name = name.encode("cp932")
+        header = (
+            method
+            + struct.pack("<IIIBB", len(packed), len(content), 0, 0x20, 0)
+            + bytes([len(encoded_name)])
+            + encoded_name
+            + struct.pack("<H", crc16(content))
+        )
+        archive += bytes([len(header), sum(header) & 0xFF]) + header + packed
+    return archive + b"\0"
+
+
+def stored_archive(seed):
+    """無圧縮の正しいアーカイブ（内容は seed ごとに変える）"""
+    rng = random.Random(seed)
+    content = bytes(rng.randrange(256) for _ in range(50000 + seed))
+    return make_archive([(f"k2401{seed:02d}.txt", content, content)])
+
+
+class VerifyArchiveTest(unittest.TestCase):
+    def setUp(self):
+        # 2バイト分の表を作り直す状態から始める
+        lzh_archive.CRC16_WORD_TABLE = None
+
+    def test_concurrent_verify(self):
+        """複数のスレッドから同時に確認しても、すべて正しく確認できる"""
+        archives = [stored_archive(seed) for seed in range(8)]
+        for _ in range(5):
+            lzh_archive.CRC16_WORD_TABLE = None
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                counts = list(executor.map(verify_archive, archives))
+            self.assertEqual(counts, [1] * len(archives))
+
+    def test_concurrent_crc16(self):
+        """複数のスレッドで計算した CRC が、1スレッドで計算した値と同じ"""
+        data = [os.urandom(4096 + i) for i in range(16)]
+        lzh_archive.CRC16_WORD_TABLE = None
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            concurrent = list(executor.map(crc16, data))
+        self.assertEqual(concurrent, [crc16(item) for item in data])
+
+    def test_corrupt_archive_is_value_error(self):
+        """壊れた圧縮データ・途中で切れたデータは、どれも ValueError になる"""
+        rng = random.Random(0)
+        for _ in range(50):
+            content = bytes(rng.randrange(256) for _ in range(2000))
+            packed = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 400)))
+            archive = make_archive([("k240101.txt", content, packed)], b"-lh5-")
+            with self.assertRaises(ValueError):
+                verify_archive(archive)
+
+        archive = stored_archive(0)
+        for size in (5, 21, 30, len(archive) // 2):
+            with self.assertRaises(ValueError):
+                verify_archive(archive[:size])
+
+    def test_decoder_error_is_value_error(self):
+        """展開中の IndexError・KeyError も ValueError になる（ダウンロードは再試行できる）"""
+        archive = stored_archive(0)
+        for error in (IndexError, KeyError):
+            with mock.patch.object(lzh_archive, "decompress", side_effect=error):
+                with self.assertRaises(ValueError):
+                    verify_archive(archive)
+
+
+if __name__ == "__main__":
+    unittest.main()
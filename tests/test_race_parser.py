@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+race_parser（番組表・競走成績の共通パーサー）の確認
+
+生データ（data/raw/ の 2024年6月15日の唐津）から切り出した行をテストの中に持ち、
+CRLF・cp932 のファイルにも書き出して読み込む
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from race_io import open_raw  # noqa: E402
+from race_parser import (  # noqa: E402
+    BOAT_RESULT_FALLBACKS,
+    TRACK_NUMBERS,
+    TRACKS,
+    BoatResult,
+    ProgramBoat,
+    find_track_number,
+    fixed_width_parser,
+    iter_race_data,
+    iter_race_rows,
+    match_boat_result,
+    parse_boat_result,
+    parse_program_lines,
+    split_boat_result,
+)
+
+RULE = "-" * 79
+PROGRAM_COLUMN_LINES = [
+    RULE,
+    "艇 選手 選手  年 支 体級    全国      当地     モーター   ボート   今節成績  早",
+    "番 登番  名   齢 部 重別 勝率  2率  勝率  2率  NO  2率  NO  2率  １２３４５６見",
+    RULE,
+]
+
+# 1R は6艇、2R は4号艇の行がない（レースごと出力しない）
+PROGRAM_LINES = [
+    "STARTB",
+    "23BBGN",
+    "ボートレース唐　津   　６月１５日  第１１回ウエスタンヤ  第　１日",
+    "",
+    "　１Ｒ  予選　　　　          Ｈ１８００ｍ  電話投票締切予定０８：３５ ",
+    *PROGRAM_COLUMN_LINES,
+    "1 4963實森美祐27広島46A2 6.36 50.00 5.74 37.04 20 31.18 63 43.94              9",
+    "2 5018竹下大樹25福岡55A2 6.28 43.31 5.00 27.78 17 32.11 90 60.00              5",
+    "3 5029中　亮太27福岡53A2 6.42 51.00 5.80 50.00 14 30.22 73 34.92              7",
+    "4 5056西岡成美28徳島44A2 6.07 42.39 0.00  0.00 41 37.50 71 29.23              6",
+    "5 5073上原健次28福岡53B1 5.08 30.00 4.88 24.00 69 32.81 60 36.84               ",
+    "6 5015高橋竜矢26広島52A1 5.35 34.92 6.00 50.00 28 40.20 34 33.82              8",
+    "",
+    "　２Ｒ  予選　　　　          Ｈ１８００ｍ  電話投票締切予定０９：０１ ",
+    *PROGRAM_COLUMN_LINES,
+    "1 5092篠原晟弥23福岡52B1 4.84 29.89 5.81 37.50 58 27.17 80 34.43               ",
+    "2 4964土屋　南27岡山46A2 6.14 42.16 5.65 40.00 55 27.87 78 36.36              9",
+    "3 5142常住　蓮23佐賀50A2 6.77 52.59 6.24 41.67 53 31.69 37 34.62             11",
+    "5 4852川原祐明29香川52A1 5.97 38.14 5.87 39.13 64 39.47 47 38.46              7",
+    "6 5106山崎　祥25山口52B1 5.29 26.83 4.76 27.27 43 37.70 32 25.86              6",
+    "",
+    "23BEND",
+    "FINALB",
+]
+
+# 先頭の払戻金一覧（読まない）と、1R の着順・払戻金
+RESULT_LINES = [
+    "STARTK",
+    "23KBGN",
+    "唐　津［成績］      6/15      第１１回ウエスタンヤ  第 1日",
+    "",
+    "   [払戻金]       ３連単           ３連複           ２連単         ２連複",
+    "           1R  1-2-3     960    1-2-3     380    1-2     380    1-2     360",
+    "",
+    "   1R       予選　　　　                 H1800m  晴　  風  北　　 1m  波　  1cm",
+    "  着 艇 登番 　選　手　名　　ﾓｰﾀｰ ﾎﾞｰﾄ 展示 進入 ｽﾀｰﾄﾀｲﾐﾝｸ ﾚｰｽﾀｲﾑ 逃げ　　　",
+    RULE,
+    "  01  1 4963 實　森　　美　祐 20   63  6.72   1    0.09     1.49.1",
+    "  02  2 5018 竹　下　　大　樹 17   90  6.65   2    0.07     1.50.7",
+    "  03  3 5029 中　　　　亮　太 14   73  6.76   3    0.09     1.52.1",
+    "  04  4 5056 西　岡　　成　美 41   71  6.66   4    0.11     1.53.1",
+    "  05  6 5015 高　橋　　竜　矢 28   34  6.83   5    0.13     1.54.3",
+    "  06  5 5073 上　原　　健次郎 69   60  6.63   6    0.11     1.54.9",
+    "",
+    "        単勝     1          170  ",
+    "        複勝     1          100  2          120  ",
+    "        ２連単   1-2        380  人気     2 ",
+    "        ２連複   1-2        360  人気     2 ",
+    "        拡連複   1-2        200  人気     3 ",
+    "                 1-3        160  人気     1 ",
+    "                 2-3        230  人気     4 ",
+    "        ３連単   1-2-3      960  人気     2 ",
+    "        ３連複   1-2-3      380  人気     1 ",
+    "",
+    "23KEND",
+    "FINALK",
+]
+
+RACE_KEY = (2024, 6, 15, "23", "1")
+RESULT_HEADER = ("1800", "晴", "北", "1", "1")
+
+
+def text_lines(lines):
+    """open_raw で読んだ場合と同じく、改行を "\\n" にした行"""
+    return [line + "\n" for line in lines]
+
+
+class RaceParserFileTest(unittest.TestCase):
+    """CRLF・cp932 のファイルを open_raw で読んで解析する"""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def write(self, name, lines, encoding):
+        path = os.path.join(self.work_dir.name, name)
+        with open(path, "wb") as f:
+            f.write("\r\n".join(lines).encode(encoding))
+        return path
+
+
+class ProgramTest(RaceParserFileTest):
+    def test_track_and_races(self):
+        races = parse_program_lines(text_lines(PROGRAM_LINES), 2024, 6, 15)
+
+        # 2R は6艇そろっていないため出力しない
+        self.assertEqual(len(races), 1)
+        race = races[0]
+        self.assertEqual(race[:8], (2024, 6, 15, "23", "1", "予選", "1800", "08:35"))
+        self.assertEqual([boat.boat_number for boat in race.boats], list("123456"))
+        fields = "1 4963 實森美祐 27 広島 46 A2 6.36 50.00 5.74 37.04 20 31.18 63 43.94"
+        self.assertEqual(race.boats[0], ProgramBoat(*fields.split()))
+        self.assertEqual(race.boats[2].player_name, "中　亮太")
+
+    def test_crlf_and_cp932(self):
+        expected = parse_program_lines(text_lines(PROGRAM_LINES), 2024, 6, 15)
+        for encoding in ("utf-8", "cp932"):
+            path = self.write(f"b240615_{encoding}.txt", PROGRAM_LINES, encoding)
+            with open_raw(path) as f:
+                self.assertEqual(parse_program_lines(f, 2024, 6, 15), expected)
+
+
+class ResultTest(RaceParserFileTest):
+    def test_rows_and_payouts(self):
+        payouts = []
+        rows = list(iter_race_rows(text_lines(RESULT_LINES), 2024, 6, 15, payouts))
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(
+            rows[0],
+            RACE_KEY
+            + RESULT_HEADER
+            + ("01", "1", "4963", "20", "63", "6.72", "1", "0.09", "1.49.1"),
+        )
+        self.assertEqual([row[11] for row in rows], ["1", "2", "3", "4", "6", "5"])
+        columns = RACE_KEY + RESULT_HEADER + BoatResult._fields
+        self.assertEqual(len(rows[0]), len(columns))
+
+        # 払戻金はレースの後の表だけ（先頭の払戻金一覧は読まない）
+        self.assertEqual(
+            [tuple(row[5:]) for row in payouts],
+            [
+                ("単勝", "1", "170", ""),
+                ("複勝", "1", "100", ""),
+                ("複勝", "2", "120", ""),
+                ("2連単", "1-2", "380", "2"),
+                ("2連複", "1-2", "360", "2"),
+                ("拡連複", "1-2", "200", "3"),
+                ("拡連複", "1-3", "160", "1"),
+                ("拡連複", "2-3", "230", "4"),
+                ("3連単", "1-2-3", "960", "2"),
+                ("3連複", "1-2-3", "380", "1"),
+            ],
+        )
+        self.assertTrue(all(tuple(row[:5]) == RACE_KEY for row in payouts))
+
+    def test_no_payouts_requested(self):
+        rows = list(iter_race_rows(text_lines(RESULT_LINES), 2024, 6, 15))
+        self.assertEqual(len(rows), 6)
+
+    def test_unclosed_track_is_dropped(self):
+        """KEND がないトラックのレースは出力しない"""
+        lines = RESULT_LINES[: RESULT_LINES.index("") + 1]
+        self.assertEqual(list(iter_race_rows(text_lines(lines), 2024, 6, 15)), [])
+
+    def test_crlf_and_cp932(self):
+        expected_payouts = []
+        expected = list(
+            iter_race_rows(text_lines(RESULT_LINES), 2024, 6, 15, expected_payouts)
+        )
+        for encoding in ("utf-8", "cp932"):
+            path = self.write(f"k240615_{encoding}.txt", RESULT_LINES, encoding)
+            payouts = []
+            rows = list(iter_race_data(path, 2024, 6, 15, payouts=payouts))
+            self.assertEqual(rows, expected)
+            self.assertEqual(payouts, expected_payouts)
+
+
+# race_result_sample.md の欠場の行（Markdown の字下げを除いたもの）と、生データの
+# 欠場の行。展示タイム・スタートタイミングが "K ." の行はどちらの方法でも解析せず、
+# 出力しない
+ABSENT_LINES = [
+    "  K0  1 3986 沖　島　　広　和 52   61   K .         K .        .  . ",
+    "  K0  3 5222 木　田　　　　峻 55   50 K .         K .        .  . ",
+]
+# フライング（スタートタイミング F0.01 → -0.01、レースタイムなし）
+FLYING_LINE = "  F   4 5155 内　山　　七　海 12   39  6.91   5   F0.01      .  . "
+FINISHED_LINE = "  01  5 4314 青　木　　幸太郎 56   11  6.77   4    0.13     1.48.7"
+# 展示タイムの列が1文字ずれた行（固定位置では切り出さず、正規表現で解析する）
+SHIFTED_LINE = "  01  5 4314 青　木　　幸太郎 56   11    6.77   4    0.13     1.48.7"
+
+
+class BoatResultTest(unittest.TestCase):
+    def parse(self, line):
+        """parse_boat_result の結果と、BOAT_RESULT_FALLBACKS の増えた数"""
+        before = BOAT_RESULT_FALLBACKS.copy()
+        result = parse_boat_result(line)
+        return result, dict(BOAT_RESULT_FALLBACKS - before)
+
+    def test_absent_lines_are_dropped(self):
+        for line in ABSENT_LINES:
+            with self.subTest(line=line):
+                self.assertIsNone(split_boat_result(line))
+                self.assertIsNone(match_boat_result(line))
+                self.assertEqual(self.parse(line), (None, {"unmatched": 1}))
+
+    def test_flying_start(self):
+        expected = BoatResult("F", "4", "5155", "12", "39", "6.91", "5", "-0.01", "")
+        self.assertEqual(split_boat_result(FLYING_LINE), expected)
+        self.assertEqual(match_boat_result(FLYING_LINE), expected)
+        self.assertEqual(self.parse(FLYING_LINE), (expected, {}))
+
+    def test_fallback_only_when_split_fails(self):
+        expected = BoatResult(
+            "01", "5", "4314", "56", "11", "6.77", "4", "0.13", "1.48.7"
+        )
+        self.assertEqual(split_boat_result(FINISHED_LINE), expected)
+        self.assertEqual(match_boat_result(FINISHED_LINE), expected)
+        self.assertEqual(self.parse(FINISHED_LINE), (expected, {}))
+
+        self.assertIsNone(split_boat_result(SHIFTED_LINE))
+        self.assertEqual(match_boat_result(SHIFTED_LINE), expected)
+        self.assertEqual(self.parse(SHIFTED_LINE), (expected, {"matched": 1}))
+
+
+class TrackTest(unittest.TestCase):
+    def test_tracks(self):
+        self.assertEqual(len(TRACKS), 24)
+        self.assertEqual(TRACK_NUMBERS["江戸川"], "03")
+        self.assertEqual(TRACKS["03"], "江戸川")
+        self.assertEqual(TRACKS["24"], "大村")
+        self.assertEqual(find_track_number("ボートレース江戸川"), "03")
+        self.assertEqual(find_track_number("ボートレース"), None)
+
+
+class FixedWidthTest(unittest.TestCase):
+    def test_fixed_width_parser(self):
+        parse = fixed_width_parser((("a", 0, 2), ("b", 3, 7), ("c", 8, 12)))
+        self.assertEqual(parse("12 345  6.7"), ["12", "345", "6.7"])
+        # 短い行の足りない列は空文字
+        self.assertEqual(parse("12 3"), ["12", "3", ""])
+
+
+if __name__ == "__main__":
+    unittest.main()